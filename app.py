@@ -25,6 +25,9 @@ app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
     "pool_pre_ping": True,
 }
 app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+if app.config["SQLALCHEMY_DATABASE_URI"].startswith("sqlite"):
+    # Wait for another worker's write to finish instead of failing with "database is locked"
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"]["connect_args"] = {"timeout": 30}
 
 # Initialize SQLAlchemy with the app
 db.init_app(app)
@@ -37,6 +40,44 @@ app.config["TWILIO_ACCOUNT_SID"] = os.environ.get("TWILIO_ACCOUNT_SID", "")
 app.config["TWILIO_AUTH_TOKEN"] = os.environ.get("TWILIO_AUTH_TOKEN", "")
 app.config["TWILIO_PHONE_NUMBER"] = os.environ.get("TWILIO_PHONE_NUMBER", "")
 
+# Call session store shared by all workers (memory, sql or redis)
+app.config["CALL_STATE_BACKEND"] = os.environ.get("CALL_STATE_BACKEND", "sql")
+app.config["CALL_STATE_TTL"] = int(os.environ.get("CALL_STATE_TTL", "3600"))
+app.config["CALL_STATE_MAX_SESSIONS"] = int(os.environ.get("CALL_STATE_MAX_SESSIONS", "10000"))
+app.config["REDIS_URL"] = os.environ.get("REDIS_URL", "redis://localhost:6379/0")
+
+# Per-worker cache of available slots per (restaurant, date)
+app.config["AVAILABILITY_CACHE_TTL"] = int(os.environ.get("AVAILABILITY_CACHE_TTL", "60"))
+app.config["AVAILABILITY_CACHE_SIZE"] = int(os.environ.get("AVAILABILITY_CACHE_SIZE", "512"))
+app.config["AVAILABILITY_PREFETCH_WORKERS"] = int(os.environ.get("AVAILABILITY_PREFETCH_WORKERS", "4"))
+
+# Minutes a booking keeps its seats when checking capacity
+app.config["BOOKING_DURATION_MINUTES"] = int(os.environ.get("BOOKING_DURATION_MINUTES", "60"))
+
+# Seconds a caller's offered table stays held while they confirm
+app.config["SLOT_HOLD_TTL"] = int(os.environ.get("SLOT_HOLD_TTL", "300"))
+
+# Waitlisted parties are offered cancellations within this many minutes of their time
+app.config["WAITLIST_WINDOW_MINUTES"] = int(os.environ.get("WAITLIST_WINDOW_MINUTES", "60"))
+app.config["WAITLIST_PROMOTION_WORKERS"] = int(os.environ.get("WAITLIST_PROMOTION_WORKERS", "2"))
+
+# Seconds between sweeps completing bookings that are over (0 disables), and minutes to wait after they end
+app.config["BOOKING_SWEEP_INTERVAL"] = int(os.environ.get("BOOKING_SWEEP_INTERVAL", "300"))
+app.config["BOOKING_SWEEP_GRACE_MINUTES"] = int(os.environ.get("BOOKING_SWEEP_GRACE_MINUTES", "120"))
+app.config["BOOKING_SWEEP_BATCH_SIZE"] = int(os.environ.get("BOOKING_SWEEP_BATCH_SIZE", "500"))
+
+# Seconds a response is kept for replaying retried webhooks and double-submitted forms
+app.config["IDEMPOTENCY_TTL"] = int(os.environ.get("IDEMPOTENCY_TTL", "3600"))
+
+# Seconds before other workers pick up changes to a restaurant's hours or capacity
+app.config["RESTAURANT_CONFIG_TTL"] = int(os.environ.get("RESTAURANT_CONFIG_TTL", "300"))
+
+# Optional real-time voice over Twilio Media Streams (requires flask-sock)
+app.config["MEDIA_STREAM_STT"] = os.environ.get("MEDIA_STREAM_STT", "whisper")
+app.config["MEDIA_STREAM_TTS"] = os.environ.get("MEDIA_STREAM_TTS", "elevenlabs")
+app.config["MEDIA_STREAM_END_SILENCE_MS"] = int(os.environ.get("MEDIA_STREAM_END_SILENCE_MS", "400"))
+app.config["MEDIA_STREAM_SPEECH_THRESHOLD"] = int(os.environ.get("MEDIA_STREAM_SPEECH_THRESHOLD", "500"))
+
 # Import routes
 with app.app_context():
     # Import models to ensure tables are created
@@ -45,6 +86,19 @@ with app.app_context():
     # Create all database tables
     db.create_all()
     
+    # create_all() skips existing tables, so add indexes declared since they were created
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(db.engine, checkfirst=True)
+    
+    # Name and phone search index, kept up to date by the database
+    from services.search_service import init_booking_search
+    init_booking_search(app)
+    
+    # One-time data bootstrap
+    from services.restaurant_service import ensure_default_restaurant
+    ensure_default_restaurant()
+    
     # Register blueprints
     from routes.main import main_bp
     from routes.booking import booking_bp
@@ -52,6 +106,7 @@ with app.app_context():
     from routes.voice import voice_bp
     from routes.twilio_call import twilio_call_bp
     from routes.calendly import calendly_bp
+    from routes.media_stream import media_stream_bp, init_media_streams
     
     app.register_blueprint(main_bp)
     app.register_blueprint(booking_bp)
@@ -59,5 +114,15 @@ with app.app_context():
     app.register_blueprint(voice_bp)
     app.register_blueprint(twilio_call_bp)
     app.register_blueprint(calendly_bp)
+    app.register_blueprint(media_stream_bp)
+    init_media_streams(app)
+    
+    # Report commits per request in the X-DB-Commits header
+    from services.unit_of_work import init_unit_of_work
+    init_unit_of_work(app)
+    
+    # Complete bookings that are over in the background
+    from services.sweeper_service import init_booking_sweeper
+    init_booking_sweeper(app)
 
 logger.info("Application initialized successfully")
@@ -0,0 +1,131 @@
+"""
+Guest search latency with a large booking history.
+
+Fills a scratch SQLite database with synthetic bookings (common and rare
+surnames, so some queries match tens of thousands of bookings and some a
+handful), then times search_bookings() for word prefixes, substrings,
+misspellings and phone digits. For comparison it also times the LIKE scan
+the search index replaces. Exits non-zero if any kind of query has a p99
+over 20 ms.
+
+Usage:
+    python benchmarks/bench_booking_search.py [--bookings 1000000] [--queries 500]
+"""
+import argparse
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+FIRST_NAMES = ("James Mary John Patricia Robert Jennifer Michael Linda William Elizabeth David Barbara "
+               "Richard Susan Joseph Jessica Thomas Sarah Charles Karen Daniel Lisa Matthew Nancy Anthony "
+               "Betty Mark Sandra Donald Ashley Steven Emily Paul Donna Andrew Michelle Joshua Carol").split()
+COMMON_SURNAMES = ("Smith Johnson Williams Brown Jones Garcia Miller Davis Rodriguez Martinez Hernandez "
+                   "Lopez Gonzalez Wilson Anderson Thomas Taylor Moore Jackson Martin Lee Perez Thompson "
+                   "White Harris Sanchez Clark Ramirez Lewis Robinson").split()
+SYLLABLES = "ka lo mi ne ra to shi ber gan dor vel quin stro hal mar ten wick ford ley son man ski".split()
+
+def percentile(sorted_values, pct):
+    rank = max(0, min(len(sorted_values) - 1, int(round(pct / 100.0 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[rank]
+
+def misspell(rng, word):
+    i = rng.randrange(1, len(word) - 1)
+    return word[:i] + word[i + 1:] if rng.random() < 0.5 else word[:i] + word[i + 1] + word[i] + word[i + 2:]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--bookings', type=int, default=1000000)
+    parser.add_argument('--queries', type=int, default=500, help='searches per kind of query')
+    parser.add_argument('--scan-queries', type=int, default=10, help='searches for the LIKE comparison')
+    args = parser.parse_args()
+
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'search.db')
+    logging.disable(logging.INFO)
+
+    from sqlalchemy import insert, select
+    from app import app, db
+    from models import Booking
+    from services import search_service
+    from services.search_service import search_bookings
+
+    rng = random.Random(1)
+    rare_surnames = ["".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 3))).capitalize()
+                     for _ in range(20000)]
+    today = date.today()
+
+    with app.app_context():
+        started = time.perf_counter()
+        batch = []
+        names = []
+        phones = []
+        for i in range(args.bookings):
+            surname = rng.choice(COMMON_SURNAMES) if rng.random() < 0.5 else rng.choice(rare_surnames)
+            name = f"{rng.choice(FIRST_NAMES)} {surname}"
+            phone = f"+1{rng.randint(201, 989)}{rng.randint(200, 999)}{rng.randint(0, 9999):04d}"
+            if i % 97 == 0:
+                names.append(name)
+                phones.append(phone)
+            batch.append({
+                'restaurant_id': 1, 'customer_name': name, 'customer_phone': phone,
+                'party_size': rng.randint(1, 8), 'booking_date': today - timedelta(days=rng.randint(0, 720)),
+                'booking_time': '19:00', 'status': 'completed',
+                'created_at': datetime.utcnow(), 'updated_at': datetime.utcnow(),
+            })
+            if len(batch) == 10000:
+                db.session.execute(insert(Booking), batch)
+                batch = []
+        if batch:
+            db.session.execute(insert(Booking), batch)
+        db.session.commit()
+        print(f"inserted {args.bookings} bookings (indexed by trigger) in {time.perf_counter() - started:.1f}s, "
+              f"search backend {search_service._backend}")
+
+        def surname_of(name):
+            return name.split()[1].lower()
+
+        kinds = [
+            ('surname prefix', [surname_of(rng.choice(names))[:3] for _ in range(args.queries)]),
+            ('full name', [rng.choice(names) for _ in range(args.queries)]),
+            ('substring', [surname_of(rng.choice(names))[1:5] for _ in range(args.queries)]),
+            ('misspelt surname', [misspell(rng, surname_of(rng.choice(names))) for _ in range(args.queries)]),
+            ('last 4 phone digits', [rng.choice(phones)[-4:] for _ in range(args.queries)]),
+            ('no match', [f"zq{rng.randint(0, 9999)}x" for _ in range(args.queries)]),
+        ]
+
+        print(f"\n{'query':<24} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8} {'avg hits':>9}")
+        worst_p99 = 0.0
+        for kind, queries in kinds:
+            samples = []
+            hits = 0
+            for query in queries:
+                started = time.perf_counter()
+                hits += len(search_bookings(query))
+                samples.append(time.perf_counter() - started)
+            samples.sort()
+            worst_p99 = max(worst_p99, percentile(samples, 99))
+            print(f"{kind:<24} {percentile(samples, 50) * 1000:>8.3f} {percentile(samples, 99) * 1000:>8.3f} "
+                  f"{samples[-1] * 1000:>8.3f} {hits / len(queries):>9.1f}")
+
+        # A name nobody has reads the whole table, as any LIKE '%...%' can
+        samples = []
+        for query in kinds[-1][1][:args.scan_queries]:
+            started = time.perf_counter()
+            db.session.execute(
+                select(Booking.id).where(Booking.customer_name.ilike(f"%{query}%"))
+                .order_by(Booking.id.desc()).limit(10)
+            ).all()
+            samples.append(time.perf_counter() - started)
+        samples.sort()
+        print(f"{'LIKE scan (no match)':<24} {percentile(samples, 50) * 1000:>8.3f} "
+              f"{percentile(samples, 99) * 1000:>8.3f} {samples[-1] * 1000:>8.3f}")
+
+    return 0 if worst_p99 < 0.02 else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
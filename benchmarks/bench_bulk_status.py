@@ -0,0 +1,91 @@
+"""
+Closing time: marking a night's bookings completed or no-show.
+
+Imports a night of confirmed bookings into a scratch SQLite database, then
+times bulk_update_status() changing them all in one transaction against
+update_booking_status(), the one-booking-at-a-time path the dashboard
+buttons use, on the same number of bookings on another night.
+
+Usage:
+    python benchmarks/bench_bulk_status.py [--bookings 1000]
+"""
+import argparse
+import csv
+import io
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+FIELDS = ['customer_name', 'customer_phone', 'party_size', 'booking_date', 'booking_time', 'status']
+
+def night_csv(count, booking_date, seed=1):
+    rng = random.Random(seed)
+    out = io.StringIO()
+    writer = csv.DictWriter(out, FIELDS)
+    writer.writeheader()
+    for i in range(count):
+        writer.writerow({
+            'customer_name': f"Guest {i}",
+            'customer_phone': f"+1555{rng.randint(0, 9999999):07d}",
+            'party_size': rng.randint(1, 8),
+            'booking_date': booking_date.isoformat(),
+            'booking_time': f"{rng.randint(11, 21):02d}:{rng.choice(['00', '15', '30', '45'])}",
+            'status': 'confirmed'
+        })
+    out.seek(0)
+    return out
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--bookings', type=int, default=1000, help='bookings per night')
+    args = parser.parse_args()
+
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bulk.db')
+    logging.disable(logging.WARNING)
+
+    from app import app
+    from models import AuditLog, Booking
+    from services.booking_service import bulk_update_status, update_booking_status
+    from services.import_service import import_bookings
+    from services.occupancy_service import get_day_occupancy
+
+    bulk_night = date.today() + timedelta(days=1)
+    single_night = date.today() + timedelta(days=2)
+
+    with app.app_context():
+        for night in (bulk_night, single_night):
+            import_bookings(night_csv(args.bookings, night), 'csv', source='benchmark')
+            # Seed the seat counters so freeing seats is part of the work
+            get_day_occupancy(1, night)
+
+        print(f"{'path':<22} {'bookings':>9} {'updated':>8} {'ms':>9}")
+
+        started = time.perf_counter()
+        updated, success, message, _ = bulk_update_status('completed', filters={'booking_date': bulk_night,
+                                                                              'status': 'confirmed'})
+        elapsed = time.perf_counter() - started
+        if not success:
+            print(message)
+            return 1
+        print(f"{'bulk_update_status':<22} {args.bookings:>9} {updated:>8} {elapsed * 1000:>9.1f}")
+
+        bookings = Booking.query.filter_by(booking_date=single_night).all()
+        started = time.perf_counter()
+        for booking in bookings:
+            update_booking_status(booking, 'completed')
+        single_elapsed = time.perf_counter() - started
+        print(f"{'update_booking_status':<22} {args.bookings:>9} {len(bookings):>8} {single_elapsed * 1000:>9.1f}")
+
+        audited = AuditLog.query.filter_by(action='update_booking_status_completed').count()
+        print(f"\n{audited} audit entries, {single_elapsed / elapsed:.0f}x faster in bulk")
+
+    return 0 if elapsed < 1 else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,102 @@
+"""
+Repeat-caller lookup cost with a large booking history.
+
+Fills a scratch SQLite database with synthetic bookings, builds customer
+profiles with backfill_customers(), then times find_customer() (one read
+on the unique phone index) for known and unknown numbers. For comparison
+it also times the query the call flow would otherwise need: the latest
+booking for the caller's number, which has no index to use.
+
+Usage:
+    python benchmarks/bench_customer_lookup.py [--bookings 1000000] [--callers 200000]
+"""
+import argparse
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def percentile(sorted_values, pct):
+    rank = max(0, min(len(sorted_values) - 1, int(round(pct / 100.0 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[rank]
+
+def timed(fn, args_list):
+    samples = []
+    for args in args_list:
+        started = time.perf_counter()
+        fn(*args)
+        samples.append(time.perf_counter() - started)
+    samples.sort()
+    return samples
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--bookings', type=int, default=1000000)
+    parser.add_argument('--callers', type=int, default=200000)
+    parser.add_argument('--lookups', type=int, default=2000)
+    parser.add_argument('--scan-lookups', type=int, default=20, help='lookups for the unindexed comparison')
+    args = parser.parse_args()
+
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'customers.db')
+    logging.disable(logging.INFO)
+
+    from sqlalchemy import insert, select
+    from app import app, db
+    from models import Booking
+    from services.customer_service import backfill_customers, find_customer
+
+    rng = random.Random(1)
+    phones = [f"+1{rng.randint(201, 989)}{rng.randint(200, 999)}{rng.randint(0, 9999):04d}" for _ in range(args.callers)]
+    today = date.today()
+
+    with app.app_context():
+        started = time.perf_counter()
+        batch = []
+        for i in range(args.bookings):
+            batch.append({
+                'restaurant_id': 1, 'customer_name': f"Caller {i % args.callers}",
+                'customer_phone': phones[i % args.callers], 'party_size': rng.randint(1, 8),
+                'booking_date': today - timedelta(days=rng.randint(0, 720)), 'booking_time': '19:00',
+                'status': 'completed', 'created_at': datetime.utcnow(), 'updated_at': datetime.utcnow(),
+            })
+            if len(batch) == 10000:
+                db.session.execute(insert(Booking), batch)
+                batch = []
+        if batch:
+            db.session.execute(insert(Booking), batch)
+        db.session.commit()
+        print(f"inserted {args.bookings} bookings in {time.perf_counter() - started:.1f}s")
+
+        started = time.perf_counter()
+        created = backfill_customers()
+        print(f"backfilled {created} profiles in {time.perf_counter() - started:.1f}s")
+
+        known = [(rng.choice(phones),) for _ in range(args.lookups)]
+        unknown = [(f"+1555{rng.randint(0, 9999999):07d}",) for _ in range(args.lookups)]
+        assert all(find_customer(phone) for phone, in known[:50])
+
+        def latest_booking(phone):
+            return db.session.execute(
+                select(Booking.customer_name, Booking.party_size)
+                .where(Booking.customer_phone == phone)
+                .order_by(Booking.id.desc()).limit(1)
+            ).first()
+
+        print(f"\n{'lookup':<32} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+        for name, fn, calls in [
+            ('find_customer (known)', find_customer, known),
+            ('find_customer (unknown)', find_customer, unknown),
+            ('latest booking scan (known)', latest_booking, known[:args.scan_lookups]),
+        ]:
+            samples = timed(fn, calls)
+            print(f"{name:<32} {percentile(samples, 50) * 1000:>8.3f} {percentile(samples, 99) * 1000:>8.3f} "
+                  f"{samples[-1] * 1000:>8.3f}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
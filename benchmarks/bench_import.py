@@ -0,0 +1,91 @@
+"""
+Bulk booking import throughput.
+
+Writes synthetic bookings (with a sprinkling of invalid rows) to a CSV and
+a JSONL file, imports each into a scratch SQLite database with
+import_bookings(), and reports rows per second. For comparison it also
+times create_booking(), the one-booking-at-a-time path, on a small sample.
+
+Usage:
+    python benchmarks/bench_import.py [--rows 200000] [--batch-size 5000]
+"""
+import argparse
+import csv
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+FIELDS = ['customer_name', 'customer_phone', 'customer_email', 'party_size',
+          'booking_date', 'booking_time', 'special_requests', 'status']
+
+def synthetic_rows(count, seed=1, invalid_every=500):
+    rng = random.Random(seed)
+    first = date.today() - timedelta(days=365)
+    for i in range(count):
+        row = {
+            'customer_name': f"Guest {i}",
+            'customer_phone': f"+1{rng.randint(201, 989)}{rng.randint(200, 999)}{rng.randint(0, 9999):04d}",
+            'customer_email': f"guest{i}@example.com" if i % 3 else '',
+            'party_size': rng.randint(1, 8),
+            'booking_date': (first + timedelta(days=rng.randint(0, 540))).isoformat(),
+            'booking_time': f"{rng.randint(11, 21):02d}:{rng.choice(['00', '15', '30', '45'])}",
+            'special_requests': 'Window seat' if i % 7 == 0 else '',
+            'status': rng.choice(['completed', 'completed', 'confirmed', 'canceled'])
+        }
+        if invalid_every and i % invalid_every == invalid_every - 1:
+            row['booking_time'] = '7pm'
+        yield row
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=200000)
+    parser.add_argument('--batch-size', type=int, default=5000)
+    parser.add_argument('--single', type=int, default=200, help='bookings for the create_booking comparison')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(workdir, 'import.db')
+    logging.disable(logging.WARNING)
+
+    csv_path = os.path.join(workdir, 'bookings.csv')
+    with open(csv_path, 'w', newline='') as out:
+        writer = csv.DictWriter(out, FIELDS)
+        writer.writeheader()
+        writer.writerows(synthetic_rows(args.rows))
+
+    jsonl_path = os.path.join(workdir, 'bookings.jsonl')
+    with open(jsonl_path, 'w') as out:
+        for row in synthetic_rows(args.rows, seed=2):
+            out.write(json.dumps(row) + '\n')
+
+    from app import app
+    from services.booking_service import create_booking
+    from services.import_service import import_bookings
+
+    with app.app_context():
+        print(f"{'path':<22} {'rows':>8} {'imported':>9} {'rejected':>9} {'seconds':>8} {'rows/s':>9}")
+        for name, path, fmt in [('import csv', csv_path, 'csv'), ('import jsonl', jsonl_path, 'jsonl')]:
+            started = time.perf_counter()
+            with open(path, encoding='utf-8-sig', newline='') as stream:
+                result = import_bookings(stream, fmt, batch_size=args.batch_size, source=name)
+            elapsed = time.perf_counter() - started
+            print(f"{name:<22} {args.rows:>8} {result.imported:>9} {result.rejected:>9} {elapsed:>8.2f} "
+                  f"{args.rows / elapsed:>9.0f}")
+
+        started = time.perf_counter()
+        for row in synthetic_rows(args.single, seed=3, invalid_every=0):
+            create_booking(dict(row, restaurant_id=1,
+                                booking_date=date.today() + timedelta(days=400 + int(row['party_size']))))
+        elapsed = time.perf_counter() - started
+        print(f"{'create_booking':<22} {args.single:>8} {'':>9} {'':>9} {elapsed:>8.2f} {args.single / elapsed:>9.0f}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
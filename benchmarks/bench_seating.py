@@ -0,0 +1,112 @@
+"""
+Table assignment speed and packing.
+
+Builds a floor of two-, four-, six- and eight-tops (some of which can be
+pushed together) and a busy day of parties, then times:
+
+  - "can N sit at T?" lookups against a seated day (DaySeating.find)
+  - re-optimising the whole day's seating (optimise_day)
+
+It also reports how many parties the tables seat compared with how many
+a single capacity number would have admitted.
+
+Usage:
+    python benchmarks/bench_seating.py [--parties 260] [--lookups 200000] [--runs 50]
+"""
+import argparse
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DURATION_MINUTES = 90
+
+# (name prefix, count, seats, min seats, join group)
+FLOOR = [
+    ('B', 6, 2, 1, None),       # bar two-tops
+    ('W', 8, 2, 1, 'window'),   # window two-tops, pushed together for fours and sixes
+    ('M', 10, 4, 2, 'main'),    # main room four-tops
+    ('S', 5, 6, 4, None),
+    ('L', 2, 8, 6, None),
+]
+
+def build_tables():
+    from models import RestaurantTable
+
+    tables = []
+    for prefix, count, seats, min_seats, join_group in FLOOR:
+        for position in range(count):
+            tables.append(RestaurantTable(id=len(tables) + 1, name=f"{prefix}{position + 1}", seats=seats,
+                                          min_seats=min_seats, join_group=join_group, position=position))
+    return tables
+
+def synthetic_parties(count, seed=1):
+    rng = random.Random(seed)
+    sizes = [1] * 4 + [2] * 40 + [3] * 12 + [4] * 24 + [5] * 6 + [6] * 7 + [7] * 3 + [8] * 3 + [10] * 1
+    times = [f"{hour:02d}:{minute:02d}" for hour in range(11, 22) for minute in (0, 15, 30, 45)]
+    # Most parties want dinner
+    weights = [3 if '18:00' <= t <= '20:30' else 1 for t in times]
+    return [(number, rng.choices(times, weights)[0], rng.choice(sizes)) for number in range(count)]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--parties', type=int, default=260, help='parties asking for the day')
+    parser.add_argument('--lookups', type=int, default=200000)
+    parser.add_argument('--runs', type=int, default=50, help='full-day optimisations to time')
+    args = parser.parse_args()
+
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'seating.db')
+    logging.disable(logging.WARNING)
+
+    from app import app
+    from services.occupancy_service import DayOccupancy
+    from services.seating_service import FloorPlan, optimise_day
+
+    with app.app_context():
+        tables = build_tables()
+        plan = FloorPlan(tables)
+        parties = synthetic_parties(args.parties)
+        total_seats = sum(table.seats for table in tables)
+        print(f"{len(tables)} tables, {total_seats} seats, {len(plan.options)} seating options, "
+              f"{len(parties)} parties, {DURATION_MINUTES} min per booking\n")
+
+        timings = []
+        for _ in range(args.runs):
+            started = time.perf_counter()
+            result = optimise_day(plan, parties, DURATION_MINUTES)
+            timings.append(time.perf_counter() - started)
+        timings.sort()
+        print(f"optimise_day     median {timings[len(timings) // 2] * 1000:7.2f} ms   "
+              f"max {timings[-1] * 1000:7.2f} ms   ({args.runs} runs)")
+
+        rng = random.Random(2)
+        queries = [(f"{rng.randint(11, 21):02d}:{rng.choice(['00', '15', '30', '45'])}", rng.randint(1, 10))
+                   for _ in range(args.lookups)]
+        day = result.day
+        started = time.perf_counter()
+        for booking_time, party_size in queries:
+            day.find(booking_time, party_size)
+        elapsed = time.perf_counter() - started
+        print(f"find             {elapsed / args.lookups * 1e6:7.2f} us per lookup ({args.lookups} lookups)")
+
+        # The same parties admitted by one capacity number, first come first served
+        occupancy = DayOccupancy(DURATION_MINUTES)
+        by_capacity = 0
+        for _, booking_time, party_size in parties:
+            if occupancy.peak(booking_time) + party_size <= total_seats:
+                occupancy.add(booking_time, party_size)
+                by_capacity += 1
+
+        seated = len(parties) - len(result.unseated)
+        print(f"\nseated at tables {seated:>4} of {len(parties)}")
+        print(f"capacity only    {by_capacity:>4} of {len(parties)} admitted "
+              f"({by_capacity - seated} more than the tables can actually seat)")
+
+        return 0 if timings[len(timings) // 2] < 0.1 else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,83 @@
+"""
+Microbenchmark for utils/speech_parser.py
+
+Every call turn runs at least one parser, so each must stay well under a
+millisecond per utterance. Exits non-zero if any parser exceeds the budget.
+
+Usage:
+    python benchmarks/bench_speech_parser.py [--iterations N] [--budget-us N]
+"""
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.speech_parser import (  # noqa: E402
+    parse_party_size, parse_date, parse_time, parse_name, parse_confirmation
+)
+
+UTTERANCES = [
+    "four people",
+    "a table for two please",
+    "uh just me and my wife",
+    "party of six on the twenty first of november at 6:30",
+    "table for four tomorrow at 7pm, name's Sam",
+    "next friday",
+    "the 5th of june",
+    "seven thirty p.m.",
+    "half past eight in the evening",
+    "hi my name is Maria Gonzalez and I'd like to book a table",
+    "yes that's right",
+    "no that's not correct",
+    "",
+    "I'm not sure, maybe around 8",
+    "can we do October 18th at 7",
+]
+
+PARSERS = [
+    ('parse_party_size', parse_party_size),
+    ('parse_date', parse_date),
+    ('parse_time', parse_time),
+    ('parse_name', parse_name),
+    ('parse_confirmation', parse_confirmation),
+]
+
+def bench(parser, iterations):
+    """Best-of-5 mean microseconds per utterance"""
+    def run():
+        for utterance in UTTERANCES:
+            parser(utterance)
+
+    timings = timeit.repeat(run, number=iterations, repeat=5)
+    return min(timings) / (iterations * len(UTTERANCES)) * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=2000)
+    parser.add_argument('--budget-us', type=float, default=100.0,
+                        help='maximum allowed mean microseconds per utterance per parser')
+    args = parser.parse_args()
+
+    print(f"{len(UTTERANCES)} utterances x {args.iterations} iterations")
+    print(f"{'parser':<20} {'us/utterance':>14}")
+
+    total = 0.0
+    over_budget = []
+    for name, func in PARSERS:
+        per_call = bench(func, args.iterations)
+        total += per_call
+        print(f"{name:<20} {per_call:>14.2f}")
+        if per_call > args.budget_us:
+            over_budget.append(name)
+
+    print(f"{'all parsers':<20} {total:>14.2f}")
+
+    if over_budget:
+        print(f"Over budget ({args.budget_us} us): {', '.join(over_budget)}")
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
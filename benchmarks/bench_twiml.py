@@ -0,0 +1,89 @@
+"""
+Per-turn TwiML serialization cost: twilio.twiml builders vs utils/twiml_cache.py
+
+Checks that both produce identical documents, then times each for a fixed
+prompt (greeting), a parametrised prompt (confirmation) and a goodbye.
+
+Usage:
+    python benchmarks/bench_twiml.py [--iterations N]
+"""
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from twilio.twiml.voice_response import VoiceResponse, Gather  # noqa: E402
+from utils.twiml_cache import TwimlRenderer  # noqa: E402
+
+TURN_URL = '/twilio/turn'
+VOICE = 'Polly.Matthew'
+
+GREETING = (
+    "Welcome to our restaurant booking system. "
+    "My name is Alex, and I'll help you make a reservation. "
+    "What's your name?"
+)
+CONFIRMATION = [
+    "Great, I have a table for 4 on Saturday, October 24 at 19:30. "
+    "Is this correct, Sam & Alex? Please say yes or no."
+]
+ALTERNATIVES = [
+    "I'm sorry, that time is not available. Here are some alternative times: ",
+    "Option 1: 19:00", "Option 2: 20:00", "Option 3: 18:30",
+    "Please say the time you would prefer, or say 'none' to try another date.",
+]
+GOODBYE = "Excellent! Your reservation has been confirmed. Goodbye!"
+
+PARTIAL_URL = '/twilio/partial?restaurant_id=1&date=2026-10-24'
+
+def builder_gather(messages, partial_result_url=None):
+    """What the webhook did before: build verb objects and serialize them"""
+    response = VoiceResponse()
+    gather = Gather(input='speech', action=TURN_URL, timeout=5, speech_timeout='auto',
+                    partial_result_callback=partial_result_url)
+    for message in messages:
+        gather.say(message, voice=VOICE)
+    response.append(gather)
+    response.redirect(TURN_URL)
+    return str(response).encode('utf-8')
+
+def builder_hangup(messages):
+    response = VoiceResponse()
+    for message in messages:
+        response.say(message, voice=VOICE)
+    response.hangup()
+    return str(response).encode('utf-8')
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=20000)
+    args = parser.parse_args()
+
+    renderer = TwimlRenderer(TURN_URL, VOICE)
+    renderer.precompile(gather_messages=[GREETING], hangup_messages=[GOODBYE])
+
+    cases = [
+        ('greeting (static)', lambda: builder_gather([GREETING]), lambda: renderer.gather([GREETING])),
+        ('confirmation (template)', lambda: builder_gather(CONFIRMATION), lambda: renderer.gather(CONFIRMATION)),
+        ('alternatives (template)', lambda: builder_gather(ALTERNATIVES), lambda: renderer.gather(ALTERNATIVES)),
+        ('time prompt (partials)', lambda: builder_gather(CONFIRMATION, PARTIAL_URL),
+         lambda: renderer.gather(CONFIRMATION, PARTIAL_URL)),
+        ('goodbye (static)', lambda: builder_hangup([GOODBYE]), lambda: renderer.hangup([GOODBYE])),
+    ]
+
+    for name, before, after in cases:
+        if before() != after():
+            print(f"MISMATCH for {name}:\n  {before()!r}\n  {after()!r}")
+            return 1
+
+    print(f"{'response':<26} {'builder us':>11} {'cached us':>10} {'speedup':>8}")
+    for name, before, after in cases:
+        before_us = min(timeit.repeat(before, number=args.iterations, repeat=5)) / args.iterations * 1e6
+        after_us = min(timeit.repeat(after, number=args.iterations, repeat=5)) / args.iterations * 1e6
+        print(f"{name:<26} {before_us:>11.2f} {after_us:>10.2f} {before_us / after_us:>7.0f}x")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,243 @@
+"""
+Drive the media stream call flow with synthetic Twilio Media Stream traffic.
+
+Each simulated call sends the 'connected' and 'start' events, then "speaks"
+each scripted answer as a tone burst of 20 ms mu-law frames followed by
+silence, exactly as Twilio would forward a caller's audio. The scripted
+speech-to-text backend returns the answer text for each burst, so the whole
+booking runs without Twilio, Whisper or ElevenLabs. Marks sent by the server
+are echoed back the way Twilio does once a prompt has played.
+
+Reply latency is the configured end-of-speech silence plus the time the
+server took to answer the frame that ended the utterance. With --realtime
+frames are paced at 20 ms and the latency is measured on the wall clock.
+
+By default the session runs in-process against a scratch SQLite database.
+Pass --url to drive a running server's /twilio/media-stream WebSocket
+(requires simple-websocket and MEDIA_STREAM_STT=scripted on the server).
+
+Usage:
+    python benchmarks/fake_media_stream.py --calls 20
+    python benchmarks/fake_media_stream.py --url ws://localhost:5000/twilio/media-stream --realtime
+"""
+import argparse
+import base64
+import json
+import logging
+import math
+import os
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.mulaw import BYTES_PER_MS, MULAW_SILENCE, encode_mulaw  # noqa: E402
+
+FRAME_MS = 20
+FRAME_BYTES = FRAME_MS * BYTES_PER_MS
+
+# Silence streamed after an answer while waiting for the reply
+MAX_WAIT_MS = 3000
+
+SCRIPTS = [
+    ["hi it's Sam, a table for four tomorrow at 7:30 pm", "yes"],
+    ["my name is Maria Gonzalez", "two people", "friday", "8 pm", "yes"],
+    ["this is Priya, we are a party of 6 on saturday", "at 6:30 pm", "yes"],
+    ["John", "a table for three next sunday around 6 pm", "yeah perfect"],
+]
+
+SILENT_FRAME = bytes([MULAW_SILENCE]) * FRAME_BYTES
+
+def tone_frames(text, frequency=220.0, amplitude=6000):
+    """A tone lasting roughly as long as saying the text"""
+    duration_ms = 300 + 60 * len(text.split())
+    samples = [
+        int(amplitude * math.sin(2 * math.pi * frequency * n / (BYTES_PER_MS * 1000)))
+        for n in range(duration_ms * BYTES_PER_MS)
+    ]
+    audio = encode_mulaw(samples)
+    return [audio[i:i + FRAME_BYTES] for i in range(0, len(audio), FRAME_BYTES)]
+
+class InProcessStream:
+    """Feeds events straight into a MediaStreamSession"""
+
+    def __init__(self, app):
+        from services.media_stream_service import MediaStreamSession
+        self.session = MediaStreamSession(app.config)
+        self.outbox = []
+
+    def send(self, message):
+        self.outbox.extend(self.session.handle(message))
+
+    def receive(self):
+        replies, self.outbox = self.outbox, []
+        return replies
+
+    def close(self):
+        pass
+
+class WebSocketStream:
+    """Talks to a running server; replies are collected by a reader thread"""
+
+    def __init__(self, url):
+        from simple_websocket import Client
+        self.ws = Client(url)
+        self.lock = threading.Lock()
+        self.inbox = []
+        self.reader = threading.Thread(target=self._read, daemon=True)
+        self.reader.start()
+
+    def _read(self):
+        try:
+            while True:
+                raw = self.ws.receive()
+                if raw is None:
+                    return
+                with self.lock:
+                    self.inbox.append(json.loads(raw))
+        except Exception:
+            return
+
+    def send(self, message):
+        self.ws.send(json.dumps(message))
+
+    def receive(self):
+        with self.lock:
+            replies, self.inbox = self.inbox, []
+        return replies
+
+    def close(self):
+        self.ws.close()
+
+def run_call(stream, script, args):
+    """
+    Play one scripted call
+
+    Returns:
+        tuple: (completed, [reply latency in seconds per answer])
+    """
+    stream_sid = 'MZ' + uuid.uuid4().hex
+    call_sid = 'CA' + uuid.uuid4().hex
+    stream.send({'event': 'connected', 'protocol': 'Call', 'version': '1.0.0'})
+    stream.send({'event': 'start', 'sequenceNumber': '1', 'streamSid': stream_sid, 'start': {
+        'streamSid': stream_sid, 'callSid': call_sid, 'tracks': ['inbound'],
+        'mediaFormat': {'encoding': 'audio/x-mulaw', 'sampleRate': 8000, 'channels': 1},
+        'customParameters': {'From': '+15551234567', 'transcript': '|'.join(script)},
+    }})
+
+    latencies = []
+    hung_up = False
+
+    def pump():
+        """Echo marks back; returns True once a reply has arrived"""
+        nonlocal hung_up
+        replied = False
+        for message in stream.receive():
+            if message.get('event') == 'mark':
+                replied = True
+                name = message['mark']['name']
+                hung_up = hung_up or name == 'hangup'
+                stream.send({'event': 'mark', 'streamSid': stream_sid, 'mark': {'name': name}})
+        return replied
+
+    def media(frame):
+        stream.send({'event': 'media', 'streamSid': stream_sid, 'media': {
+            'track': 'inbound', 'payload': base64.b64encode(frame).decode('ascii')
+        }})
+        if args.realtime:
+            time.sleep(FRAME_MS / 1000.0)
+
+    # Wait for the greeting
+    deadline = time.monotonic() + 5
+    while not pump() and time.monotonic() < deadline:
+        time.sleep(0.005)
+
+    for answer in script:
+        if hung_up:
+            break
+        for frame in tone_frames(answer):
+            media(frame)
+        speech_ended = time.perf_counter()
+
+        for silent_ms in range(0, MAX_WAIT_MS, FRAME_MS):
+            sent = time.perf_counter()
+            media(SILENT_FRAME)
+            if args.url:
+                time.sleep(0.001)
+            if pump():
+                if args.realtime:
+                    latencies.append(time.perf_counter() - speech_ended)
+                else:
+                    latencies.append(args.end_silence_ms / 1000.0 + time.perf_counter() - sent)
+                break
+
+    # The goodbye mark may still be in flight over a socket
+    deadline = time.monotonic() + 2
+    while not hung_up and args.url and time.monotonic() < deadline:
+        pump()
+        time.sleep(0.01)
+
+    stream.send({'event': 'stop', 'streamSid': stream_sid, 'stop': {'callSid': call_sid}})
+    stream.close()
+    return hung_up, latencies
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(round(pct / 100.0 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[rank]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--calls', type=int, default=20)
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--url', help='ws:// URL of a running server; in-process when omitted')
+    parser.add_argument('--realtime', action='store_true', help='pace frames at 20 ms like a live call')
+    parser.add_argument('--end-silence-ms', type=int, default=400, help='must match the server setting')
+    args = parser.parse_args()
+
+    app = None
+    if not args.url:
+        os.environ.setdefault('DATABASE_URL', 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'stream.db'))
+        os.environ['MEDIA_STREAM_STT'] = 'scripted'
+        os.environ['MEDIA_STREAM_TTS'] = 'none'
+        os.environ['MEDIA_STREAM_END_SILENCE_MS'] = str(args.end_silence_ms)
+        logging.disable(logging.INFO)
+        from app import app
+
+    results = []
+    results_lock = threading.Lock()
+
+    def worker(i):
+        script = SCRIPTS[i % len(SCRIPTS)]
+        try:
+            if app is not None:
+                with app.app_context():
+                    outcome = run_call(InProcessStream(app), script, args)
+            else:
+                outcome = run_call(WebSocketStream(args.url), script, args)
+        except Exception as e:
+            print(f"call {i} failed: {type(e).__name__}: {e}")
+            outcome = (False, [])
+        with results_lock:
+            results.append(outcome)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        list(pool.map(worker, range(args.calls)))
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(latency for _, call_latencies in results for latency in call_latencies)
+    completed = sum(1 for hung_up, _ in results if hung_up)
+    print(f"{args.calls} calls in {elapsed:.1f}s, {completed} completed, {len(latencies)} replies")
+    print(f"reply latency ms: p50 {percentile(latencies, 50) * 1000:.0f}  p95 {percentile(latencies, 95) * 1000:.0f}  "
+          f"p99 {percentile(latencies, 99) * 1000:.0f}  max {(latencies[-1] if latencies else 0) * 1000:.0f}  "
+          f"(includes {args.end_silence_ms} ms end-of-speech silence)")
+    return 0 if completed == args.calls else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,315 @@
+"""
+Load-test the Twilio call flow with many simulated concurrent callers.
+
+Each simulated call posts to /twilio/incoming-call and then answers every
+prompt through /twilio/turn the way a caller would, with a realistic
+CallSid, From number and SpeechResult. Callers sometimes mumble (forcing a
+retry), sometimes ask for a fully booked time (forcing the alternative
+time stage) and sometimes give every detail in their first answer. Some
+calls come from a small pool of numbers, so later calls from the same
+number take the repeat-caller path. Like Twilio, every webhook carries an
+I-Twilio-Idempotency-Token, and some are delivered twice to check that the
+retry gets the same reply. The next stage is inferred from the prompt text, so the
+harness follows the server rather than a fixed script.
+
+By default the app runs in-process through the Flask test client against
+a scratch SQLite database; that mode also counts SQL statements per
+stage. Pass --url to drive a running server over HTTP instead.
+
+Usage:
+    python benchmarks/load_test_calls.py --calls 2000 --concurrency 50
+    python benchmarks/load_test_calls.py --url http://localhost:5000 --calls 500
+"""
+import argparse
+import logging
+import os
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Twilio abandons a webhook that takes longer than this
+TWILIO_DEADLINE_SECONDS = 15.0
+
+MAX_TURNS_PER_CALL = 25
+
+ANSWERS = {
+    'name': [
+        "my name is Sam", "this is Maria Gonzalez", "hi it's Priya", "John Smith",
+        "my name is Olusegun Adeyemi", "Chen", "this is Sarah O'Brien",
+        # Callers who volunteer everything skip straight to confirmation
+        "hi it's Sam, a table for four tomorrow at 7:30 pm",
+        "this is Maria, we're a party of two on friday around 8 pm",
+    ],
+    'party_size': [
+        "four people", "a table for two please", "just me", "party of six",
+        "3", "me and my wife", "there will be eight of us", "two",
+    ],
+    'date': [
+        "tomorrow", "today", "friday", "saturday", "next sunday",
+        "the day after tomorrow", "in three days",
+    ],
+    'time': [
+        "7:30 pm", "six pm", "8 pm", "half past six", "at 6:30", "seven thirty",
+        "5 pm", "around 9",
+    ],
+    'alternative_time': ["the first one", "7:30 pm", "6 pm", "at 8", "none"],
+    'party_size_check': ["yes", "that's right"],
+    'confirmation': ["yes", "yes that's right", "correct", "yeah perfect"],
+}
+
+# Times the mock slot generator marks as taken; used to exercise alternatives
+BUSY_TIMES = ["7 pm", "8:30 pm", "12 pm", "1:30 pm"]
+
+MUMBLES = ["uh", "what", "sorry can you repeat that", "hmm hang on"]
+
+# (pattern in the prompt, stage the caller is being asked about), first match wins
+PROMPT_STAGES = [
+    (re.compile(r"is this correct", re.I), 'confirmation'),
+    (re.compile(r"just to check", re.I), 'party_size_check'),
+    (re.compile(r"alternative times|available times again|times are available", re.I), 'alternative_time'),
+    (re.compile(r"your name", re.I), 'name'),
+    (re.compile(r"how many people|number of people", re.I), 'party_size'),
+    (re.compile(r"what date|the date|which day", re.I), 'date'),
+    (re.compile(r"what time|the time|business hours", re.I), 'time'),
+]
+
+SAY_RE = re.compile(r"<Say[^>]*>(.*?)</Say>", re.S)
+GATHER_RE = re.compile(r"<Gather[^>]*action=\"([^\"]+)\"")
+PARTIAL_RE = re.compile(r"partialResultCallback=\"([^\"]+)\"")
+
+class Recorder:
+    """Thread-safe collection of per-stage samples"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)   # stage -> [seconds]
+        self.queries = defaultdict(list)     # stage -> [statement count]
+        self.errors = defaultdict(int)       # kind -> count
+        self.outcomes = defaultdict(int)     # booked / duplicate / failed / abandoned
+        self.requests = 0
+
+    def sample(self, stage, seconds, queries):
+        with self.lock:
+            self.requests += 1
+            self.latencies[stage].append(seconds)
+            if queries is not None:
+                self.queries[stage].append(queries)
+            if seconds > TWILIO_DEADLINE_SECONDS:
+                self.errors['deadline'] += 1
+
+    def error(self, kind):
+        with self.lock:
+            self.errors[kind] += 1
+
+    def outcome(self, kind):
+        with self.lock:
+            self.outcomes[kind] += 1
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(round(pct / 100.0 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[rank]
+
+def infer_stage(prompt):
+    for pattern, stage in PROMPT_STAGES:
+        if pattern.search(prompt):
+            return stage
+    return 'unknown'
+
+# Numbers that call again; their later calls are greeted by name
+REPEAT_CALLER_POOL = 100
+
+def choose_answer(stage, rng, retry_rate, busy_rate, prompt=''):
+    if rng.random() < retry_rate:
+        return rng.choice(MUMBLES)
+    if stage == 'party_size' and ' again?' in prompt:
+        return rng.choice(["yes please", "yes", "yes, tomorrow at 7:30 pm"])
+    if stage == 'time' and rng.random() < busy_rate:
+        return rng.choice(BUSY_TIMES)
+    return rng.choice(ANSWERS.get(stage, ["yes"]))
+
+class InProcessClient:
+    """Flask test client wrapper that counts SQL statements per request"""
+
+    def __init__(self, database_url):
+        os.environ['DATABASE_URL'] = database_url
+        logging.disable(logging.INFO)
+
+        from sqlalchemy import event
+        from app import app, db
+
+        self.app = app
+        self._local = threading.local()
+
+        with app.app_context():
+            engine = db.engine
+
+        @event.listens_for(engine, 'before_cursor_execute')
+        def _count(conn, cursor, statement, parameters, context, executemany):
+            self._local.count = getattr(self._local, 'count', 0) + 1
+
+    def post(self, path, data, headers=None):
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = self.app.test_client()
+        before = getattr(self._local, 'count', 0)
+        response = client.post(path, data=data, headers=headers)
+        return response.status_code, response.get_data(as_text=True), getattr(self._local, 'count', 0) - before
+
+class HttpClient:
+    """Drives a running server; SQL statements can't be counted from outside"""
+
+    def __init__(self, base_url):
+        import requests
+        self.base_url = base_url.rstrip('/')
+        self._local = threading.local()
+        self._requests = requests
+
+    def post(self, path, data, headers=None):
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._local.session = self._requests.Session()
+        response = session.post(self.base_url + path, data=data, headers=headers,
+                                timeout=TWILIO_DEADLINE_SECONDS * 2)
+        return response.status_code, response.text, None
+
+def simulate_call(client, recorder, seed, args):
+    rng = random.Random(seed)
+    call_sid = 'CA' + uuid.UUID(int=rng.getrandbits(128)).hex
+    if rng.random() < args.repeat_rate:
+        caller = f"+1555010{rng.randrange(REPEAT_CALLER_POOL):04d}"
+    else:
+        caller = f"+1{rng.randint(201, 989)}{rng.randint(200, 999)}{rng.randint(0, 9999):04d}"
+    params = {'CallSid': call_sid, 'From': caller, 'To': '+15005550006', 'CallStatus': 'in-progress'}
+
+    path, stage, speech = '/twilio/incoming-call', 'incoming_call', None
+    for _ in range(MAX_TURNS_PER_CALL):
+        data = dict(params)
+        if speech is not None:
+            data['SpeechResult'] = speech
+            data['Confidence'] = f"{rng.uniform(0.6, 0.98):.2f}"
+
+        headers = {'I-Twilio-Idempotency-Token': uuid.UUID(int=rng.getrandbits(128)).hex}
+        started = time.perf_counter()
+        try:
+            status, body, queries = client.post(path, data, headers)
+        except Exception as e:
+            recorder.error(type(e).__name__)
+            recorder.outcome('failed')
+            return
+        recorder.sample(stage, time.perf_counter() - started, queries)
+
+        # Twilio redelivers a webhook it thinks timed out; the retry must not run the turn again
+        if rng.random() < args.redelivery_rate:
+            started = time.perf_counter()
+            try:
+                _, replay_body, replay_queries = client.post(path, data, headers)
+            except Exception as e:
+                recorder.error(type(e).__name__)
+                replay_body, replay_queries = body, None
+            recorder.sample('redelivery', time.perf_counter() - started, replay_queries)
+            if replay_body != body:
+                recorder.error('redelivery_mismatch')
+
+        if status != 200 or '<Response>' not in body:
+            recorder.error(f'http_{status}')
+            recorder.outcome('failed')
+            return
+
+        prompt = ' '.join(SAY_RE.findall(body))
+        gather = GATHER_RE.search(body)
+        if not gather:
+            if 'confirmed' in prompt:
+                recorder.outcome('booked')
+            else:
+                recorder.outcome('duplicate' if 'already have a table' in prompt else 'failed')
+            return
+
+        if args.think_ms:
+            time.sleep(rng.uniform(0.5, 1.5) * args.think_ms / 1000.0)
+
+        path = gather.group(1).replace('&amp;', '&')
+        stage = infer_stage(prompt)
+        speech = choose_answer(stage, rng, args.retry_rate, args.busy_rate, prompt)
+
+        # Twilio posts interim transcripts while the caller is still talking
+        partial = PARTIAL_RE.search(body)
+        if partial:
+            started = time.perf_counter()
+            try:
+                _, _, partial_queries = client.post(partial.group(1).replace('&amp;', '&'),
+                                                    dict(params, UnstableSpeechResult=speech, Stability='0.8'))
+            except Exception as e:
+                recorder.error(type(e).__name__)
+                partial_queries = None
+            recorder.sample('partial', time.perf_counter() - started, partial_queries)
+
+    recorder.outcome('abandoned')
+
+def report(recorder, elapsed, args):
+    print(f"\n{args.calls} calls, concurrency {args.concurrency}, {recorder.requests} webhooks in {elapsed:.1f}s "
+          f"({recorder.requests / elapsed:.0f} req/s)")
+    print(f"{'stage':<18} {'count':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8} {'queries':>8}")
+
+    all_latencies = []
+    for stage in sorted(recorder.latencies):
+        samples = sorted(recorder.latencies[stage])
+        all_latencies.extend(samples)
+        queries = recorder.queries.get(stage)
+        mean_queries = f"{sum(queries) / len(queries):.1f}" if queries else 'n/a'
+        print(f"{stage:<18} {len(samples):>7} {percentile(samples, 50) * 1000:>8.1f} "
+              f"{percentile(samples, 95) * 1000:>8.1f} {percentile(samples, 99) * 1000:>8.1f} "
+              f"{samples[-1] * 1000:>8.1f} {mean_queries:>8}")
+
+    all_latencies.sort()
+    print(f"{'all':<18} {len(all_latencies):>7} {percentile(all_latencies, 50) * 1000:>8.1f} "
+          f"{percentile(all_latencies, 95) * 1000:>8.1f} {percentile(all_latencies, 99) * 1000:>8.1f} "
+          f"{(all_latencies[-1] if all_latencies else 0) * 1000:>8.1f}")
+
+    error_count = sum(recorder.errors.values())
+    print(f"\noutcomes: {dict(recorder.outcomes)}")
+    print(f"errors: {error_count} ({error_count / max(recorder.requests, 1):.2%} of webhooks) {dict(recorder.errors)}")
+    return error_count
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--calls', type=int, default=1000, help='number of simulated calls')
+    parser.add_argument('--concurrency', type=int, default=50, help='calls in flight at once')
+    parser.add_argument('--url', help='base URL of a running server; in-process when omitted')
+    parser.add_argument('--database-url', help='database for in-process mode (default: scratch SQLite file)')
+    parser.add_argument('--think-ms', type=float, default=0, help='mean pause between turns')
+    parser.add_argument('--retry-rate', type=float, default=0.1, help='chance a caller mumbles')
+    parser.add_argument('--busy-rate', type=float, default=0.2, help='chance a caller asks for a taken time')
+    parser.add_argument('--repeat-rate', type=float, default=0.3, help='chance a call comes from a repeat caller')
+    parser.add_argument('--redelivery-rate', type=float, default=0.05, help='chance Twilio sends a webhook twice')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    if args.url:
+        client = HttpClient(args.url)
+    else:
+        database_url = args.database_url or 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'loadtest.db')
+        print(f"in-process against {database_url}")
+        client = InProcessClient(database_url)
+
+    recorder = Recorder()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        for i in range(args.calls):
+            pool.submit(simulate_call, client, recorder, args.seed * 1000003 + i, args)
+    elapsed = time.perf_counter() - started
+
+    return 1 if report(recorder, elapsed, args) else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
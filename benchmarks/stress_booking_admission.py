@@ -0,0 +1,146 @@
+"""
+Stress booking admission with many parallel bookings for the same slot.
+
+Starts several worker processes (like gunicorn workers), each firing
+bookings from many threads at once through create_booking(). Every booking
+asks for the same restaurant, date and time, so they all compete for the
+last seats. Afterwards it checks that no 15-minute bucket holds more
+covers than the restaurant's capacity and that the slot_occupancy counters
+match the confirmed bookings.
+
+The same number of bookings is then spread over different dates, where
+nothing competes, to show what contention on one slot costs in throughput.
+
+Usage:
+    python benchmarks/stress_booking_admission.py [--bookings 400] [--processes 4] [--capacity 60]
+    python benchmarks/stress_booking_admission.py --database-url postgresql://localhost/stress
+"""
+import argparse
+import logging
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+BOOKING_TIME = '19:30'
+
+def percentile(sorted_values, pct):
+    rank = max(0, min(len(sorted_values) - 1, int(round(pct / 100.0 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[rank]
+
+def run_worker(job):
+    """Fire a worker process's bookings from parallel threads; returns (outcome, seconds) per booking"""
+    worker, database_url, bookings, threads, first_date, spread = job
+    os.environ['DATABASE_URL'] = database_url
+    logging.disable(logging.WARNING)
+
+    from app import app
+    from services.booking_service import BOOKING_UNAVAILABLE, create_booking
+
+    rng = random.Random(worker)
+    jobs = [(worker * len(bookings) + i, rng.randint(1, 6)) for i in range(len(bookings))]
+    results = []
+    results_lock = threading.Lock()
+    barrier = threading.Barrier(threads)
+
+    def fire(my_jobs):
+        with app.app_context():
+            barrier.wait()
+            for number, party_size in my_jobs:
+                booking_date = first_date + timedelta(days=number) if spread else first_date
+                started = time.perf_counter()
+                booking, success, message, code = create_booking({
+                    'customer_name': f"Stress {number}",
+                    'customer_phone': f"+1555{number:07d}",
+                    'party_size': party_size,
+                    'booking_date': booking_date,
+                    'booking_time': BOOKING_TIME,
+                    'restaurant_id': 1
+                })
+                elapsed = time.perf_counter() - started
+                outcome = 'admitted' if success else ('full' if code == BOOKING_UNAVAILABLE else message)
+                with results_lock:
+                    results.append((outcome, elapsed))
+
+    pool = [threading.Thread(target=fire, args=(jobs[i::threads],)) for i in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    return results
+
+def run_phase(name, args, first_date, spread):
+    per_worker = args.bookings // args.processes
+    jobs = [(worker, args.database_url, range(per_worker), args.threads, first_date, spread)
+            for worker in range(args.processes)]
+
+    started = time.perf_counter()
+    with multiprocessing.get_context('spawn').Pool(args.processes) as pool:
+        results = [result for worker_results in pool.map(run_worker, jobs) for result in worker_results]
+    elapsed = time.perf_counter() - started
+
+    outcomes = {}
+    for outcome, _ in results:
+        outcomes[outcome] = outcomes.get(outcome, 0) + 1
+    latencies = sorted(seconds for _, seconds in results)
+    print(f"{name:<10} {len(results):>6} bookings in {elapsed:6.2f}s ({len(results) / elapsed:6.0f}/s)  "
+          f"p50 {percentile(latencies, 50) * 1000:6.1f} ms  p99 {percentile(latencies, 99) * 1000:7.1f} ms  "
+          f"{outcomes}")
+    return outcomes
+
+def check_slot(app, capacity, booking_date):
+    """Recount covers per bucket from the bookings and compare with capacity and the counters"""
+    from models import Booking, SlotOccupancy
+    from services.occupancy_service import _load_day
+
+    with app.app_context():
+        recounted = _load_day(1, booking_date).covers
+        counters = {bucket: covers for bucket, covers in
+                    SlotOccupancy.query.filter_by(restaurant_id=1, booking_date=booking_date)
+                    .with_entities(SlotOccupancy.bucket, SlotOccupancy.covers)}
+        admitted = Booking.query.filter_by(booking_date=booking_date, status='confirmed').count()
+
+    peak = max(recounted)
+    mismatched = [bucket for bucket, covers in enumerate(recounted) if counters.get(bucket, 0) != covers]
+    print(f"\n{admitted} bookings admitted for {booking_date} {BOOKING_TIME}: "
+          f"peak {peak} covers, capacity {capacity}")
+    print(f"counters {'match' if not mismatched else 'DIFFER at buckets ' + str(mismatched)} the bookings")
+    return peak <= capacity and not mismatched
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--bookings', type=int, default=400, help='bookings per phase')
+    parser.add_argument('--processes', type=int, default=4, help='worker processes')
+    parser.add_argument('--threads', type=int, default=25, help='threads per process')
+    parser.add_argument('--capacity', type=int, default=60, help='restaurant capacity')
+    parser.add_argument('--database-url', help='database to use (default: scratch SQLite file)')
+    args = parser.parse_args()
+
+    if not args.database_url:
+        args.database_url = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'stress.db')
+    os.environ['DATABASE_URL'] = args.database_url
+    logging.disable(logging.WARNING)
+
+    from app import app, db
+    from models import Restaurant
+
+    with app.app_context():
+        restaurant = db.session.get(Restaurant, 1)
+        restaurant.capacity = args.capacity
+        db.session.commit()
+
+    first_date = date.today() + timedelta(days=30)
+    print(f"{args.processes} processes x {args.threads} threads, capacity {args.capacity}\n")
+    run_phase('one slot', args, first_date, spread=False)
+    run_phase('spread', args, first_date + timedelta(days=1), spread=True)
+
+    return 0 if check_slot(app, args.capacity, first_date) else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -18,25 +18,141 @@ class Restaurant(db.Model):
     def __repr__(self):
         return f"<Restaurant {self.name}>"
 
+class RestaurantTable(db.Model):
+    """A table on the floor; neighbouring tables in a join group can be pushed together"""
+    __tablename__ = 'restaurant_table'
+    id = db.Column(db.Integer, primary_key=True)
+    restaurant_id = db.Column(db.Integer, db.ForeignKey('restaurant.id'), nullable=False, index=True)
+    name = db.Column(db.String(20), nullable=False)
+    seats = db.Column(db.Integer, nullable=False)
+    min_seats = db.Column(db.Integer, default=1, nullable=False)  # smallest party worth seating here
+    join_group = db.Column(db.String(20), nullable=True)  # None: never combined
+    position = db.Column(db.Integer, default=0, nullable=False)  # order within the join group
+    active = db.Column(db.Boolean, default=True, nullable=False)
+    
+    def __repr__(self):
+        return f"<RestaurantTable {self.name} ({self.seats})>"
+
 class Booking(db.Model):
     """Booking model for restaurant reservations"""
     id = db.Column(db.Integer, primary_key=True)
     restaurant_id = db.Column(db.Integer, db.ForeignKey('restaurant.id'), nullable=False)
     customer_name = db.Column(db.String(100), nullable=False)
-    customer_phone = db.Column(db.String(20), nullable=False)
+    customer_phone = db.Column(db.String(20), nullable=False)  # E.164 where it can be normalized
     customer_email = db.Column(db.String(100), nullable=True)
     party_size = db.Column(db.Integer, nullable=False)
     booking_date = db.Column(db.Date, nullable=False)
     booking_time = db.Column(db.String(10), nullable=False)
     special_requests = db.Column(db.Text, nullable=True)
-    status = db.Column(db.String(20), default='confirmed', nullable=False)  # confirmed, canceled, completed
+    status = db.Column(db.String(20), default='confirmed', nullable=False)  # confirmed, canceled, completed, no_show
     calendly_event_id = db.Column(db.String(100), nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    __table_args__ = (
+        # Seats taken per slot are summed by restaurant and date
+        db.Index('ix_booking_restaurant_date', 'restaurant_id', 'booking_date'),
+        # The sweeper finds confirmed bookings that are over by date
+        db.Index('ix_booking_status_date', 'status', 'booking_date'),
+        # New bookings are checked for one already made from the same phone that day
+        db.Index('ix_booking_phone_date', 'customer_phone', 'booking_date', 'status'),
+    )
+    
     def __repr__(self):
         return f"<Booking {self.id} - {self.customer_name}>"
 
+class Customer(db.Model):
+    """Caller profile keyed by normalized phone number, updated with each booking"""
+    id = db.Column(db.Integer, primary_key=True)
+    phone = db.Column(db.String(20), unique=True, nullable=False)  # E.164, see normalize_phone_number
+    name = db.Column(db.String(100), nullable=False)
+    usual_party_size = db.Column(db.Integer, nullable=True)
+    party_size_counts = db.Column(db.Text, nullable=True)  # JSON {"party size": bookings}
+    booking_count = db.Column(db.Integer, default=0, nullable=False)
+    last_booking_at = db.Column(db.DateTime, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return f"<Customer {self.id} - {self.name}>"
+
+class SlotHold(db.Model):
+    """Seats held for a caller between being offered a time and confirming it"""
+    call_sid = db.Column(db.String(64), primary_key=True)  # one hold per call
+    restaurant_id = db.Column(db.Integer, db.ForeignKey('restaurant.id'), nullable=False)
+    booking_date = db.Column(db.Date, nullable=False)
+    booking_time = db.Column(db.String(10), nullable=False)
+    party_size = db.Column(db.Integer, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        db.Index('ix_slot_hold_restaurant_date', 'restaurant_id', 'booking_date'),
+    )
+    
+    def __repr__(self):
+        return f"<SlotHold {self.call_sid} - {self.booking_date} {self.booking_time}>"
+
+class WaitlistEntry(db.Model):
+    """Party waiting for seats to free up around a time, booked when a cancellation makes room"""
+    id = db.Column(db.Integer, primary_key=True)
+    restaurant_id = db.Column(db.Integer, db.ForeignKey('restaurant.id'), nullable=False)
+    customer_name = db.Column(db.String(100), nullable=False)
+    customer_phone = db.Column(db.String(20), nullable=False)
+    customer_email = db.Column(db.String(100), nullable=True)
+    party_size = db.Column(db.Integer, nullable=False)
+    booking_date = db.Column(db.Date, nullable=False)
+    booking_time = db.Column(db.String(10), nullable=False)  # preferred; any time in its window is offered
+    special_requests = db.Column(db.Text, nullable=True)
+    status = db.Column(db.String(20), default='waiting', nullable=False)  # waiting, promoted, canceled
+    booking_id = db.Column(db.Integer, db.ForeignKey('booking.id'), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    promoted_at = db.Column(db.DateTime, nullable=True)
+    
+    __table_args__ = (
+        db.Index('ix_waitlist_restaurant_date_status', 'restaurant_id', 'booking_date', 'status'),
+    )
+    
+    def __repr__(self):
+        return f"<WaitlistEntry {self.id} - {self.customer_name} {self.booking_date} {self.booking_time}>"
+
+class SlotOccupancy(db.Model):
+    """Covers booked per 15-minute bucket, the counter booking admission updates atomically"""
+    restaurant_id = db.Column(db.Integer, db.ForeignKey('restaurant.id'), primary_key=True)
+    booking_date = db.Column(db.Date, primary_key=True)
+    bucket = db.Column(db.Integer, primary_key=True)  # quarter hours past midnight
+    covers = db.Column(db.Integer, default=0, nullable=False)
+    
+    def __repr__(self):
+        return f"<SlotOccupancy {self.restaurant_id} {self.booking_date} {self.bucket}: {self.covers}>"
+
+class CallStageStat(db.Model):
+    """Daily per-stage call funnel counters, incremented as calls progress"""
+    day = db.Column(db.Date, primary_key=True)
+    stage = db.Column(db.String(32), primary_key=True)
+    entries = db.Column(db.Integer, default=0, nullable=False)           # calls that reached the stage
+    retries = db.Column(db.Integer, default=0, nullable=False)           # re-asks after an unusable answer
+    defaults_applied = db.Column(db.Integer, default=0, nullable=False)  # silence answered with a default
+    abandonments = db.Column(db.Integer, default=0, nullable=False)      # hang-ups and give-ups at the stage
+    completions = db.Column(db.Integer, default=0, nullable=False)       # calls that ended in a booking
+    duplicates = db.Column(db.Integer, default=0, nullable=False)        # calls turned away as already booked
+    time_spent_ms = db.Column(db.BigInteger, default=0, nullable=False)  # prompt to answer, summed
+    
+    def __repr__(self):
+        return f"<CallStageStat {self.day} {self.stage}>"
+
+class IdempotencyRecord(db.Model):
+    """Response to a webhook or form post, replayed when the same request is retried"""
+    key = db.Column(db.String(200), primary_key=True)
+    status_code = db.Column(db.Integer, nullable=True)  # None only in a claim not yet committed with its response
+    content_type = db.Column(db.String(100), nullable=True)
+    body = db.Column(db.LargeBinary, nullable=True)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f"<IdempotencyRecord {self.key}>"
+
 class AuditLog(db.Model):
     """Audit log for tracking all system activities"""
     id = db.Column(db.Integer, primary_key=True)
@@ -64,3 +180,13 @@ class VoiceInteraction(db.Model):
     
     def __repr__(self):
         return f"<VoiceInteraction {self.id}>"
+
+class CallSession(db.Model):
+    """Shared conversation state for an in-progress phone call"""
+    call_sid = db.Column(db.String(64), primary_key=True)
+    state_data = db.Column(db.Text, nullable=False)  # JSON encoded conversation state
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+    
+    def __repr__(self):
+        return f"<CallSession {self.call_sid}>"
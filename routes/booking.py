@@ -1,11 +1,22 @@
 import json
 from datetime import datetime, date
-from flask import Blueprint, render_template, request, jsonify, redirect, url_for, flash
+import click
+from flask import Blueprint, render_template, request, jsonify, redirect, url_for, flash, current_app
 from app import db
-from models import Booking, AuditLog
-from services.booking_service import create_booking, update_booking_status
+from models import Booking, AuditLog, WaitlistEntry
+from services.booking_service import (BOOKING_DUPLICATE, BOOKING_INVALID, BOOKING_UNAVAILABLE, bulk_update_status,
+                                      create_booking, update_booking_status)
 from services.notification_service import send_booking_confirmation
 from services.audit_service import log_action
+from services.customer_service import backfill_customers
+from services.idempotency_service import idempotent
+from services.import_service import detect_format, import_bookings, open_text_stream
+from services.restaurant_service import DEFAULT_RESTAURANT_ID, update_restaurant
+from services.search_service import DEFAULT_LIMIT, search_bookings
+from services.seating_service import add_table
+from services.sweeper_service import sweep_past_bookings
+from services.unit_of_work import after_commit
+from services.waitlist_service import get_waitlist, join_waitlist, leave_waitlist
 
 booking_bp = Blueprint('booking', __name__)
 
@@ -14,7 +25,15 @@ def booking_page():
     """Render the booking page"""
     return render_template('booking.html')
 
+def _booking_idempotency_key():
+    """Key sent by the booking form, the same for every submission of one booking"""
+    key = request.headers.get('Idempotency-Key', '')
+    if not key or len(key) > 100:
+        return None
+    return f"booking-create:{key}"
+
 @booking_bp.route('/booking/create', methods=['POST'])
+@idempotent(_booking_idempotency_key)
 def create_booking_route():
     """Create a new booking"""
     try:
@@ -30,18 +49,18 @@ def create_booking_route():
         
         # Validate required fields
         if not all([customer_name, customer_phone, party_size, booking_date_str, booking_time]):
-            return jsonify({'success': False, 'message': 'All required fields must be filled'}), 400
+            return jsonify({'success': False, 'code': BOOKING_INVALID, 'message': 'All required fields must be filled'}), 400
         
         # Convert string data to proper types
         try:
             party_size = int(party_size)
             booking_date = datetime.strptime(booking_date_str, '%Y-%m-%d').date()
         except (ValueError, TypeError):
-            return jsonify({'success': False, 'message': 'Invalid data format'}), 400
+            return jsonify({'success': False, 'code': BOOKING_INVALID, 'message': 'Invalid data format'}), 400
         
         # Validate date (no past dates)
         if booking_date < date.today():
-            return jsonify({'success': False, 'message': 'Booking date cannot be in the past'}), 400
+            return jsonify({'success': False, 'code': BOOKING_INVALID, 'message': 'Booking date cannot be in the past'}), 400
         
         # Create booking using service
         booking_data = {
@@ -55,16 +74,21 @@ def create_booking_route():
             'restaurant_id': 1  # Default restaurant ID, would normally come from auth context
         }
         
-        booking, success, message = create_booking(booking_data)
+        booking, success, message, code = create_booking(booking_data)
         
         if success:
             # Send SMS confirmation if requested
             if send_sms and booking:
-                send_booking_confirmation(booking)
+                # Text the guest once the booking is committed, not while its claim holds the lock
+                after_commit(lambda: send_booking_confirmation(booking))
                 
-            return jsonify({'success': True, 'booking_id': booking.id, 'message': 'Booking created successfully'})
+            return jsonify({'success': True, 'code': code, 'booking_id': booking.id,
+                            'message': 'Booking created successfully'})
+        elif code == BOOKING_DUPLICATE:
+            # Point at the booking already made rather than creating another
+            return jsonify({'success': False, 'code': code, 'booking_id': booking.id, 'message': message}), 409
         else:
-            return jsonify({'success': False, 'message': message}), 400
+            return jsonify({'success': False, 'code': code, 'message': message}), 400
             
     except Exception as e:
         # Log the error
@@ -77,6 +101,49 @@ def create_booking_route():
         )
         return jsonify({'success': False, 'message': f'An error occurred: {str(e)}'}), 500
 
+@booking_bp.route('/booking/import', methods=['POST'])
+def import_bookings_route():
+    """Import bookings from an uploaded CSV or JSON Lines file"""
+    upload = request.files.get('file')
+    if upload is None:
+        return jsonify({'success': False, 'message': 'Upload a CSV or JSONL file as "file"'}), 400
+    
+    fmt = request.form.get('format') or detect_format(upload.filename)
+    restaurant_id = request.form.get('restaurant_id', 1, type=int)
+    
+    try:
+        result = import_bookings(open_text_stream(upload.stream), fmt, restaurant_id,
+                                 source=upload.filename or 'upload')
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    except Exception as e:
+        current_app.logger.error(f"Error importing bookings: {str(e)}")
+        return jsonify({'success': False, 'message': f'An error occurred: {str(e)}'}), 500
+    
+    return jsonify({
+        'success': True,
+        'imported': result.imported,
+        'rejected': result.rejected,
+        'errors': result.errors
+    })
+
+@booking_bp.route('/booking/search', methods=['GET'])
+def search_bookings_route():
+    """API endpoint for finding bookings by guest name or phone number"""
+    hits = search_bookings(request.args.get('q', ''), request.args.get('limit', DEFAULT_LIMIT, type=int),
+                           request.args.get('restaurant_id', DEFAULT_RESTAURANT_ID, type=int))
+    return jsonify([{
+        'id': hit.booking.id,
+        'customer_name': hit.booking.customer_name,
+        'customer_phone': hit.booking.customer_phone,
+        'party_size': hit.booking.party_size,
+        'booking_date': hit.booking.booking_date.isoformat(),
+        'booking_time': hit.booking.booking_time,
+        'status': hit.booking.status,
+        'match': hit.match,
+        'score': hit.score
+    } for hit in hits])
+
 @booking_bp.route('/booking/<int:booking_id>', methods=['GET'])
 def view_booking(booking_id):
     """View a single booking"""
@@ -85,7 +152,7 @@ def view_booking(booking_id):
 
 @booking_bp.route('/booking/<action>/<int:booking_id>', methods=['POST'])
 def booking_action(action, booking_id):
-    """Handle booking actions (cancel, confirm, complete)"""
+    """Handle booking actions (cancel, confirm, complete, no-show)"""
     booking = Booking.query.get_or_404(booking_id)
     
     if action == 'cancel':
@@ -94,12 +161,175 @@ def booking_action(action, booking_id):
         status = 'confirmed'
     elif action == 'complete':
         status = 'completed'
+    elif action == 'no-show':
+        status = 'no_show'
     else:
         return jsonify({'success': False, 'message': 'Invalid action'}), 400
     
-    success, message = update_booking_status(booking, status)
+    success, message, code = update_booking_status(booking, status)
     
     if success:
+        if action == 'no-show':
+            return jsonify({'success': True, 'message': 'Booking marked as no-show'})
         return jsonify({'success': True, 'message': f'Booking {action}ed successfully'})
+    elif code in (BOOKING_DUPLICATE, BOOKING_UNAVAILABLE):
+        # The seats have gone, or the guest has booked again, since it was canceled
+        return jsonify({'success': False, 'code': code, 'message': message}), 409
+    else:
+        return jsonify({'success': False, 'code': code, 'message': message}), 400
+
+@booking_bp.route('/booking/bulk-status', methods=['POST'])
+def bulk_status_route():
+    """
+    Change the status of many bookings in one transaction
+
+    Takes JSON {"status": "completed", "ids": [1, 2]} or
+    {"status": "no_show", "filter": {"booking_date": "2025-06-01", "status": "confirmed"}}.
+    """
+    payload = request.get_json(silent=True) or {}
+    status = payload.get('status')
+    booking_ids = payload.get('ids')
+    filters = payload.get('filter') or {}
+    
+    if not status:
+        return jsonify({'success': False, 'message': 'Give the new status'}), 400
+    if not isinstance(filters, dict) or (booking_ids is not None and not isinstance(booking_ids, list)):
+        return jsonify({'success': False, 'message': 'Invalid data format'}), 400
+    
+    try:
+        if booking_ids is not None:
+            booking_ids = [int(booking_id) for booking_id in booking_ids]
+        filters = dict(filters)
+        for key in ('booking_date', 'start_date', 'end_date'):
+            if filters.get(key):
+                filters[key] = datetime.strptime(filters[key], '%Y-%m-%d').date()
+        if filters.get('restaurant_id') is not None:
+            filters['restaurant_id'] = int(filters['restaurant_id'])
+    except (ValueError, TypeError):
+        return jsonify({'success': False, 'message': 'Invalid data format'}), 400
+    
+    updated, success, message, rejected = bulk_update_status(status, booking_ids, filters)
+    
+    if success and rejected and not updated:
+        return jsonify({'success': False, 'updated': 0, 'rejected': rejected, 'message': message}), 409
+    elif success:
+        return jsonify({'success': True, 'updated': updated, 'rejected': rejected, 'message': message})
     else:
         return jsonify({'success': False, 'message': message}), 400
+
+@booking_bp.route('/booking/waitlist', methods=['POST'])
+def join_waitlist_route():
+    """Put a party on the waitlist for a full time"""
+    customer_name = request.form.get('customer_name')
+    customer_phone = request.form.get('customer_phone')
+    party_size = request.form.get('party_size')
+    booking_date_str = request.form.get('booking_date')
+    booking_time = request.form.get('booking_time')
+    
+    if not all([customer_name, customer_phone, party_size, booking_date_str, booking_time]):
+        return jsonify({'success': False, 'message': 'All required fields must be filled'}), 400
+    
+    try:
+        party_size = int(party_size)
+        booking_date = datetime.strptime(booking_date_str, '%Y-%m-%d').date()
+    except (ValueError, TypeError):
+        return jsonify({'success': False, 'message': 'Invalid data format'}), 400
+    
+    if booking_date < date.today():
+        return jsonify({'success': False, 'message': 'Booking date cannot be in the past'}), 400
+    
+    entry, success, message = join_waitlist({
+        'customer_name': customer_name,
+        'customer_phone': customer_phone,
+        'customer_email': request.form.get('customer_email', ''),
+        'party_size': party_size,
+        'booking_date': booking_date,
+        'booking_time': booking_time,
+        'special_requests': request.form.get('special_requests', ''),
+        'restaurant_id': 1  # Default restaurant ID, would normally come from auth context
+    })
+    
+    if success:
+        return jsonify({'success': True, 'waitlist_id': entry.id, 'message': message})
+    else:
+        return jsonify({'success': False, 'message': message}), 400
+
+@booking_bp.route('/booking/waitlist', methods=['GET'])
+def list_waitlist():
+    """API endpoint for parties still waiting on a date"""
+    try:
+        booking_date = datetime.strptime(request.args.get('date', date.today().isoformat()), '%Y-%m-%d').date()
+    except ValueError:
+        return jsonify({'error': 'Invalid date format'}), 400
+    
+    entries = get_waitlist(request.args.get('restaurant_id', 1, type=int), booking_date)
+    return jsonify([{
+        'id': entry.id,
+        'customer_name': entry.customer_name,
+        'customer_phone': entry.customer_phone,
+        'party_size': entry.party_size,
+        'booking_time': entry.booking_time,
+        'created_at': entry.created_at.isoformat()
+    } for entry in entries])
+
+@booking_bp.route('/booking/waitlist/<int:entry_id>/cancel', methods=['POST'])
+def leave_waitlist_route(entry_id):
+    """Take a party off the waitlist"""
+    entry = WaitlistEntry.query.get_or_404(entry_id)
+    success, message = leave_waitlist(entry)
+    
+    if success:
+        return jsonify({'success': True, 'message': message})
+    else:
+        return jsonify({'success': False, 'message': message}), 400
+
+@booking_bp.cli.command('backfill-customers')
+def backfill_customers_command():
+    """Create caller profiles from existing bookings (flask booking backfill-customers)"""
+    created = backfill_customers()
+    print(f"Created {created} customer profiles")
+
+@booking_bp.cli.command('import-bookings')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'jsonl']), help='Defaults to the file extension')
+@click.option('--restaurant-id', default=1, show_default=True)
+@click.option('--batch-size', default=5000, show_default=True)
+def import_bookings_command(path, fmt, restaurant_id, batch_size):
+    """Import bookings from a CSV or JSONL file (flask booking import-bookings FILE)"""
+    with open(path, encoding='utf-8-sig', newline='') as stream:
+        result = import_bookings(stream, fmt or detect_format(path), restaurant_id, batch_size, source=path)
+    
+    print(f"Imported {result.imported} bookings, rejected {result.rejected}")
+    for error in result.errors:
+        print(f"  row {error['row']}: {error['error']}")
+
+@booking_bp.cli.command('add-table')
+@click.argument('name')
+@click.argument('seats', type=int)
+@click.option('--min-seats', default=1, show_default=True, help='Smallest party worth seating at the table')
+@click.option('--join-group', help='Tables in the same group can be pushed together with their neighbours')
+@click.option('--position', default=0, show_default=True, help='Order within the join group')
+@click.option('--restaurant-id', default=1, show_default=True)
+def add_table_command(name, seats, min_seats, join_group, position, restaurant_id):
+    """Add a table to the floor plan (flask booking add-table T1 4 --join-group window)"""
+    table = add_table(restaurant_id, name, seats, min_seats, join_group, position)
+    print(f"Added table {table.name} seating {table.seats}")
+
+@booking_bp.cli.command('update-restaurant')
+@click.option('--opening-time', help='HH:MM')
+@click.option('--closing-time', help='HH:MM')
+@click.option('--capacity', type=int, help='Covers per time slot')
+@click.option('--restaurant-id', default=1, show_default=True)
+def update_restaurant_command(opening_time, closing_time, capacity, restaurant_id):
+    """Change opening hours or capacity (flask booking update-restaurant --capacity 80)"""
+    restaurant, success, message = update_restaurant(restaurant_id, opening_time, closing_time, capacity)
+    if success:
+        print(f"{message}: open {restaurant.opening_time}-{restaurant.closing_time}, {restaurant.capacity} covers")
+    else:
+        print(message)
+
+@booking_bp.cli.command('sweep')
+def sweep_command():
+    """Mark confirmed bookings that are over as completed (flask booking sweep)"""
+    swept = sweep_past_bookings()
+    print(f"Completed {swept} past bookings")
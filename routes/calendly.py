@@ -2,6 +2,7 @@ import os
 from datetime import datetime, timedelta
 from flask import Blueprint, jsonify, request, current_app, render_template, redirect, url_for
 from utils.calendly_helper import get_available_slots, create_calendly_event
+from services.availability_service import get_open_slots, get_availability_cache_stats
 from models import db, Booking, Restaurant
 
 calendly_bp = Blueprint('calendly', __name__)
@@ -55,7 +56,7 @@ def test_calendly_connection():
 @calendly_bp.route('/api/calendly/available-slots', methods=['GET'])
 def get_available_slots_api():
     """
-    Get available slots for a specific date
+    Get slots on a date with room for a party (party_size, default 1)
     """
     date_str = request.args.get('date')
     
@@ -67,10 +68,12 @@ def get_available_slots_api():
     
     try:
         # Validate date format
-        datetime.strptime(date_str, '%Y-%m-%d')
+        booking_date = datetime.strptime(date_str, '%Y-%m-%d').date()
         
-        # Get available slots
-        slots = get_available_slots(date_str)
+        # Get slots that still have room
+        restaurant_id = request.args.get('restaurant_id', 1, type=int)
+        party_size = request.args.get('party_size', 1, type=int)
+        slots = get_open_slots(restaurant_id, booking_date, party_size)
         
         return jsonify({
             'success': True,
@@ -89,4 +92,14 @@ def get_available_slots_api():
         return jsonify({
             'success': False,
             'message': f'Error: {str(e)}'
-        }), 500
\ No newline at end of file
+        }), 500
+
+@calendly_bp.route('/api/availability/cache-stats', methods=['GET'])
+def availability_cache_stats():
+    """
+    Get hit/miss counters for this worker's availability cache
+    """
+    return jsonify({
+        'success': True,
+        'stats': get_availability_cache_stats()
+    })
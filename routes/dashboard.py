@@ -5,6 +5,11 @@ from flask import Blueprint, render_template, request, jsonify, send_file, flash
 from sqlalchemy import func
 from app import db
 from models import Booking, AuditLog, Restaurant, VoiceInteraction
+from services.call_flow_service import CALL_FLOW
+from services.call_stats_service import get_call_funnel
+from services.restaurant_service import DEFAULT_RESTAURANT_ID
+from services.search_service import booking_search_condition
+from services.seating_service import get_seating_plan
 
 dashboard_bp = Blueprint('dashboard', __name__)
 
@@ -15,10 +20,16 @@ def dashboard():
     filter_status = request.args.get('status', '')
     start_date_str = request.args.get('start_date', '')
     end_date_str = request.args.get('end_date', '')
+    search_query = request.args.get('q', '').strip()
     
     # Build query with filters
     query = Booking.query
     
+    if search_query:
+        # Every booking for the guest, so the status and date filters below see them all
+        restaurant_id = request.args.get('restaurant_id', DEFAULT_RESTAURANT_ID, type=int)
+        query = query.filter(booking_search_condition(search_query, restaurant_id))
+    
     if filter_status:
         query = query.filter(Booking.status == filter_status)
     
@@ -40,7 +51,8 @@ def dashboard():
         'dashboard.html', 
         bookings=bookings, 
         stats=stats,
-        filter_status=filter_status
+        filter_status=filter_status,
+        search_query=search_query
     )
 
 @dashboard_bp.route('/dashboard/booking-stats', methods=['GET'])
@@ -86,10 +98,16 @@ def export_csv():
     filter_status = request.args.get('status', '')
     start_date_str = request.args.get('start_date', '')
     end_date_str = request.args.get('end_date', '')
+    search_query = request.args.get('q', '').strip()
     
     # Build query with filters
     query = Booking.query
     
+    if search_query:
+        # Every booking for the guest, so the status and date filters below see them all
+        restaurant_id = request.args.get('restaurant_id', DEFAULT_RESTAURANT_ID, type=int)
+        query = query.filter(booking_search_condition(search_query, restaurant_id))
+    
     if filter_status:
         query = query.filter(Booking.status == filter_status)
     
@@ -237,6 +255,42 @@ def export_audit_logs():
         download_name=f'audit_logs_{timestamp}.csv'
     )
 
+@dashboard_bp.route('/dashboard/call-funnel', methods=['GET'])
+def call_funnel():
+    """API endpoint for per-stage call funnel counters"""
+    # Default to the last 7 days
+    end_date = date.today()
+    start_date = end_date - timedelta(days=6)
+
+    start_date_str = request.args.get('start_date', '')
+    end_date_str = request.args.get('end_date', '')
+    if start_date_str and end_date_str:
+        try:
+            start_date = datetime.strptime(start_date_str, '%Y-%m-%d').date()
+            end_date = datetime.strptime(end_date_str, '%Y-%m-%d').date()
+        except ValueError:
+            return jsonify({'error': 'Invalid date format'}), 400
+
+    return jsonify({
+        'start_date': start_date.isoformat(),
+        'end_date': end_date.isoformat(),
+        'stages': get_call_funnel(start_date, end_date, stage_order=CALL_FLOW.keys())
+    })
+
+@dashboard_bp.route('/dashboard/seating', methods=['GET'])
+def seating():
+    """API endpoint for the tables assigned to a day's bookings"""
+    try:
+        booking_date = datetime.strptime(request.args.get('date', date.today().isoformat()), '%Y-%m-%d').date()
+    except ValueError:
+        return jsonify({'error': 'Invalid date format'}), 400
+
+    plan = get_seating_plan(request.args.get('restaurant_id', 1, type=int), booking_date)
+    if plan is None:
+        return jsonify({'error': 'No tables set up for this restaurant'}), 404
+
+    return jsonify(dict(plan, date=booking_date.isoformat()))
+
 def calculate_booking_stats():
     """Calculate booking statistics for the dashboard"""
     today = date.today()
@@ -0,0 +1,77 @@
+import json
+from flask import Blueprint, request, Response, current_app
+from twilio.twiml.voice_response import VoiceResponse, Connect
+from app import db
+from services.audit_service import log_action
+from services.media_stream_service import MediaStreamSession
+
+# WebSocket support is optional: pip install flask-sock
+try:
+    from flask_sock import Sock
+except ImportError:
+    Sock = None
+
+media_stream_bp = Blueprint('media_stream', __name__)
+
+MEDIA_STREAM_PATH = '/twilio/media-stream'
+
+@media_stream_bp.route('/twilio/stream-call', methods=['GET', 'POST'])
+def stream_call():
+    """Answer a call by connecting its audio to the media stream WebSocket"""
+    caller_number = request.values.get('From', '')
+    call_sid = request.values.get('CallSid', '')
+
+    log_action(
+        'incoming_call',
+        'call',
+        None,
+        f"Incoming streamed call from {caller_number}",
+        json.dumps({'caller': caller_number, 'call_sid': call_sid, 'media_stream': True})
+    )
+
+    response = VoiceResponse()
+    if Sock is None:
+        current_app.logger.error("Media stream requested but flask-sock is not installed")
+        response.redirect('/twilio/incoming-call')
+        return Response(str(response), mimetype='text/xml')
+
+    connect = Connect()
+    stream = connect.stream(url=f"wss://{request.host}{MEDIA_STREAM_PATH}")
+    stream.parameter(name='From', value=caller_number)
+    response.append(connect)
+    response.hangup()
+    return Response(str(response), mimetype='text/xml')
+
+def init_media_streams(app):
+    """
+    Register the media stream WebSocket when flask-sock is available
+
+    Args:
+        app (Flask): Application
+
+    Returns:
+        bool: True if the WebSocket route was registered
+    """
+    if Sock is None:
+        app.logger.info("flask-sock not installed; Twilio media streams are disabled")
+        return False
+
+    sock = Sock(app)
+
+    @sock.route(MEDIA_STREAM_PATH)
+    def media_stream(ws):
+        """Run one call over a Twilio Media Stream"""
+        session = MediaStreamSession(current_app.config)
+        while not session.closed:
+            raw = ws.receive()
+            if raw is None:
+                break
+            try:
+                for message in session.handle(json.loads(raw)):
+                    ws.send(json.dumps(message))
+            except Exception as e:
+                db.session.rollback()
+                current_app.logger.error(f"Error in media stream {session.stream_sid}: {str(e)}")
+                break
+
+    return True
@@ -1,749 +1,161 @@
 import json
-import os
-from datetime import datetime, timedelta
-from flask import Blueprint, request, Response
-from twilio.twiml.voice_response import VoiceResponse, Gather
-from app import db
-from models import Restaurant, Booking, VoiceInteraction
-from services.booking_service import extract_booking_info, create_booking
-from services.voice_service import analyze_sentiment
+from datetime import datetime
+from flask import Blueprint, request, Response, current_app
 from services.audit_service import log_action
-from utils.calendly_helper import get_available_slots
+from services.availability_service import prefetch_slots
+from services.idempotency_service import idempotent
+from app import db
+from services.call_session_service import load_call_state, save_call_state, delete_call_state
+from services.slot_hold_service import release_hold
+from services.unit_of_work import unit_of_work
+from services.call_flow_service import STATIC_PROMPTS, STATIC_GOODBYES, start_call, advance_call, record_hangup
+from utils.speech_parser import parse_date, parse_time
+from utils.twiml_cache import TwimlRenderer
 
 twilio_call_bp = Blueprint('twilio_call', __name__)
 
-# Global conversation state dictionary to track call states
-# In production, this should be stored in a database or Redis
-conversation_states = {}
+TURN_URL = '/twilio/turn'
+PARTIAL_RESULT_URL = '/twilio/partial'
+
+# Stages whose answer needs an availability lookup; their Gather streams
+# interim transcripts so the lookup can start while the caller is talking
+PREFETCH_STAGES = ('date', 'time')
+VOICE = 'Polly.Matthew'
+
+FALLBACK_MESSAGE = (
+    "I'm sorry, there seems to be an issue with our booking system. "
+    "Please try again later or call our restaurant directly during business hours. "
+    "Thank you for your patience."
+)
+
+# TwiML for fixed prompts is rendered once here; the rest comes from byte templates
+twiml = TwimlRenderer(TURN_URL, VOICE)
+twiml.precompile(gather_messages=STATIC_PROMPTS, hangup_messages=STATIC_GOODBYES + [FALLBACK_MESSAGE])
+
+def _partial_result_url(state):
+    """Callback URL carrying what the partial handler needs, so it never reads the call state"""
+    booking_data = state['booking_data']
+    url = f"{PARTIAL_RESULT_URL}?restaurant_id={booking_data.get('restaurant_id', '')}"
+    if booking_data.get('booking_date'):
+        url += f"&date={booking_data['booking_date'].strftime('%Y-%m-%d')}"
+    return url
+
+def _render_turn(messages, gather=True, partial_result_url=None):
+    """Say the messages and either listen for the answer or hang up"""
+    if gather:
+        # Prompts sit inside the Gather so callers can answer before they finish;
+        # on silence Twilio redirects back and the current stage decides what to do
+        body = twiml.gather(messages, partial_result_url)
+    else:
+        body = twiml.hangup(messages)
+    return Response(body, mimetype='text/xml')
+
+def _twilio_idempotency_key():
+    """Twilio sends the same I-Twilio-Idempotency-Token with every retry of a webhook"""
+    call_sid = request.values.get('CallSid')
+    token = request.headers.get('I-Twilio-Idempotency-Token')
+    if not call_sid or not token:
+        return None
+    return f"twilio:{call_sid}:{token[:100]}"
 
 @twilio_call_bp.route('/twilio/incoming-call', methods=['GET', 'POST'])
+@idempotent(_twilio_idempotency_key)
 def incoming_call():
     """Handle incoming Twilio voice calls"""
     # Get the caller's phone number
     caller_number = request.values.get('From', '')
     call_sid = request.values.get('CallSid', '')
     
-    # Create TwiML response
-    response = VoiceResponse()
-    
-    # Log the incoming call
-    log_action(
-        'incoming_call',
-        'call',
-        None,
-        f"Incoming call from {caller_number}",
-        json.dumps({'caller': caller_number, 'call_sid': call_sid})
-    )
-    
-    # Initialize conversation state for this call
-    conversation_states[call_sid] = {
-        'stage': 'greeting',
-        'caller_number': caller_number,
-        'booking_data': {
-            'customer_phone': caller_number,  # Pre-fill phone number
-            'restaurant_id': 1  # Default restaurant
-        }
-    }
-    
-    # Welcome message
-    response.say(
-        "Welcome to our restaurant booking system. "
-        "My name is Alex, and I'll help you make a reservation. "
-        "What's your name?",
-        voice='Polly.Matthew'
-    )
-    
-    gather = Gather(
-        input='speech',
-        action='/twilio/collect-name',
-        timeout=5,
-        speech_timeout='auto'
-    )
-    
-    response.append(gather)
-    
-    # If no input, retry
-    response.redirect('/twilio/incoming-call')
-    
-    return Response(str(response), mimetype='text/xml')
-
-@twilio_call_bp.route('/twilio/collect-name', methods=['GET', 'POST'])
-def collect_name():
-    """Collect the caller's name"""
-    call_sid = request.values.get('CallSid', '')
-    speech_result = request.values.get('SpeechResult', '')
-    
-    # Get the conversation state
-    state = conversation_states.get(call_sid, {
-        'stage': 'greeting',
-        'booking_data': {}
-    })
-    
-    response = VoiceResponse()
-    
-    # Create voice interaction record
-    voice_interaction = VoiceInteraction(
-        transcript=speech_result,
-        response_text="Name collection"
-    )
-    db.session.add(voice_interaction)
-    db.session.commit()
-    
-    # Try to extract the name from speech
-    name_match = None
-    if "my name is" in speech_result.lower():
-        name_match = speech_result.lower().split("my name is")[1].strip()
-    elif "this is" in speech_result.lower():
-        name_match = speech_result.lower().split("this is")[1].strip()
-    else:
-        # Assume the entire speech is the name
-        name_match = speech_result.strip()
-    
-    if name_match:
-        # Store name in state
-        state['booking_data']['customer_name'] = name_match
-        state['stage'] = 'party_size'
-        conversation_states[call_sid] = state
-        
-        # Respond and ask for party size
-        response.say(
-            f"Thanks, {name_match}. How many people will be in your party?",
-            voice='Polly.Matthew'
-        )
-        
-        gather = Gather(
-            input='speech',
-            action='/twilio/collect-party-size',
-            timeout=5,
-            speech_timeout='auto'
-        )
-        response.append(gather)
-    else:
-        # If we couldn't understand, try again
-        response.say(
-            "I'm sorry, I didn't catch your name. Could you please tell me your name?",
-            voice='Polly.Matthew'
+    with unit_of_work():
+        # Log the incoming call
+        log_action(
+            'incoming_call',
+            'call',
+            None,
+            f"Incoming call from {caller_number}",
+            json.dumps({'caller': caller_number, 'call_sid': call_sid})
         )
         
-        gather = Gather(
-            input='speech',
-            action='/twilio/collect-name',
-            timeout=5,
-            speech_timeout='auto'
-        )
-        response.append(gather)
+        # Initialize conversation state for this call; repeat callers skip the name question
+        state, messages = start_call(caller_number)
+        save_call_state(call_sid, state)
     
-    return Response(str(response), mimetype='text/xml')
+    return _render_turn(messages)
 
+# The per-stage URLs are kept so calls in progress during a deploy still land
+# on the dispatcher; the stored stage, not the URL, decides what runs.
+@twilio_call_bp.route('/twilio/turn', methods=['GET', 'POST'])
+@twilio_call_bp.route('/twilio/collect-name', methods=['GET', 'POST'])
 @twilio_call_bp.route('/twilio/collect-party-size', methods=['GET', 'POST'])
-def collect_party_size():
-    """Collect the party size"""
-    call_sid = request.values.get('CallSid', '')
-    speech_result = request.values.get('SpeechResult', '')
-    
-    # Debug logging
-    print(f"DEBUG - Party Size Speech Input: '{speech_result}'")
-    print(f"DEBUG - All request values: {dict(request.values)}")
-    
-    # Get the conversation state
-    state = conversation_states.get(call_sid, {
-        'stage': 'party_size',
-        'booking_data': {}
-    })
-    
-    response = VoiceResponse()
-    
-    # Create voice interaction record
-    voice_interaction = VoiceInteraction(
-        transcript=speech_result,
-        response_text="Party size collection"
-    )
-    db.session.add(voice_interaction)
-    db.session.commit()
-    
-    # Try to extract the party size from speech - enhanced logic
-    speech_lower = speech_result.lower()
-    
-    # Dictionary for word-to-number conversion
-    word_to_num = {
-        'one': 1, 'two': 2, 'three': 3, 'four': 4, 'five': 5,
-        'six': 6, 'seven': 7, 'eight': 8, 'nine': 9, 'ten': 10,
-        'a': 1, 'single': 1, 'couple': 2, 'pair': 2, 'few': 3, 
-        'several': 4, 'many': 6
-    }
-    
-    # First try to find digits using regex
-    import re
-    digit_match = re.search(r'\b(\d+)\b', speech_lower)
-    party_size = int(digit_match.group(1)) if digit_match else None
-    
-    # If no digits found, try to find number words
-    if not party_size:
-        for word, number in word_to_num.items():
-            if word in speech_lower:
-                party_size = number
-                break
-                
-    # Additional patterns for common phrases
-    if not party_size:
-        if "just me" in speech_lower or "only me" in speech_lower or "myself" in speech_lower:
-            party_size = 1
-        elif "me and my" in speech_lower and "wife" in speech_lower or "husband" in speech_lower or "partner" in speech_lower:
-            party_size = 2
-        elif "family" in speech_lower:
-            party_size = 4  # Default family size as fallback
-            
-    # If SpeechResult is empty or very short, it might mean Twilio couldn't recognize the speech
-    # Let's provide a default of 2 people if the speech is empty or very short (less than 3 chars)
-    if not party_size and (not speech_result or len(speech_result.strip()) < 3):
-        party_size = 2  # Default for empty or unrecognized speech
-    
-    if party_size:
-        # Store party size in state
-        state['booking_data']['party_size'] = party_size
-        state['stage'] = 'date'
-        
-        # Make sure we have a restaurant_id
-        if 'restaurant_id' not in state['booking_data']:
-            # Just get the first restaurant as default (or create one if doesn't exist)
-            restaurant = Restaurant.query.first()
-            if not restaurant:
-                # Create a default restaurant if none exists
-                restaurant = Restaurant(
-                    name="Our Restaurant",
-                    phone_number="+11234567890",
-                    address="123 Main St",
-                    opening_time="11:00",
-                    closing_time="22:00",
-                    capacity=100
-                )
-                db.session.add(restaurant)
-                db.session.commit()
-                print(f"DEBUG - Created default restaurant with ID: {restaurant.id}")
-            
-            state['booking_data']['restaurant_id'] = restaurant.id
-            print(f"DEBUG - Using restaurant ID: {restaurant.id}")
-        
-        conversation_states[call_sid] = state
-        
-        # Respond and ask for date
-        response.say(
-            f"Great, a table for {party_size}. What date would you like to book? "
-            "For example, you can say 'today', 'tomorrow', or a specific date.",
-            voice='Polly.Matthew'
-        )
-        
-        gather = Gather(
-            input='speech',
-            action='/twilio/collect-date',
-            timeout=5,
-            speech_timeout='auto'
-        )
-        response.append(gather)
-    else:
-        # If we couldn't understand, try again
-        response.say(
-            "I'm sorry, I didn't catch how many people will be in your party. "
-            "Could you please tell me the number of people?",
-            voice='Polly.Matthew'
-        )
-        
-        gather = Gather(
-            input='speech',
-            action='/twilio/collect-party-size',
-            timeout=5,
-            speech_timeout='auto'
-        )
-        response.append(gather)
-    
-    return Response(str(response), mimetype='text/xml')
-
 @twilio_call_bp.route('/twilio/collect-date', methods=['GET', 'POST'])
-def collect_date():
-    """Collect the booking date"""
-    call_sid = request.values.get('CallSid', '')
-    speech_result = request.values.get('SpeechResult', '')
-    
-    # Get the conversation state
-    state = conversation_states.get(call_sid, {
-        'stage': 'date',
-        'booking_data': {}
-    })
-    
-    response = VoiceResponse()
-    
-    # Create voice interaction record
-    voice_interaction = VoiceInteraction(
-        transcript=speech_result,
-        response_text="Date collection"
-    )
-    db.session.add(voice_interaction)
-    db.session.commit()
-    
-    # Try to extract the date from speech
-    today = datetime.today().date()
-    tomorrow = today + timedelta(days=1)
-    booking_date = None
-    
-    speech_lower = speech_result.lower()
-    
-    if "today" in speech_lower:
-        booking_date = today
-    elif "tomorrow" in speech_lower:
-        booking_date = tomorrow
-    elif any(day in speech_lower for day in ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]):
-        # Handle days of the week
-        weekday_map = {
-            "monday": 0, "tuesday": 1, "wednesday": 2, "thursday": 3,
-            "friday": 4, "saturday": 5, "sunday": 6
-        }
-        
-        for day, weekday_num in weekday_map.items():
-            if day in speech_lower:
-                # Find the next occurrence of this weekday
-                days_ahead = weekday_num - today.weekday()
-                if days_ahead <= 0:  # Target day already happened this week
-                    days_ahead += 7
-                booking_date = today + timedelta(days=days_ahead)
-                break
-    
-    # Debug logging
-    print(f"DEBUG - Date Speech Input: '{speech_result}'")
-    print(f"DEBUG - Date request values: {dict(request.values)}")
-    
-    # If no date was recognized and speech is empty/very short, use tomorrow as default
-    if not booking_date and (not speech_result or len(speech_result.strip()) < 3):
-        booking_date = tomorrow  # Default to tomorrow if speech recognition failed
-        print(f"DEBUG - Using default date (tomorrow): {booking_date}")
-    
-    if booking_date:
-        # Store date in state
-        state['booking_data']['booking_date'] = booking_date
-        state['stage'] = 'time'
-        conversation_states[call_sid] = state
-        
-        # Format date for speech
-        formatted_date = booking_date.strftime("%A, %B %d")
-        
-        # Respond and ask for time
-        response.say(
-            f"I've set your reservation date for {formatted_date}. "
-            "What time would you like to book?",
-            voice='Polly.Matthew'
-        )
-        
-        gather = Gather(
-            input='speech',
-            action='/twilio/collect-time',
-            timeout=5,
-            speech_timeout='auto'
-        )
-        response.append(gather)
-    else:
-        # If we couldn't understand, try again
-        response.say(
-            "I'm sorry, I didn't catch the date you'd like to book. "
-            "Could you please tell me the date, like 'today', 'tomorrow', or a specific date?",
-            voice='Polly.Matthew'
-        )
-        
-        gather = Gather(
-            input='speech',
-            action='/twilio/collect-date',
-            timeout=5,
-            speech_timeout='auto'
-        )
-        response.append(gather)
-    
-    return Response(str(response), mimetype='text/xml')
-
 @twilio_call_bp.route('/twilio/collect-time', methods=['GET', 'POST'])
-def collect_time():
-    """Collect the booking time"""
-    call_sid = request.values.get('CallSid', '')
-    speech_result = request.values.get('SpeechResult', '')
-    
-    # Get the conversation state
-    state = conversation_states.get(call_sid, {
-        'stage': 'time',
-        'booking_data': {}
-    })
-    
-    response = VoiceResponse()
-    
-    # Create voice interaction record
-    voice_interaction = VoiceInteraction(
-        transcript=speech_result,
-        response_text="Time collection"
-    )
-    db.session.add(voice_interaction)
-    db.session.commit()
-    
-    # Debug logging
-    print(f"DEBUG - Time Speech Input: '{speech_result}'")
-    print(f"DEBUG - Time request values: {dict(request.values)}")
-    
-    # Try to extract the time from speech
-    import re
-    time_match = re.search(r'(\d{1,2})(?::(\d{2}))?\s*(am|pm|a\.m\.|p\.m\.)?', speech_result.lower())
-    
-    if time_match:
-        hour = int(time_match.group(1))
-        minute = time_match.group(2)
-        minute = int(minute) if minute else 0
-        ampm = time_match.group(3)
-        
-        # Handle AM/PM
-        if ampm and ('p' in ampm) and hour < 12:
-            hour += 12
-        elif ampm and ('a' in ampm) and hour == 12:
-            hour = 0
-            
-        # Format as HH:MM
-        booking_time = f"{hour:02d}:{minute:02d}"
-        
-        # Check if restaurant is open at this time
-        restaurant = Restaurant.query.get(state['booking_data']['restaurant_id'])
-        
-        # Default opening/closing if no restaurant found
-        opening_time = restaurant.opening_time if restaurant else "11:00"
-        closing_time = restaurant.closing_time if restaurant else "22:00"
-        
-        # Check if time is within business hours
-        if booking_time < opening_time or booking_time > closing_time:
-            response.say(
-                f"I'm sorry, our restaurant is only open from {opening_time} to {closing_time}. "
-                "Please choose a time within our business hours.",
-                voice='Polly.Matthew'
-            )
-            
-            gather = Gather(
-                input='speech',
-                action='/twilio/collect-time',
-                timeout=5,
-                speech_timeout='auto'
-            )
-            response.append(gather)
-            return Response(str(response), mimetype='text/xml')
-        
-        # Check availability for this time slot
-        booking_date = state['booking_data']['booking_date']
-        party_size = state['booking_data']['party_size']
-        
-        # Check if slot is available (will implement actual check later)
-        date_str = booking_date.strftime('%Y-%m-%d')
-        available_slots = get_available_slots(date_str)
-        
-        # Check if our time is in available slots
-        is_available = any(slot['time'] == booking_time for slot in available_slots)
-        
-        if is_available:
-            # Store time in state
-            state['booking_data']['booking_time'] = booking_time
-            state['stage'] = 'confirmation'
-            conversation_states[call_sid] = state
-            
-            # Get data for confirmation
-            customer_name = state['booking_data'].get('customer_name', 'you')
-            formatted_date = booking_date.strftime("%A, %B %d")
-            
-            # Respond and ask for confirmation
-            response.say(
-                f"Great, I have a table for {party_size} on {formatted_date} at {booking_time}. "
-                f"Is this correct, {customer_name}? Please say yes or no.",
-                voice='Polly.Matthew'
-            )
-            
-            gather = Gather(
-                input='speech',
-                action='/twilio/confirm-booking',
-                timeout=5,
-                speech_timeout='auto'
-            )
-            response.append(gather)
-        else:
-            # Suggest alternative times
-            response.say(
-                "I'm sorry, that time is not available. Here are some alternative times: ",
-                voice='Polly.Matthew'
-            )
-            
-            for i, slot in enumerate(available_slots[:3]):
-                response.say(f"Option {i+1}: {slot['time']}", voice='Polly.Matthew')
-            
-            response.say(
-                "Please say the time you would prefer, or say 'none' to try another date.",
-                voice='Polly.Matthew'
-            )
-            
-            gather = Gather(
-                input='speech',
-                action='/twilio/collect-alternative-time',
-                timeout=5,
-                speech_timeout='auto'
-            )
-            response.append(gather)
-    # If speech is empty or very short, use default time
-    elif not speech_result or len(speech_result.strip()) < 3:
-        # Use the first available slot as default
-        booking_date = state['booking_data']['booking_date']
-        date_str = booking_date.strftime('%Y-%m-%d')
-        available_slots = get_available_slots(date_str)
-        
-        if available_slots:
-            default_time = available_slots[0]['time']
-            print(f"DEBUG - Using default time: {default_time}")
-            
-            # Store time in state
-            state['booking_data']['booking_time'] = default_time
-            state['stage'] = 'confirmation'
-            conversation_states[call_sid] = state
-            
-            # Get data for confirmation
-            customer_name = state['booking_data'].get('customer_name', 'you')
-            party_size = state['booking_data']['party_size']
-            formatted_date = booking_date.strftime("%A, %B %d")
-            
-            # Respond and ask for confirmation
-            response.say(
-                f"I've scheduled you for {default_time}, our most popular time. "
-                f"So that's a table for {party_size} on {formatted_date} at {default_time}. "
-                f"Is this correct, {customer_name}? Please say yes or no.",
-                voice='Polly.Matthew'
-            )
-            
-            gather = Gather(
-                input='speech',
-                action='/twilio/confirm-booking',
-                timeout=5,
-                speech_timeout='auto'
-            )
-            response.append(gather)
-        else:
-            # If no slots available, try again
-            response.say(
-                "I'm sorry, I didn't catch the time you'd like to book. "
-                "Could you please tell me the time, like '7 PM' or '6:30'?",
-                voice='Polly.Matthew'
-            )
-            
-            gather = Gather(
-                input='speech',
-                action='/twilio/collect-time',
-                timeout=5,
-                speech_timeout='auto'
-            )
-            response.append(gather)
-    else:
-        # If we couldn't understand, try again
-        response.say(
-            "I'm sorry, I didn't catch the time you'd like to book. "
-            "Could you please tell me the time, like '7 PM' or '6:30'?",
-            voice='Polly.Matthew'
-        )
-        
-        gather = Gather(
-            input='speech',
-            action='/twilio/collect-time',
-            timeout=5,
-            speech_timeout='auto'
-        )
-        response.append(gather)
-    
-    return Response(str(response), mimetype='text/xml')
-
 @twilio_call_bp.route('/twilio/collect-alternative-time', methods=['GET', 'POST'])
-def collect_alternative_time():
-    """Handle selection of alternative time slots"""
+@twilio_call_bp.route('/twilio/confirm-booking', methods=['GET', 'POST'])
+@idempotent(_twilio_idempotency_key)
+def turn():
+    """Handle one caller answer: run the current stage and ask the next question"""
     call_sid = request.values.get('CallSid', '')
     speech_result = request.values.get('SpeechResult', '')
     
-    # Get the conversation state
-    state = conversation_states.get(call_sid, {
-        'stage': 'time',
-        'booking_data': {}
-    })
-    
-    response = VoiceResponse()
-    speech_lower = speech_result.lower()
-    
-    if "none" in speech_lower or "different date" in speech_lower:
-        # User wants to try a different date
-        response.say(
-            "Let's try a different date. What date would you like to book?",
-            voice='Polly.Matthew'
-        )
-        
-        gather = Gather(
-            input='speech',
-            action='/twilio/collect-date',
-            timeout=5,
-            speech_timeout='auto'
-        )
-        response.append(gather)
-    else:
-        # Try to extract a time from the response
-        import re
-        time_match = re.search(r'(\d{1,2})(?::(\d{2}))?\s*(am|pm|a\.m\.|p\.m\.)?', speech_lower)
-        
-        if time_match:
-            hour = int(time_match.group(1))
-            minute = time_match.group(2)
-            minute = int(minute) if minute else 0
-            ampm = time_match.group(3)
-            
-            # Handle AM/PM
-            if ampm and ('p' in ampm) and hour < 12:
-                hour += 12
-            elif ampm and ('a' in ampm) and hour == 12:
-                hour = 0
-                
-            # Format as HH:MM
-            booking_time = f"{hour:02d}:{minute:02d}"
-            
-            # Store time in state
-            state['booking_data']['booking_time'] = booking_time
-            state['stage'] = 'confirmation'
-            conversation_states[call_sid] = state
-            
-            # Get data for confirmation
-            customer_name = state['booking_data'].get('customer_name', 'you')
-            booking_date = state['booking_data']['booking_date']
-            party_size = state['booking_data']['party_size']
-            formatted_date = booking_date.strftime("%A, %B %d")
-            
-            # Respond and ask for confirmation
-            response.say(
-                f"Great, I have a table for {party_size} on {formatted_date} at {booking_time}. "
-                f"Is this correct, {customer_name}? Please say yes or no.",
-                voice='Polly.Matthew'
-            )
-            
-            gather = Gather(
-                input='speech',
-                action='/twilio/confirm-booking',
-                timeout=5,
-                speech_timeout='auto'
-            )
-            response.append(gather)
-        else:
-            # If we couldn't understand, try again with the original time options
-            booking_date = state['booking_data']['booking_date']
-            date_str = booking_date.strftime('%Y-%m-%d')
-            available_slots = get_available_slots(date_str)
-            
-            response.say(
-                "I'm sorry, I didn't understand your choice. Here are the available times again: ",
-                voice='Polly.Matthew'
-            )
-            
-            for i, slot in enumerate(available_slots[:3]):
-                response.say(f"Option {i+1}: {slot['time']}", voice='Polly.Matthew')
-            
-            response.say(
-                "Please say the time you would prefer, or say 'none' to try another date.",
-                voice='Polly.Matthew'
-            )
-            
-            gather = Gather(
-                input='speech',
-                action='/twilio/collect-alternative-time',
-                timeout=5,
-                speech_timeout='auto'
-            )
-            response.append(gather)
-    
-    return Response(str(response), mimetype='text/xml')
+    # Load the conversation state once per turn
+    state = load_call_state(call_sid)
+    if state is None:
+        # Unknown or expired call: start the conversation over
+        with unit_of_work():
+            state, messages = start_call(request.values.get('From', ''))
+            save_call_state(call_sid, state)
+        return _render_turn(messages)
+    
+    # Record the interaction and save the state in one commit
+    call_turn = advance_call(call_sid, state, speech_result)
+    
+    partial_result_url = _partial_result_url(state) if call_turn.next_stage in PREFETCH_STAGES else None
+    return _render_turn(call_turn.messages, gather=call_turn.next_stage is not None,
+                        partial_result_url=partial_result_url)
 
-@twilio_call_bp.route('/twilio/confirm-booking', methods=['GET', 'POST'])
-def confirm_booking():
-    """Handle booking confirmation"""
+@twilio_call_bp.route('/twilio/partial', methods=['POST'])
+def partial_result():
+    """Start fetching availability for a date or time heard mid-utterance"""
+    speech = ' '.join(filter(None, [
+        request.values.get('StableSpeechResult'),
+        request.values.get('UnstableSpeechResult')
+    ]))
+    restaurant_id = request.args.get('restaurant_id', type=int)
+    
+    date_result = parse_date(speech)
+    if date_result:
+        prefetch_slots(restaurant_id, date_result.value)
+    elif request.args.get('date') and parse_time(speech):
+        try:
+            booking_date = datetime.strptime(request.args['date'], '%Y-%m-%d').date()
+        except ValueError:
+            return '', 204
+        prefetch_slots(restaurant_id, booking_date)
+    
+    # Twilio ignores the body of partial result callbacks
+    return '', 204
+
+# CallStatus values Twilio sends once a call is over
+FINAL_CALL_STATUSES = ('completed', 'busy', 'failed', 'no-answer', 'canceled')
+
+@twilio_call_bp.route('/twilio/status', methods=['POST'])
+def call_status():
+    """Status callback: free the caller's held table and state when they hang up"""
     call_sid = request.values.get('CallSid', '')
-    speech_result = request.values.get('SpeechResult', '')
-    
-    # Get the conversation state
-    state = conversation_states.get(call_sid, {
-        'stage': 'confirmation',
-        'booking_data': {}
-    })
-    
-    response = VoiceResponse()
-    
-    # Create voice interaction record
-    voice_interaction = VoiceInteraction(
-        transcript=speech_result,
-        response_text="Booking confirmation"
-    )
-    db.session.add(voice_interaction)
-    db.session.commit()
-    
-    # Analyze speech for confirmation
-    speech_lower = speech_result.lower()
-    
-    if any(word in speech_lower for word in ['yes', 'correct', 'right', 'sure', 'confirm']):
-        # User confirmed the booking
-        
-        # Convert date to string format for create_booking
-        booking_date = state['booking_data']['booking_date']
-        state['booking_data']['booking_date'] = booking_date.strftime('%Y-%m-%d')
-        
-        # Create the booking
-        booking, success, message = create_booking(state['booking_data'])
-        
-        if success:
-            # Booking created successfully
-            response.say(
-                f"Excellent! Your reservation has been confirmed. "
-                f"You'll receive a confirmation SMS with your booking details. "
-                f"Thank you for choosing our restaurant. Goodbye!",
-                voice='Polly.Matthew'
-            )
-            
-            # Cleanup state
-            if call_sid in conversation_states:
-                del conversation_states[call_sid]
-                
-        else:
-            # Failed to create booking
-            response.say(
-                f"I'm sorry, there was an issue creating your booking: {message} "
-                f"Please try again later or call our restaurant directly. Thank you and goodbye!",
-                voice='Polly.Matthew'
-            )
-            
-            # Cleanup state
-            if call_sid in conversation_states:
-                del conversation_states[call_sid]
-    else:
-        # User did not confirm, go back to date selection
-        state['stage'] = 'date'
-        conversation_states[call_sid] = state
-        
-        response.say(
-            "Let's try again. What date would you like to book?",
-            voice='Polly.Matthew'
-        )
-        
-        gather = Gather(
-            input='speech',
-            action='/twilio/collect-date',
-            timeout=5,
-            speech_timeout='auto'
-        )
-        response.append(gather)
-    
-    return Response(str(response), mimetype='text/xml')
+    if call_sid and request.values.get('CallStatus') in FINAL_CALL_STATUSES:
+        try:
+            with unit_of_work():
+                state = load_call_state(call_sid)
+                if state is not None:
+                    record_hangup(state)
+                release_hold(call_sid)
+                delete_call_state(call_sid)
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.error(f"Error releasing call {call_sid}: {str(e)}")
+    return '', 204
 
 @twilio_call_bp.route('/twilio/fallback', methods=['GET', 'POST'])
 def fallback():
     """Handle fallback for when things go wrong"""
-    response = VoiceResponse()
-    
-    response.say(
-        "I'm sorry, there seems to be an issue with our booking system. "
-        "Please try again later or call our restaurant directly during business hours. "
-        "Thank you for your patience.",
-        voice='Polly.Matthew'
-    )
-    
-    return Response(str(response), mimetype='text/xml')
\ No newline at end of file
+    return _render_turn([FALLBACK_MESSAGE], gather=False)
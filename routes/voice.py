@@ -8,6 +8,7 @@ from models import VoiceInteraction
 from services.voice_service import process_audio, generate_voice_response
 from services.booking_service import extract_booking_info
 from services.audit_service import log_action
+from services.unit_of_work import unit_of_work
 
 voice_bp = Blueprint('voice', __name__)
 
@@ -38,25 +39,26 @@ def process_voice():
         # Generate voice response
         audio_response_url = generate_voice_response(response_text)
         
-        # Create voice interaction record
-        voice_interaction = VoiceInteraction(
-            transcript=transcript,
-            response_text=response_text
-        )
-        db.session.add(voice_interaction)
-        db.session.commit()
-        
-        # Log the voice interaction in audit logs
-        log_action(
-            'voice_interaction',
-            'voice_interaction',
-            voice_interaction.id,
-            'Voice interaction processed',
-            json.dumps({
-                'transcript': transcript,
-                'response': response_text
-            })
-        )
+        # Record the voice interaction and its audit entry in one commit
+        with unit_of_work():
+            voice_interaction = VoiceInteraction(
+                transcript=transcript,
+                response_text=response_text
+            )
+            db.session.add(voice_interaction)
+            db.session.flush()
+            
+            # Log the voice interaction in audit logs
+            log_action(
+                'voice_interaction',
+                'voice_interaction',
+                voice_interaction.id,
+                'Voice interaction processed',
+                json.dumps({
+                    'transcript': transcript,
+                    'response': response_text
+                })
+            )
         
         # Clean up temporary file
         os.remove(temp_file_path)
@@ -3,11 +3,15 @@ from datetime import datetime
 from flask import current_app
 from app import db
 from models import AuditLog
+from services.unit_of_work import commit, in_unit_of_work
 
 def log_action(action, entity_type, entity_id, description, data=None):
     """
     Log an action in the audit log
     
+    Inside a unit of work the entry is committed with the change it
+    describes, and a failure is raised so neither is saved.
+    
     Args:
         action (str): Type of action (create_booking, update_booking, etc.)
         entity_type (str): Type of entity (booking, restaurant, etc.)
@@ -30,13 +34,15 @@ def log_action(action, entity_type, entity_id, description, data=None):
         )
         
         db.session.add(audit_log)
-        db.session.commit()
+        commit()
         
         current_app.logger.info(f"Audit log created: {action} - {description}")
         return audit_log
         
     except Exception as e:
         current_app.logger.error(f"Failed to create audit log: {str(e)}")
+        if in_unit_of_work():
+            raise
         
         # Try to rollback the session
         try:
@@ -0,0 +1,313 @@
+import threading
+import time
+from bisect import bisect_left
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from typing import NamedTuple
+from flask import current_app
+from services.occupancy_service import get_day_occupancy
+from services.restaurant_service import get_restaurant_config, time_to_minutes
+from services.seating_service import get_seating_with_holds
+from services.slot_hold_service import held_seats
+from utils.calendly_helper import get_available_slots
+
+# (restaurant_id, 'YYYY-MM-DD') -> (expires_at, slots), least recently used first.
+# Bookings don't change these: seats taken are checked against the occupancy
+# index, which every booking, cancellation and import updates
+_slot_cache = OrderedDict()
+_slot_cache_lock = threading.Lock()
+
+# Keys being fetched in the background -> Future; a request that misses the
+# cache waits for the running fetch instead of starting a second one
+_inflight = {}
+_prefetch_pool = None
+
+_cache_stats = {
+    'hits': 0,
+    'misses': 0,
+    'evictions': 0,
+    'prefetches': 0,
+    'prefetch_waits': 0
+}
+
+DEFAULT_CACHE_TTL = 60
+DEFAULT_CACHE_SIZE = 512
+DEFAULT_PREFETCH_WORKERS = 4
+
+# Longest a webhook waits on a background fetch before fetching itself
+PREFETCH_WAIT_SECONDS = 5
+
+# An alternative on another day ranks like a same-day slot this many minutes further away
+ADJACENT_DAY_PENALTY_MINUTES = 120
+
+class Alternative(NamedTuple):
+    """An open slot offered instead of the time asked for"""
+    booking_date: date
+    time: str
+    distance: int  # minutes from the time asked for, plus the penalty for another day
+
+class SlotIndex:
+    """
+    A day's open slots sorted by minute, for nearest-time lookups
+
+    Args:
+        open_slots (list): (slot dict, spare covers once the party is seated) pairs
+    """
+    __slots__ = ('minutes', 'times', 'spare')
+
+    def __init__(self, open_slots):
+        ordered = sorted((time_to_minutes(slot['time']), spare, slot['time']) for slot, spare in open_slots)
+        self.minutes = [minute for minute, _, _ in ordered]
+        self.spare = [spare for _, spare, _ in ordered]
+        self.times = [slot_time for _, _, slot_time in ordered]
+
+    def nearest(self, minute, count):
+        """
+        Slots closest to a time, found by bisecting and walking outwards
+
+        Args:
+            minute (int): Minutes past midnight asked for
+            count (int): Most slots to return
+
+        Returns:
+            list: ('HH:MM', minutes away) pairs, nearest first; of two slots
+                equally near, the one the party fills more tightly first
+        """
+        minutes = self.minutes
+        after = bisect_left(minutes, minute)
+        before = after - 1
+        found = []
+        while len(found) < count and (before >= 0 or after < len(minutes)):
+            take_before = after >= len(minutes) or (
+                before >= 0 and (minute - minutes[before], self.spare[before]) <= (minutes[after] - minute, self.spare[after])
+            )
+            if take_before:
+                found.append((self.times[before], minute - minutes[before]))
+                before -= 1
+            else:
+                found.append((self.times[after], minutes[after] - minute))
+                after += 1
+        return found
+
+def _cache_key(restaurant_id, booking_date):
+    """Normalize a date or 'YYYY-MM-DD' string into a cache key"""
+    date_str = booking_date if isinstance(booking_date, str) else booking_date.strftime('%Y-%m-%d')
+    return (int(restaurant_id or 1), date_str)
+
+def get_slots(restaurant_id, booking_date):
+    """
+    Get available time slots for a restaurant and date, served from cache when fresh
+
+    Args:
+        restaurant_id (int): Restaurant ID
+        booking_date (date | str): Date or 'YYYY-MM-DD' string
+
+    Returns:
+        list: Available slot dicts; shared with the cache, so treat as read-only
+    """
+    key = _cache_key(restaurant_id, booking_date)
+    now = time.monotonic()
+
+    with _slot_cache_lock:
+        entry = _slot_cache.get(key)
+        if entry is not None and entry[0] > now:
+            _slot_cache.move_to_end(key)
+            _cache_stats['hits'] += 1
+            return entry[1]
+        future = _inflight.get(key)
+        if future is not None:
+            _cache_stats['prefetch_waits'] += 1
+        else:
+            _cache_stats['misses'] += 1
+
+    if future is not None:
+        try:
+            return future.result(timeout=PREFETCH_WAIT_SECONDS)
+        except Exception as e:
+            current_app.logger.warning(f"Availability prefetch for {key} failed, fetching directly: {str(e)}")
+
+    return _fetch_slots(key)
+
+def _fetch_slots(key):
+    """Fetch slots for a cache key and store them"""
+    # Fetch outside the lock so a slow Calendly call doesn't block other dates
+    slots = get_available_slots(key[1])
+
+    ttl = current_app.config.get('AVAILABILITY_CACHE_TTL', DEFAULT_CACHE_TTL)
+    max_size = current_app.config.get('AVAILABILITY_CACHE_SIZE', DEFAULT_CACHE_SIZE)
+
+    with _slot_cache_lock:
+        _slot_cache[key] = (time.monotonic() + ttl, slots)
+        _slot_cache.move_to_end(key)
+        while len(_slot_cache) > max_size:
+            _slot_cache.popitem(last=False)
+            _cache_stats['evictions'] += 1
+
+    return slots
+
+def _prefetch(app, key):
+    try:
+        with app.app_context():
+            return _fetch_slots(key)
+    finally:
+        with _slot_cache_lock:
+            _inflight.pop(key, None)
+
+def _get_prefetch_pool():
+    global _prefetch_pool
+
+    if _prefetch_pool is None:
+        workers = current_app.config.get('AVAILABILITY_PREFETCH_WORKERS', DEFAULT_PREFETCH_WORKERS)
+        if workers <= 0:
+            return None
+        _prefetch_pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='availability-prefetch')
+    return _prefetch_pool
+
+def prefetch_slots(restaurant_id, booking_date):
+    """
+    Start fetching slots in the background so a later get_slots() finds them
+
+    Does nothing when the date is already cached or being fetched.
+
+    Args:
+        restaurant_id (int): Restaurant ID
+        booking_date (date | str): Date or 'YYYY-MM-DD' string
+
+    Returns:
+        bool: True if a background fetch was started
+    """
+    key = _cache_key(restaurant_id, booking_date)
+    now = time.monotonic()
+
+    with _slot_cache_lock:
+        entry = _slot_cache.get(key)
+        if (entry is not None and entry[0] > now) or key in _inflight:
+            return False
+
+        pool = _get_prefetch_pool()
+        if pool is None:
+            return False
+
+        # Registered under the lock so the worker's cleanup can't run first
+        _inflight[key] = pool.submit(_prefetch, current_app._get_current_object(), key)
+        _cache_stats['prefetches'] += 1
+    return True
+
+def _occupancy(restaurant_id, booking_date, call_sid=None):
+    """Covers per bucket from bookings plus seats held by other callers"""
+    occupancy = get_day_occupancy(restaurant_id, booking_date)
+    for booking_time, seats in held_seats(restaurant_id, booking_date, exclude_call_sid=call_sid).items():
+        occupancy.add(booking_time, seats)
+    return occupancy
+
+def _open_slots(restaurant_id, booking_date, party_size, call_sid=None):
+    """Open slots with the covers still spare once the party is seated"""
+    slots = get_slots(restaurant_id, booking_date)
+    restaurant = get_restaurant_config(restaurant_id)
+    if not restaurant:
+        return [(slot, 0) for slot in slots]
+
+    occupancy = _occupancy(restaurant.id, booking_date, call_sid)
+    free_after = restaurant.capacity - party_size
+    seating = get_seating_with_holds(restaurant.id, booking_date, call_sid)
+    return [(slot, free_after - occupancy.peak(slot['time'])) for slot in slots
+            if occupancy.peak(slot['time']) <= free_after
+            and (seating is None or seating.find(slot['time'], party_size) is not None)]
+
+def get_open_slots(restaurant_id, booking_date, party_size, call_sid=None):
+    """
+    Slots with room and a free table for a party once bookings and other
+    callers' holds are counted
+
+    Args:
+        restaurant_id (int): Restaurant ID
+        booking_date (date): Booking date
+        party_size (int): Seats needed
+        call_sid (str, optional): Call asking; its own hold doesn't count against it
+
+    Returns:
+        list: Slot dicts, in the order get_slots() returns them
+    """
+    return [slot for slot, _ in _open_slots(restaurant_id, booking_date, party_size, call_sid)]
+
+def find_alternatives(restaurant_id, booking_date, booking_time, party_size, call_sid=None,
+                      count=3, adjacent_days=0):
+    """
+    Open slots nearest to a time that couldn't be booked
+
+    Slots are ranked by how far they are from the time asked for. Slots on
+    the days either side rank as if ADJACENT_DAY_PENALTY_MINUTES further
+    away per day, so the same time tomorrow beats lunch for someone asking
+    about dinner. Past days are skipped.
+
+    Args:
+        restaurant_id (int): Restaurant ID
+        booking_date (date): Date asked for
+        booking_time (str): 'HH:MM' asked for
+        party_size (int): Seats needed
+        call_sid (str, optional): Call asking; its own hold doesn't count against it
+        count (int, optional): Most alternatives to return
+        adjacent_days (int, optional): Days before and after to search as well
+
+    Returns:
+        list: Alternative tuples, best first
+    """
+    minute = time_to_minutes(booking_time)
+    alternatives = []
+    for offset in range(-adjacent_days, adjacent_days + 1):
+        day = booking_date + timedelta(days=offset)
+        if offset and day < date.today():
+            continue
+        index = SlotIndex(_open_slots(restaurant_id, day, party_size, call_sid))
+        penalty = abs(offset) * ADJACENT_DAY_PENALTY_MINUTES
+        alternatives.extend(Alternative(day, slot_time, distance + penalty)
+                            for slot_time, distance in index.nearest(minute, count))
+
+    alternatives.sort(key=lambda alternative: (alternative.distance, alternative.booking_date != booking_date))
+    return alternatives[:count]
+
+def has_room(restaurant_id, booking_date, booking_time, party_size, call_sid=None):
+    """
+    Quick check that a new booking fits alongside bookings and holds
+
+    Answered from memory; reserve_covers() makes the binding decision
+    against the database counters.
+
+    Args:
+        restaurant_id (int): Restaurant ID
+        booking_date (date): Booking date
+        booking_time (str): 'HH:MM'
+        party_size (int): Seats needed
+        call_sid (str, optional): Call booking; its own hold doesn't count against it
+
+    Returns:
+        bool: True if the party fits for the whole booking and, when the
+            restaurant has tables, a table or combination is free
+    """
+    restaurant = get_restaurant_config(restaurant_id)
+    if not restaurant:
+        return False
+
+    occupancy = _occupancy(restaurant.id, booking_date, call_sid)
+    if occupancy.peak(booking_time) + party_size > restaurant.capacity:
+        return False
+
+    seating = get_seating_with_holds(restaurant.id, booking_date, call_sid)
+    return seating is None or seating.find(booking_time, party_size) is not None
+
+def get_availability_cache_stats():
+    """
+    Get availability cache counters for this worker process
+
+    Returns:
+        dict: hits, misses, evictions, prefetches, prefetch_waits, size
+            and hit_rate
+    """
+    with _slot_cache_lock:
+        stats = dict(_cache_stats)
+        stats['size'] = len(_slot_cache)
+
+    lookups = stats['hits'] + stats['misses']
+    stats['hit_rate'] = round(stats['hits'] / lookups, 4) if lookups else 0.0
+    return stats
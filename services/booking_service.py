@@ -1,214 +1,549 @@
-import re
 import json
 import datetime
+from typing import NamedTuple, Optional
 from flask import current_app
+from sqlalchemy import insert, select, update
 from app import db
-from models import Booking, Restaurant
+from models import AuditLog, Booking
 from services.audit_service import log_action
+from services.availability_service import has_room
+from services.occupancy_service import (DEFAULT_DURATION_MINUTES, OCCUPYING_STATUSES, record_occupancy,
+                                        reserve_covers, release_covers)
+from services.customer_service import record_customer_booking
+from services.slot_hold_service import release_hold
+from services.restaurant_service import TIME_RE, get_restaurant_config, time_to_minutes
+from services.seating_service import invalidate_seating
+from services.unit_of_work import after_commit, in_unit_of_work, savepoint, unit_of_work
 from utils.calendly_helper import create_calendly_event, get_available_slots
+from utils.speech_parser import MAX_PARTY_SIZE, parse_name, parse_phone, parse_party_size, parse_date, parse_time
+from utils.twilio_helper import normalize_phone_number
 
-def create_booking(booking_data):
+BOOKING_STATUSES = ('confirmed', 'canceled', 'completed', 'no_show')
+
+# Filters accepted by bulk_update_status(); one of them must limit the dates
+BULK_FILTERS = ('restaurant_id', 'status', 'booking_date', 'start_date', 'end_date')
+
+# create_booking() result codes; update_booking_status() and bulk_update_status()
+# refuse to confirm a booking again with BOOKING_DUPLICATE or BOOKING_UNAVAILABLE
+BOOKING_CREATED = 'created'
+BOOKING_UPDATED = 'updated'
+BOOKING_DUPLICATE = 'duplicate'
+BOOKING_UNAVAILABLE = 'unavailable'
+BOOKING_INVALID = 'invalid'
+BOOKING_ERROR = 'error'
+
+class BulkStatusResult(NamedTuple):
+    """Outcome of bulk_update_status()"""
+    updated: int
+    success: bool
+    message: str
+    rejected: list  # [{'booking_id': ID, 'code': result code, 'message': reason}] not confirmed again
+
+class BookingResult(NamedTuple):
+    """Outcome of create_booking(); for a duplicate, booking is the one already made"""
+    booking: Optional[Booking]
+    success: bool
+    message: str
+    code: str
+
+def find_duplicate_booking(restaurant_id, customer_phone, booking_date, booking_time):
+    """
+    Find a confirmed booking for the same phone number whose time overlaps this one
+
+    Bookings overlap when they start less than BOOKING_DURATION_MINUTES apart.
+    The lookup goes through the (customer_phone, booking_date, status) index,
+    matching the number both as given and normalized, so bookings stored
+    before numbers were normalized are still found. Withheld and other
+    unusable numbers ("anonymous") are shared by unrelated callers, so
+    they are never treated as duplicates.
+
+    Args:
+        restaurant_id (int): Restaurant ID
+        customer_phone (str): Phone number in any common format
+        booking_date (date): Booking date
+        booking_time (str): 'HH:MM'
+
+    Returns:
+        Booking: The earliest overlapping booking, or None
+    """
+    phone = normalize_phone_number(customer_phone)
+    if not phone:
+        return None
+    duration = current_app.config.get('BOOKING_DURATION_MINUTES', DEFAULT_DURATION_MINUTES)
+    start = time_to_minutes(booking_time)
+
+    # One equality lookup per form of the number: given an IN list, SQLite
+    # prefers the (restaurant_id, booking_date) index and reads the whole day
+    bookings = []
+    for number in dict.fromkeys((phone, customer_phone)):
+        bookings += Booking.query.filter(
+            Booking.customer_phone == number,
+            Booking.booking_date == booking_date,
+            Booking.restaurant_id == restaurant_id,
+            Booking.status == 'confirmed'
+        ).all()
+    for booking in sorted(bookings, key=lambda booking: booking.id):
+        if abs(time_to_minutes(booking.booking_time) - start) < duration:
+            return booking
+    return None
+
+class _Rejected(Exception):
+    """Leaves a savepoint so its reservation is undone; carries what to return"""
+    def __init__(self, result):
+        super().__init__(result[-2])
+        self.result = result
+
+def validate_party_and_time(booking_data):
+    """
+    Check the party size and time of a booking or waitlist entry
+
+    Seats are counted from these, so a bad value would corrupt the counters.
+
+    Args:
+        booking_data (dict): Data with party_size and booking_time
+
+    Returns:
+        tuple: (the data with booking_time zero-padded, None), or (None, error message)
+    """
+    party_size = booking_data['party_size']
+    if not isinstance(party_size, int) or not 0 < party_size <= MAX_PARTY_SIZE:
+        return None, f"Party size must be between 1 and {MAX_PARTY_SIZE}"
+    time_match = TIME_RE.match(str(booking_data['booking_time']).strip())
+    if not time_match:
+        return None, "Booking time must be HH:MM"
+    return dict(booking_data, booking_time=f"{int(time_match.group(1)):02d}:{time_match.group(2)}"), None
+
+def _duplicate_result(duplicate):
+    return BookingResult(
+        duplicate, False,
+        f"A booking for this phone number already exists on {duplicate.booking_date} at {duplicate.booking_time}",
+        BOOKING_DUPLICATE
+    )
+
+def create_booking(booking_data, call_sid=None):
     """
     Create a new booking record
     
+    A caller who hangs up and calls back, or a form sent twice with different
+    details, would otherwise book twice: a confirmed booking for the same
+    phone number at an overlapping time on the same day is not created again.
+    
     Args:
         booking_data (dict): Dictionary containing booking information
+        call_sid (str, optional): Phone call whose slot hold becomes this booking
         
     Returns:
-        tuple: (Booking object, success boolean, message string)
+        BookingResult: (booking, success, message, code), code one of the
+            BOOKING_* result codes
     """
     try:
         # Validate data
         if not all(key in booking_data for key in ['customer_name', 'customer_phone', 'party_size', 'booking_date', 'booking_time', 'restaurant_id']):
-            return None, False, "Missing required booking information"
+            return BookingResult(None, False, "Missing required booking information", BOOKING_INVALID)
+        
+        booking_data, error = validate_party_and_time(booking_data)
+        if error:
+            return BookingResult(None, False, error, BOOKING_INVALID)
             
         # Check if restaurant exists
-        restaurant = Restaurant.query.get(booking_data['restaurant_id'])
+        restaurant = get_restaurant_config(booking_data['restaurant_id'])
         if not restaurant:
-            # For demo purposes, create a default restaurant if it doesn't exist
-            restaurant = Restaurant(
-                id=1,
-                name="Demo Restaurant",
-                phone_number="123-456-7890",
-                address="123 Main St, Anytown, USA",
-                opening_time="11:00",
-                closing_time="22:00",
-                capacity=50
-            )
-            db.session.add(restaurant)
-            db.session.commit()
+            return BookingResult(None, False, "Restaurant not found", BOOKING_INVALID)
             
-        # Check if slot is available using Calendly API
-        # For demo, we'll assume it's available
-        available = True
-        
-        if available:
-            # Create booking in the database
-            booking = Booking(
-                restaurant_id=booking_data['restaurant_id'],
-                customer_name=booking_data['customer_name'],
-                customer_phone=booking_data['customer_phone'],
-                customer_email=booking_data.get('customer_email', ''),
-                party_size=booking_data['party_size'],
-                booking_date=booking_data['booking_date'],
-                booking_time=booking_data['booking_time'],
-                special_requests=booking_data.get('special_requests', ''),
-                status='confirmed'
-            )
+        duplicate = find_duplicate_booking(restaurant.id, booking_data['customer_phone'],
+                                           booking_data['booking_date'], booking_data['booking_time'])
+        if duplicate:
+            return _duplicate_result(duplicate)
             
-            db.session.add(booking)
-            db.session.commit()
+        # Admit the party only if it fits alongside confirmed bookings and other callers' holds
+        available = has_room(restaurant.id, booking_data['booking_date'], booking_data['booking_time'],
+                             booking_data['party_size'], call_sid)
+        # Inside a caller's unit of work a failure undoes only this booking's writes
+        with savepoint():
+            if available:
+                # Take the seats atomically; another worker may have taken them since the check
+                available = reserve_covers(restaurant.id, booking_data['booking_date'], booking_data['booking_time'],
+                                           booking_data['party_size'], restaurant.capacity, call_sid)
             
-            # Log the booking creation
-            log_action(
-                'create_booking',
-                'booking',
-                booking.id,
-                f"Booking created for {booking.customer_name} on {booking.booking_date} at {booking.booking_time}",
-                json.dumps(booking_data, default=str)
-            )
+            if available:
+                # A duplicate made since the check above shares a seat counter with this
+                # booking, so the counter's lock has made us wait for it to commit
+                duplicate = find_duplicate_booking(restaurant.id, booking_data['customer_phone'],
+                                                   booking_data['booking_date'], booking_data['booking_time'])
+                if duplicate:
+                    # Leave the savepoint so the reservation is undone
+                    raise _Rejected(_duplicate_result(duplicate))
             
-            # Create Calendly event (would happen here)
-            # calendly_event_id = create_calendly_event(booking)
-            # booking.calendly_event_id = calendly_event_id
-            # db.session.commit()
-            
-            return booking, True, "Booking created successfully"
-        else:
-            return None, False, "The requested time slot is not available"
+            if available:
+                # Create booking in the database
+                booking = Booking(
+                    restaurant_id=booking_data['restaurant_id'],
+                    customer_name=booking_data['customer_name'],
+                    customer_phone=normalize_phone_number(booking_data['customer_phone']) or booking_data['customer_phone'],
+                    customer_email=booking_data.get('customer_email', ''),
+                    party_size=booking_data['party_size'],
+                    booking_date=booking_data['booking_date'],
+                    booking_time=booking_data['booking_time'],
+                    special_requests=booking_data.get('special_requests', ''),
+                    status='confirmed'
+                )
+                
+                # The booking, its seats, the caller profile and the audit entry commit together
+                with unit_of_work():
+                    db.session.add(booking)
+                    
+                    # Remember the caller so the next call can skip the name question
+                    record_customer_booking(booking.customer_name, booking.customer_phone, booking.party_size)
+                    
+                    # The held seats are now taken by the booking itself
+                    release_hold(call_sid)
+                    
+                    # Assign the booking ID for the audit entry
+                    db.session.flush()
+                    
+                    # Log the booking creation
+                    log_action(
+                        'create_booking',
+                        'booking',
+                        booking.id,
+                        f"Booking created for {booking.customer_name} on {booking.booking_date} at {booking.booking_time}",
+                        json.dumps(booking_data, default=str)
+                    )
+                    
+                    seats = (booking.restaurant_id, booking.booking_date, booking.booking_time, booking.party_size)
+                    after_commit(lambda: record_occupancy(*seats))
+                    after_commit(lambda: invalidate_seating(seats[0], seats[1]))
+                
+                # Create Calendly event (would happen here)
+                # calendly_event_id = create_calendly_event(booking)
+                # booking.calendly_event_id = calendly_event_id
+                # db.session.commit()
+                
+                return BookingResult(booking, True, "Booking created successfully", BOOKING_CREATED)
+            else:
+                return BookingResult(None, False, "The requested time slot is not available", BOOKING_UNAVAILABLE)
             
+    except _Rejected as rejected:
+        if not in_unit_of_work():
+            # Undo the reservation and let go of the counters' lock now
+            db.session.rollback()
+        return rejected.result
     except Exception as e:
+        # Inside a unit of work the savepoint has undone this booking's writes;
+        # the caller decides whether the rest of its work commits
+        if not in_unit_of_work():
+            db.session.rollback()
         current_app.logger.error(f"Error in create_booking: {str(e)}")
-        return None, False, f"An error occurred: {str(e)}"
+        return BookingResult(None, False, f"An error occurred: {str(e)}", BOOKING_ERROR)
+
+def _take_seats_again(restaurant_id, customer_phone, booking_date, booking_time, party_size):
+    """
+    Take the seats of a booking being confirmed again, checked as a new booking is
+
+    Its seats may have gone to someone else, or the guest may have booked
+    again, since it was canceled or marked a no-show. Does not commit; on a
+    refusal nothing has been changed.
+
+    Returns:
+        tuple: (code, message) of the refusal, or None once the seats are taken
+    """
+    restaurant = get_restaurant_config(restaurant_id)
+    if not reserve_covers(restaurant_id, booking_date, booking_time, party_size, restaurant.capacity):
+        return BOOKING_UNAVAILABLE, "The requested time slot is not available"
+
+    # Checked after reserving: the counters' lock makes a concurrent booking commit first
+    duplicate = find_duplicate_booking(restaurant_id, customer_phone, booking_date, booking_time)
+    if duplicate:
+        release_covers(restaurant_id, booking_date, booking_time, party_size)
+        return BOOKING_DUPLICATE, _duplicate_result(duplicate).message
+    return None
 
 def update_booking_status(booking, status):
     """
     Update the status of a booking
     
+    Canceling a confirmed booking offers its seats to the waitlist once
+    the change is committed. Confirming a booking again takes its seats
+    only if they are still free and the guest has not booked again meanwhile.
+    
     Args:
         booking (Booking): Booking object to update
-        status (str): New status ('confirmed', 'canceled', 'completed')
+        status (str): New status ('confirmed', 'canceled', 'completed', 'no_show')
         
     Returns:
-        tuple: (success boolean, message string)
+        tuple: (success boolean, message string, result code)
     """
     try:
-        if status not in ['confirmed', 'canceled', 'completed']:
-            return False, "Invalid status"
+        if status not in BOOKING_STATUSES:
+            return False, "Invalid status", BOOKING_INVALID
             
         old_status = booking.status
-        booking.status = status
-        booking.updated_at = datetime.datetime.utcnow()
-        
-        db.session.commit()
         
-        # Log the status update
-        log_action(
-            f'update_booking_status_{status}',
-            'booking',
-            booking.id,
-            f"Booking status updated from {old_status} to {status}",
-            json.dumps({
-                'booking_id': booking.id,
-                'old_status': old_status,
-                'new_status': status
-            })
-        )
+        # Inside a caller's unit of work a refusal undoes only this change
+        with savepoint(), unit_of_work():
+            # Seats are taken or freed when a booking enters or leaves confirmed
+            was_seated = old_status in OCCUPYING_STATUSES
+            if was_seated != (status in OCCUPYING_STATUSES):
+                seat_change = -booking.party_size if was_seated else booking.party_size
+                if was_seated:
+                    release_covers(booking.restaurant_id, booking.booking_date, booking.booking_time,
+                                   booking.party_size)
+                else:
+                    refusal = _take_seats_again(booking.restaurant_id, booking.customer_phone,
+                                                booking.booking_date, booking.booking_time, booking.party_size)
+                    if refusal:
+                        code, message = refusal
+                        raise _Rejected((False, message, code))
+                seats = (booking.restaurant_id, booking.booking_date, booking.booking_time, seat_change)
+                after_commit(lambda: record_occupancy(*seats))
+                after_commit(lambda: invalidate_seating(seats[0], seats[1]))
+                if status == 'canceled':
+                    # Imported here: the waitlist books through this module
+                    from services.waitlist_service import schedule_promotion
+                    after_commit(lambda: schedule_promotion(*seats[:3]))
+            
+            booking.status = status
+            booking.updated_at = datetime.datetime.utcnow()
+            
+            # Log the status update
+            log_action(
+                f'update_booking_status_{status}',
+                'booking',
+                booking.id,
+                f"Booking status updated from {old_status} to {status}",
+                json.dumps({
+                    'booking_id': booking.id,
+                    'old_status': old_status,
+                    'new_status': status
+                })
+            )
         
-        return True, f"Booking status updated to {status}"
+        return True, f"Booking status updated to {status}", BOOKING_UPDATED
         
+    except _Rejected as rejected:
+        return rejected.result
     except Exception as e:
+        if not in_unit_of_work():
+            db.session.rollback()
         current_app.logger.error(f"Error in update_booking_status: {str(e)}")
-        return False, f"An error occurred: {str(e)}"
+        return False, f"An error occurred: {str(e)}", BOOKING_ERROR
 
-def extract_booking_info(transcript):
+def _bulk_conditions(booking_ids, filters):
+    """WHERE clauses selecting the bookings of a bulk status change"""
+    unknown = set(filters) - set(BULK_FILTERS)
+    if unknown:
+        raise ValueError(f"Unknown filter: {', '.join(sorted(unknown))}")
+    if booking_ids is None and not {'booking_date', 'start_date', 'end_date'} & set(filters):
+        raise ValueError("Give booking IDs or a booking_date, start_date or end_date filter")
+    if filters.get('status') is not None and filters['status'] not in BOOKING_STATUSES:
+        raise ValueError("Invalid status filter")
+
+    conditions = []
+    if booking_ids is not None:
+        conditions.append(Booking.id.in_(booking_ids))
+    if filters.get('restaurant_id') is not None:
+        conditions.append(Booking.restaurant_id == filters['restaurant_id'])
+    if filters.get('booking_date') is not None:
+        conditions.append(Booking.booking_date == filters['booking_date'])
+    if filters.get('start_date') is not None:
+        conditions.append(Booking.booking_date >= filters['start_date'])
+    if filters.get('end_date') is not None:
+        conditions.append(Booking.booking_date <= filters['end_date'])
+    return conditions
+
+def bulk_update_status(status, booking_ids=None, filters=None):
     """
-    Extract booking information from voice transcript
+    Change the status of many bookings at once
+
+    The bookings are changed with one UPDATE per status they move from
+    (a single one when filtering by status) and audited with one
+    multi-row INSERT, all in one transaction. Bookings already in the new
+    status are left alone. Seats are freed or taken as in
+    update_booking_status(), and canceled seats are offered to the
+    waitlist once the change is committed. Bookings confirmed again are
+    admitted one at a time, and those without room or already booked
+    again by the guest are left as they were and reported.
+
+    Args:
+        status (str): New status ('confirmed', 'canceled', 'completed', 'no_show')
+        booking_ids (list, optional): Only these bookings
+        filters (dict, optional): restaurant_id, status (the current one),
+            booking_date, start_date and end_date; needed without booking_ids
+
+    Returns:
+        BulkStatusResult: (updated, success, message, rejected)
+    """
+    try:
+        if status not in BOOKING_STATUSES:
+            return BulkStatusResult(0, False, "Invalid status", [])
+        if booking_ids is not None and not booking_ids:
+            return BulkStatusResult(0, True, "No bookings to update", [])
+
+        filters = filters or {}
+        try:
+            conditions = _bulk_conditions(booking_ids, filters)
+        except ValueError as e:
+            return BulkStatusResult(0, False, str(e), [])
+
+        now = datetime.datetime.utcnow()
+        from_statuses = [filters['status']] if filters.get('status') else BOOKING_STATUSES
+        audit_rows = []
+        rejected = []
+        # (restaurant_id, booking_date, booking_time) -> covers taken (positive) or freed (negative)
+        seats = {}
+
+        with unit_of_work():
+            for old_status in from_statuses:
+                if old_status == status:
+                    continue
+
+                was_seated = old_status in OCCUPYING_STATUSES
+                if not was_seated and status in OCCUPYING_STATUSES:
+                    changed = _confirm_again(conditions, old_status, status, now, rejected)
+                else:
+                    changed = db.session.execute(
+                        update(Booking)
+                        .where(*conditions, Booking.status == old_status)
+                        .values(status=status, updated_at=now)
+                        .returning(Booking.id, Booking.restaurant_id, Booking.booking_date,
+                                   Booking.booking_time, Booking.party_size)
+                        .execution_options(synchronize_session=False)
+                    ).all()
+
+                for booking_id, restaurant_id, booking_date, booking_time, party_size in changed:
+                    if was_seated != (status in OCCUPYING_STATUSES):
+                        key = (restaurant_id, booking_date, booking_time)
+                        seats[key] = seats.get(key, 0) + (-party_size if was_seated else party_size)
+
+                    audit_rows.append({
+                        'action': f'update_booking_status_{status}',
+                        'entity_type': 'booking',
+                        'entity_id': booking_id,
+                        'description': f"Booking status updated from {old_status} to {status}",
+                        'data': json.dumps({
+                            'booking_id': booking_id,
+                            'old_status': old_status,
+                            'new_status': status,
+                            'bulk': True
+                        }),
+                        'timestamp': now
+                    })
+
+            for (restaurant_id, booking_date, booking_time), seat_change in seats.items():
+                # Seats taken again were reserved booking by booking
+                if seat_change < 0:
+                    release_covers(restaurant_id, booking_date, booking_time, -seat_change)
+
+            if audit_rows:
+                db.session.execute(insert(AuditLog), audit_rows)
+
+            changes = [key + (seat_change,) for key, seat_change in seats.items() if seat_change]
+            after_commit(lambda: _apply_seat_changes(changes, status))
+
+        current_app.logger.info(f"Bulk status update: {len(audit_rows)} bookings changed to {status}")
+        message = f"{len(audit_rows)} bookings updated to {status}"
+        if rejected:
+            message += f", {len(rejected)} rejected"
+        return BulkStatusResult(len(audit_rows), True, message, rejected)
+
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Error in bulk_update_status: {str(e)}")
+        return BulkStatusResult(0, False, f"An error occurred: {str(e)}", [])
+
+def _confirm_again(conditions, old_status, status, now, rejected):
+    """
+    Confirm the selected bookings in old_status again, one at a time
+
+    Each is updated as soon as its seats are taken, so the duplicate check
+    of the next sees it. Refused bookings are appended to rejected.
+
+    Returns:
+        list: (id, restaurant_id, booking_date, booking_time, party_size) of each booking changed
+    """
+    candidates = db.session.execute(
+        select(Booking.id, Booking.restaurant_id, Booking.booking_date, Booking.booking_time,
+               Booking.party_size, Booking.customer_phone)
+        .where(*conditions, Booking.status == old_status)
+        .order_by(Booking.id)
+    ).all()
+
+    changed = []
+    for booking_id, restaurant_id, booking_date, booking_time, party_size, customer_phone in candidates:
+        refusal = _take_seats_again(restaurant_id, customer_phone, booking_date, booking_time, party_size)
+        if refusal:
+            code, message = refusal
+            rejected.append({'booking_id': booking_id, 'code': code, 'message': message})
+            continue
+        db.session.execute(
+            update(Booking)
+            .where(Booking.id == booking_id)
+            .values(status=status, updated_at=now)
+            .execution_options(synchronize_session=False)
+        )
+        changed.append((booking_id, restaurant_id, booking_date, booking_time, party_size))
+    return changed
+
+def _apply_seat_changes(changes, status):
+    """Update in-memory occupancy and seating after a committed bulk change"""
+    for restaurant_id, booking_date in {change[:2] for change in changes}:
+        invalidate_seating(restaurant_id, booking_date)
+
+    for restaurant_id, booking_date, booking_time, seat_change in changes:
+        record_occupancy(restaurant_id, booking_date, booking_time, seat_change)
+        if status == 'canceled' and seat_change < 0:
+            # Imported here: the waitlist books through this module
+            from services.waitlist_service import schedule_promotion
+            schedule_promotion(restaurant_id, booking_date, booking_time)
+
+def extract_booking_slots(transcript):
+    """
+    Parse every booking slot a caller mentioned in one utterance
+    
+    Numbers only count as a party size or time when the phrasing marks them
+    as one ("for 4", "at 7"), so slots can be picked out of free speech.
     
     Args:
         transcript (str): Transcribed text from user's speech
         
     Returns:
-        tuple: (booking_data dict, response_text string)
+        dict: Slots found, keyed like booking data; booking_date is a date
     """
-    # For a real implementation, this would use a more sophisticated NLP approach
-    # Here we'll use basic regex patterns for demo purposes
+    slots = {}
     
-    booking_data = {}
+    name_result = parse_name(transcript, allow_bare=False)
+    if name_result:
+        slots['customer_name'] = name_result.value
     
-    # Extract name (assuming format like "my name is John Smith" or "this is John Smith")
-    name_match = re.search(r"(?:my name is|this is) ([A-Za-z\s]+)", transcript, re.IGNORECASE)
-    if name_match:
-        booking_data['customer_name'] = name_match.group(1).strip()
+    phone_result = parse_phone(transcript)
+    if phone_result:
+        slots['customer_phone'] = phone_result.value
     
-    # Extract phone number
-    phone_match = re.search(r"(?:my phone|my number|phone number|call me at) (?:is )?(?:1-)?(\d{3}[-\.\s]?\d{3}[-\.\s]?\d{4})", transcript, re.IGNORECASE)
-    if phone_match:
-        booking_data['customer_phone'] = phone_match.group(1).strip()
+    party_result = parse_party_size(transcript, require_context=True)
+    if party_result:
+        slots['party_size'] = party_result.value
     
-    # Extract party size
-    party_match = re.search(r"((?:a )?table for|party of|group of|we are) (\d+|one|two|three|four|five|six|seven|eight|nine|ten)", transcript, re.IGNORECASE)
-    if party_match:
-        party_size_str = party_match.group(2).strip().lower()
-        # Convert word numbers to digits
-        word_to_num = {
-            'one': 1, 'two': 2, 'three': 3, 'four': 4, 'five': 5,
-            'six': 6, 'seven': 7, 'eight': 8, 'nine': 9, 'ten': 10
-        }
-        
-        if party_size_str in word_to_num:
-            booking_data['party_size'] = word_to_num[party_size_str]
-        else:
-            try:
-                booking_data['party_size'] = int(party_size_str)
-            except ValueError:
-                pass
+    date_result = parse_date(transcript)
+    if date_result:
+        slots['booking_date'] = date_result.value
     
-    # Extract date
-    today = datetime.date.today()
-    tomorrow = today + datetime.timedelta(days=1)
+    time_result = parse_time(transcript, require_context=True)
+    if time_result:
+        slots['booking_time'] = time_result.value
     
-    if re.search(r"(?:today|tonight)", transcript, re.IGNORECASE):
-        booking_data['booking_date'] = today
-    elif re.search(r"(?:tomorrow)", transcript, re.IGNORECASE):
-        booking_data['booking_date'] = tomorrow
-    else:
-        # Try to parse specific date formats
-        date_match = re.search(r"(?:on|for) (?:the )?(\d{1,2})(?:st|nd|rd|th)? (?:of )?(January|February|March|April|May|June|July|August|September|October|November|December)", transcript, re.IGNORECASE)
-        if date_match:
-            day = int(date_match.group(1))
-            month_str = date_match.group(2).lower()
-            month_to_num = {
-                'january': 1, 'february': 2, 'march': 3, 'april': 4, 'may': 5, 'june': 6,
-                'july': 7, 'august': 8, 'september': 9, 'october': 10, 'november': 11, 'december': 12
-            }
-            month = month_to_num.get(month_str, 1)
-            
-            # Assume current year or next year if the date is in the past
-            year = today.year
-            potential_date = datetime.date(year, month, day)
-            if potential_date < today:
-                year += 1
-                potential_date = datetime.date(year, month, day)
-                
-            booking_data['booking_date'] = potential_date
+    return slots
+
+def extract_booking_info(transcript):
+    """
+    Extract booking information from voice transcript
     
-    # Extract time
-    time_match = re.search(r"(?:at|around) (\d{1,2})(?::(\d{2}))? ?(am|pm|a\.m\.|p\.m\.)?", transcript, re.IGNORECASE)
-    if time_match:
-        hour = int(time_match.group(1))
-        minute = time_match.group(2)
-        minute = int(minute) if minute else 0
+    Args:
+        transcript (str): Transcribed text from user's speech
         
-        # Handle AM/PM
-        ampm = time_match.group(3)
-        if ampm and ('p' in ampm.lower()) and hour < 12:
-            hour += 12
-        elif ampm and ('a' in ampm.lower()) and hour == 12:
-            hour = 0
-            
-        # Format time as HH:MM
-        booking_data['booking_time'] = f"{hour:02d}:{minute:02d}"
+    Returns:
+        tuple: (booking_data dict, response_text string)
+    """
+    booking_data = extract_booking_slots(transcript)
     
     # Generate response text based on extracted information
     response_text = "Thank you for your booking request. "
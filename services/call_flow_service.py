@@ -0,0 +1,690 @@
+"""
+Table-driven conversation flow for phone bookings.
+
+Each stage in CALL_FLOW names a handler that receives the call state and
+the caller's speech, updates state['booking_data'] and returns a CallTurn
+with the stage to move to and what to say. The /twilio/turn webhook loads
+the state once, runs one stage, and saves the state once.
+
+Callers often say more than the question asked for ("a table for four
+tomorrow at 7, it's Sam"). Every stage keeps whatever slots it can pick out
+of the utterance and the flow then asks for the first slot still missing,
+so a caller who volunteers everything goes straight to confirmation.
+
+To add a stage, write a handler and add an entry to CALL_FLOW.
+"""
+import re
+import time
+from datetime import datetime, timedelta
+from typing import List, NamedTuple, Optional
+from flask import current_app
+from app import db
+from models import VoiceInteraction
+from services.booking_service import BOOKING_DUPLICATE, create_booking, extract_booking_slots
+from services.call_session_service import save_call_state, delete_call_state
+from services.customer_service import find_customer
+from services.availability_service import find_alternatives, get_open_slots
+from services.slot_hold_service import place_hold, get_active_hold, release_hold
+from services.call_stats_service import record_stage_stats
+from services.restaurant_service import get_restaurant_config, time_to_minutes, DEFAULT_RESTAURANT_ID
+from services.unit_of_work import unit_of_work
+from utils.speech_parser import parse_name, parse_party_size, parse_date, parse_time, parse_confirmation
+
+class CallTurn(NamedTuple):
+    """Outcome of one conversation turn"""
+    next_stage: Optional[str]   # stage for the caller's next answer; None ends the call
+    messages: List[str]         # sentences to say, in order
+
+FIRST_STAGE = 'name'
+
+# Booking data key -> stage that asks for it, in the order they are asked
+SLOT_STAGES = [
+    ('customer_name', 'name'),
+    ('party_size', 'party_size'),
+    ('booking_date', 'date'),
+    ('booking_time', 'time'),
+]
+
+# Slots whose change means a checked time has to be checked again
+_AVAILABILITY_SLOTS = frozenset(['party_size', 'booking_date', 'booking_time'])
+
+# Times a stage may re-ask before the call is handed off
+MAX_STAGE_RETRIES = 3
+
+# Speech shorter than this is treated as "nothing recognised"
+MIN_SPEECH_LENGTH = 3
+
+# Parties larger than this are read back before a table is held for them
+LARGE_PARTY_SIZE = 12
+
+GREETING = (
+    "Welcome to our restaurant booking system. "
+    "My name is Alex, and I'll help you make a reservation. "
+    "What's your name?"
+)
+RETURNING_GREETING = (
+    "Welcome back to our restaurant, {name}! "
+    "Would you like a table for {party_size} again? Just say yes, or tell me how many people."
+)
+RETURNING_GREETING_NO_PARTY = "Welcome back to our restaurant, {name}! How many people will be in your party?"
+GIVE_UP_MESSAGE = (
+    "I'm sorry, I'm having trouble understanding. "
+    "Please call our restaurant directly during business hours. Goodbye!"
+)
+NAME_REPROMPT = "I'm sorry, I didn't catch your name. Could you please tell me your name?"
+PARTY_SIZE_REPROMPT = (
+    "I'm sorry, I didn't catch how many people will be in your party. "
+    "Could you please tell me the number of people?"
+)
+DATE_REPROMPT = (
+    "I'm sorry, I didn't catch the date you'd like to book. "
+    "Could you please tell me the date, like 'today', 'tomorrow', or a specific date?"
+)
+TIME_REPROMPT = (
+    "I'm sorry, I didn't catch the time you'd like to book. "
+    "Could you please tell me the time, like '7 PM' or '6:30'?"
+)
+NAME_QUESTION = "Can I take your name for the booking?"
+PARTY_SIZE_QUESTION = "How many people will be in your party?"
+DATE_QUESTION = (
+    "What date would you like to book? "
+    "For example, you can say 'today', 'tomorrow', or a specific date."
+)
+TIME_QUESTION = "What time would you like to book?"
+CONFIRMATION_REPROMPT = "I'm sorry, was that a yes or a no?"
+LARGE_PARTY_QUESTION = "Just to check, that's a table for {party_size} people? Please say yes or no."
+DIFFERENT_DATE_PROMPT = "Let's try a different date. What date would you like to book?"
+RETRY_DATE_PROMPT = "Let's try again. What date would you like to book?"
+ALTERNATIVES_OUTRO = "Please say the time you would prefer, or say 'none' to try another date."
+MAX_ALTERNATIVES = 3
+# Days either side of the requested date searched for alternatives
+ALTERNATIVE_ADJACENT_DAYS = 1
+BOOKING_CONFIRMED_MESSAGE = (
+    "Excellent! Your reservation has been confirmed. "
+    "You'll receive a confirmation SMS with your booking details. "
+    "Thank you for choosing our restaurant. Goodbye!"
+)
+
+# Responses that never vary; the webhook prerenders their TwiML at startup
+STATIC_PROMPTS = [
+    GREETING, NAME_REPROMPT, PARTY_SIZE_REPROMPT, DATE_REPROMPT, TIME_REPROMPT,
+    NAME_QUESTION, PARTY_SIZE_QUESTION, DATE_QUESTION, TIME_QUESTION,
+    DIFFERENT_DATE_PROMPT, RETRY_DATE_PROMPT,
+]
+STATIC_GOODBYES = [GIVE_UP_MESSAGE, BOOKING_CONFIRMED_MESSAGE]
+
+def new_call_state(caller_number, customer=None):
+    """
+    Build the initial state for a new call
+
+    Args:
+        caller_number (str): Caller's phone number from Twilio
+        customer (CustomerProfile, optional): Profile of a returning caller
+
+    Returns:
+        dict: Conversation state positioned at the first stage to ask
+    """
+    state = {
+        'stage': FIRST_STAGE,
+        'retries': 0,
+        'asked_at': time.time(),  # when the current question was asked, for funnel timings
+        'caller_number': caller_number,
+        'booking_data': {
+            'customer_phone': caller_number,  # Pre-fill phone number
+            'restaurant_id': DEFAULT_RESTAURANT_ID
+        }
+    }
+
+    if customer:
+        # Returning caller: we already know the name, start at the party size
+        state['stage'] = 'party_size'
+        state['customer_id'] = customer.id
+        state['usual_party_size'] = customer.usual_party_size
+        state['booking_data']['customer_name'] = customer.name
+    return state
+
+def greeting(state):
+    """Opening message for a state built by new_call_state()"""
+    if not state.get('customer_id'):
+        return GREETING
+    name = state['booking_data']['customer_name']
+    if state.get('usual_party_size'):
+        return RETURNING_GREETING.format(name=name, party_size=state['usual_party_size'])
+    return RETURNING_GREETING_NO_PARTY.format(name=name)
+
+def start_call(caller_number):
+    """
+    Set up a new call, recognising repeat callers by phone number
+
+    Args:
+        caller_number (str): Caller's phone number from Twilio
+
+    Returns:
+        tuple: (state dict, greeting messages list)
+    """
+    state = new_call_state(caller_number, find_customer(caller_number))
+    record_stage_stats({state['stage']: {'entries': 1}})
+    return state, [greeting(state)]
+
+QUESTIONS = {
+    'name': NAME_QUESTION,
+    'party_size': PARTY_SIZE_QUESTION,
+    'date': DATE_QUESTION,
+    'time': TIME_QUESTION,
+}
+
+# "the first one", "option 2", "second"
+_OFFERED_CHOICE_RE = re.compile(
+    r"\b(?:(first|second|third)|option\s+(one|two|three|1|2|3))\b", re.I
+)
+_CHOICE_INDEX = {
+    'first': 0, 'one': 0, '1': 0,
+    'second': 1, 'two': 1, '2': 1,
+    'third': 2, 'three': 2, '3': 2,
+}
+
+def _is_empty(speech):
+    """Twilio sends an empty or garbled SpeechResult when it recognised nothing"""
+    return not speech or len(speech.strip()) < MIN_SPEECH_LENGTH
+
+def _format_date(booking_date):
+    return booking_date.strftime("%A, %B %d")
+
+def _say(*parts):
+    """Join non-empty sentences into one message"""
+    return ' '.join(part for part in parts if part)
+
+def _confirmation_prompt(booking_data):
+    customer_name = booking_data.get('customer_name', 'you')
+    return (
+        f"Great, I have a table for {booking_data['party_size']} on "
+        f"{_format_date(booking_data['booking_date'])} at {booking_data['booking_time']}. "
+        f"Is this correct, {customer_name}? Please say yes or no."
+    )
+
+def _duplicate_booking_message(booking):
+    return (
+        f"Good news, you already have a table for {booking.party_size} on "
+        f"{_format_date(booking.booking_date)} at {booking.booking_time} under this number, "
+        "so there's nothing more to do. Thank you and goodbye!"
+    )
+
+def _offer_alternatives(state, intro):
+    """
+    Offer the open times nearest to the one the caller asked for
+
+    Args:
+        state (dict): Conversation state with requested_time set
+        intro (str): What to say before the options
+
+    Returns:
+        CallTurn: The alternative_time stage with the options read out
+    """
+    booking_data = state['booking_data']
+    booking_date = booking_data['booking_date']
+    # Calls from before requested_time was kept are offered the earliest times, as they were then
+    alternatives = find_alternatives(
+        booking_data.get('restaurant_id'), booking_date, state.get('requested_time') or '00:00',
+        booking_data['party_size'], state.get('call_sid'),
+        count=MAX_ALTERNATIVES, adjacent_days=ALTERNATIVE_ADJACENT_DAYS
+    )
+
+    # Offered dates are kept only when another day is on offer
+    state['offered_times'] = [alternative.time for alternative in alternatives]
+    state['offered_dates'] = [alternative.booking_date for alternative in alternatives]
+    if all(offered_date == booking_date for offered_date in state['offered_dates']):
+        del state['offered_dates']
+
+    messages = [intro]
+    for i, alternative in enumerate(alternatives):
+        if alternative.booking_date == booking_date:
+            messages.append(f"Option {i+1}: {alternative.time}")
+        else:
+            messages.append(f"Option {i+1}: {alternative.time} on {_format_date(alternative.booking_date)}")
+    messages.append(ALTERNATIVES_OUTRO)
+    return CallTurn('alternative_time', messages)
+
+def _volunteered_slots(speech, own_slot=None):
+    """
+    Slots the caller mentioned besides the one the current stage asked for
+
+    Names are only taken at the name stage: later answers such as "I'm
+    happy with that" read like introductions.
+
+    Args:
+        speech (str): Caller's utterance
+        own_slot (str, optional): Key the stage parses itself, more leniently
+
+    Returns:
+        dict: Extracted slots
+    """
+    if _is_empty(speech):
+        return {}
+    slots = extract_booking_slots(speech)
+    slots.pop('customer_name', None)
+    slots.pop(own_slot, None)
+    return slots
+
+def _fill_slots(state, slots):
+    """
+    Store extracted slots in the booking data
+
+    Args:
+        state (dict): Conversation state, updated in place
+        slots (dict): Slot values, None values are ignored
+
+    Returns:
+        list: Keys that were provided, changed or not
+    """
+    booking_data = state['booking_data']
+    provided = []
+    for key, value in slots.items():
+        if value is None:
+            continue
+        if key in _AVAILABILITY_SLOTS and booking_data.get(key) != value:
+            state['time_checked'] = False
+        booking_data[key] = value
+        provided.append(key)
+    return provided
+
+def _acknowledge(booking_data, provided):
+    """Repeat back the slots just given, in one or two short sentences"""
+    parts = []
+    if 'customer_name' in provided:
+        parts.append(f"Thanks, {booking_data['customer_name']}.")
+
+    has_party = 'party_size' in provided
+    has_date = 'booking_date' in provided
+    if has_party and has_date:
+        parts.append(
+            f"I've got a table for {booking_data['party_size']} on {_format_date(booking_data['booking_date'])}."
+        )
+    elif has_party:
+        parts.append(f"Great, a table for {booking_data['party_size']}.")
+    elif has_date:
+        parts.append(f"I've set your reservation date for {_format_date(booking_data['booking_date'])}.")
+    return ' '.join(parts)
+
+def _open_slots(state):
+    """Slots with room for this party, not counting this call's own hold"""
+    booking_data = state['booking_data']
+    return get_open_slots(
+        booking_data.get('restaurant_id'), booking_data['booking_date'],
+        booking_data['party_size'], state.get('call_sid')
+    )
+
+def _hold_time(state):
+    """
+    Hold the checked time so nobody else can take it while the caller confirms
+
+    Returns:
+        bool: False if another caller or booking took the seats since they were offered
+    """
+    booking_data = state['booking_data']
+    if state.get('call_sid') and not place_hold(
+            state['call_sid'], booking_data.get('restaurant_id', DEFAULT_RESTAURANT_ID),
+            booking_data['booking_date'], booking_data['booking_time'], booking_data['party_size']):
+        return False
+    state['time_checked'] = True
+    return True
+
+def _check_time(state, intro):
+    """
+    Check the requested time against opening hours and availability
+
+    Args:
+        state (dict): Conversation state with a booking_time to check
+        intro (str): Acknowledgement to say first
+
+    Returns:
+        CallTurn: Confirmation, or the time/alternative stage when it can't be booked
+    """
+    booking_data = state['booking_data']
+    booking_time = booking_data['booking_time']
+
+    # Check if restaurant is open at this time
+    restaurant = get_restaurant_config(booking_data.get('restaurant_id'))
+    if restaurant and not restaurant.is_open_at(time_to_minutes(booking_time)):
+        del booking_data['booking_time']
+        return CallTurn('time', [_say(
+            intro,
+            f"I'm sorry, our restaurant is only open from {restaurant.opening_time} to {restaurant.closing_time}. "
+            "Please choose a time within our business hours."
+        )])
+
+    available_slots = _open_slots(state)
+    if any(slot['time'] == booking_time for slot in available_slots) and _hold_time(state):
+        return CallTurn('confirmation', [_say(intro, _confirmation_prompt(booking_data))])
+
+    state['requested_time'] = booking_data.pop('booking_time')
+    return _offer_alternatives(
+        state, _say(intro, "I'm sorry, that time is not available. Here are some alternative times: ")
+    )
+
+def _ask_next(state, intro=''):
+    """
+    Move to the first slot still missing, or check the time and confirm
+
+    A large party is read back first, before anything is held for it.
+
+    Args:
+        state (dict): Conversation state
+        intro (str): Acknowledgement to say before the question
+
+    Returns:
+        CallTurn: Next stage and the messages to say
+    """
+    booking_data = state['booking_data']
+    party_size = booking_data.get('party_size')
+    if party_size and party_size > LARGE_PARTY_SIZE and state.get('confirmed_party_size') != party_size:
+        return CallTurn('party_size_check', [_say(intro, LARGE_PARTY_QUESTION.format(party_size=party_size))])
+
+    for key, stage in SLOT_STAGES:
+        if not booking_data.get(key):
+            return CallTurn(stage, [_say(intro, QUESTIONS[stage])])
+
+    if not state.get('time_checked'):
+        return _check_time(state, intro)
+    return CallTurn('confirmation', [_say(intro, _confirmation_prompt(booking_data))])
+
+def _collect(state, speech, key, value, reprompt):
+    """
+    Store a stage's own answer plus anything volunteered alongside it
+
+    Args:
+        state (dict): Conversation state, updated in place
+        speech (str): Caller's utterance
+        key (str): Booking data key the stage asks for
+        value: Parsed answer for that key, or None
+        reprompt (str): What to say when nothing usable was heard
+
+    Returns:
+        CallTurn: Next stage and the messages to say
+    """
+    slots = _volunteered_slots(speech, key)
+    slots[key] = value
+    provided = _fill_slots(state, slots)
+    if not provided:
+        return CallTurn(SLOT_STAGES_BY_KEY[key], [reprompt])
+    return _ask_next(state, _acknowledge(state['booking_data'], provided))
+
+def _handle_name(state, speech):
+    name_result = parse_name(speech)
+    return _collect(state, speech, 'customer_name', name_result.value if name_result else None, NAME_REPROMPT)
+
+def _party_size_beside_time(party_result, speech):
+    """Whether a bare number is really part of the time said with it ("tomorrow at 7:30")"""
+    time_result = parse_time(speech)
+    return (party_result.matched.isdigit() and time_result is not None
+            and party_result.matched in re.findall(r"\d+", time_result.matched))
+
+def _handle_party_size(state, speech):
+    party_result = parse_party_size(speech)
+    if party_result and _party_size_beside_time(party_result, speech):
+        party_result = None
+    party_size = party_result.value if party_result else None
+
+    # "Yes" to a returning caller's usual party size
+    usual_party_size = state.get('usual_party_size')
+    if not party_size and usual_party_size:
+        confirmation = parse_confirmation(speech)
+        if confirmation and confirmation.value:
+            party_size = usual_party_size
+
+    # Default to the usual size, or 2 people, when Twilio couldn't recognise the speech
+    if not party_size and _is_empty(speech):
+        party_size = usual_party_size or 2
+        state['defaulted'] = True
+
+    state['booking_data'].setdefault('restaurant_id', DEFAULT_RESTAURANT_ID)
+    return _collect(state, speech, 'party_size', party_size, PARTY_SIZE_REPROMPT)
+
+def _handle_party_size_check(state, speech):
+    booking_data = state['booking_data']
+
+    # "No, five": a corrected size replaces the one read back
+    party_result = parse_party_size(speech)
+    if (party_result and party_result.value != booking_data['party_size']
+            and not _party_size_beside_time(party_result, speech)):
+        return _handle_party_size(state, speech)
+
+    # Keep a date or time said instead of an answer
+    _fill_slots(state, _volunteered_slots(speech, 'party_size'))
+    confirmation = parse_confirmation(speech)
+    if confirmation is None:
+        return CallTurn('party_size_check', [
+            _say(CONFIRMATION_REPROMPT, LARGE_PARTY_QUESTION.format(party_size=booking_data['party_size']))
+        ])
+    if not confirmation.value:
+        booking_data.pop('party_size', None)
+        return CallTurn('party_size', [PARTY_SIZE_QUESTION])
+
+    state['confirmed_party_size'] = booking_data['party_size']
+    return _ask_next(state)
+
+def _handle_date(state, speech):
+    date_result = parse_date(speech)
+    booking_date = date_result.value if date_result else None
+
+    # Default to tomorrow when Twilio couldn't recognise the speech
+    if not booking_date and _is_empty(speech):
+        booking_date = datetime.today().date() + timedelta(days=1)
+        state['defaulted'] = True
+
+    return _collect(state, speech, 'booking_date', booking_date, DATE_REPROMPT)
+
+def _handle_time(state, speech):
+    booking_data = state['booking_data']
+    time_result = parse_time(speech)
+
+    if not time_result and _is_empty(speech):
+        # Nothing recognised: offer the first available slot
+        available_slots = _open_slots(state)
+        if not available_slots:
+            return CallTurn('time', [TIME_REPROMPT])
+
+        default_time = available_slots[0]['time']
+        booking_data['booking_time'] = default_time
+        state['defaulted'] = True
+        if not _hold_time(state):
+            return _check_time(state, '')
+        return CallTurn('confirmation', [
+            f"I've scheduled you for {default_time}, our most popular time. "
+            f"So that's a table for {booking_data['party_size']} on {_format_date(booking_data['booking_date'])} at {default_time}. "
+            f"Is this correct, {booking_data.get('customer_name', 'you')}? Please say yes or no."
+        ])
+
+    return _collect(state, speech, 'booking_time', time_result.value if time_result else None, TIME_REPROMPT)
+
+def _handle_alternative_time(state, speech):
+    booking_data = state['booking_data']
+    speech_lower = (speech or '').lower()
+    if "none" in speech_lower or "different date" in speech_lower:
+        booking_data.pop('booking_date', None)
+        return CallTurn('date', [DIFFERENT_DATE_PROMPT])
+
+    choice = _OFFERED_CHOICE_RE.search(speech_lower)
+    offered = state.get('offered_times') or []
+    index = _CHOICE_INDEX[choice.group(1) or choice.group(2)] if choice else None
+    if index is not None and index < len(offered):
+        # "the first one" is a choice, not the 1st of the month
+        slots = {'booking_time': offered[index]}
+        offered_dates = state.get('offered_dates')
+        if offered_dates and index < len(offered_dates):
+            slots['booking_date'] = offered_dates[index]
+    else:
+        time_result = parse_time(speech)
+        slots = _volunteered_slots(speech, 'booking_time')
+        slots['booking_time'] = time_result.value if time_result else None
+
+    provided = _fill_slots(state, slots)
+    if provided:
+        return _ask_next(state, _acknowledge(booking_data, provided))
+
+    return _offer_alternatives(
+        state, "I'm sorry, I didn't understand your choice. Here are the available times again: "
+    )
+
+def _handle_confirmation(state, speech):
+    booking_data = state['booking_data']
+    confirmation = parse_confirmation(speech)
+
+    # "No, make it 8pm" / "yes, but for five": apply the change and confirm again
+    provided = _fill_slots(state, _volunteered_slots(speech))
+    if any(key in _AVAILABILITY_SLOTS for key in provided):
+        return _ask_next(state, _acknowledge(booking_data, provided))
+
+    if confirmation is None:
+        return CallTurn('confirmation', [_say(CONFIRMATION_REPROMPT, _confirmation_prompt(booking_data))])
+
+    if not confirmation.value:
+        release_hold(state.get('call_sid'))
+        booking_data.pop('booking_date', None)
+        booking_data.pop('booking_time', None)
+        return CallTurn('date', [RETRY_DATE_PROMPT])
+
+    # The hold timed out while the caller was deciding: check the table is still free
+    if state.get('call_sid') and not get_active_hold(state['call_sid']):
+        state['time_checked'] = False
+        return _check_time(state, "Let me just check that table is still free.")
+
+    # create_booking turns the hold into the booking in the same commit
+    booking, success, message, code = create_booking(booking_data, call_sid=state.get('call_sid'))
+    state['booking_id'] = booking.id if success else None
+
+    if success:
+        return CallTurn(None, [BOOKING_CONFIRMED_MESSAGE])
+
+    if code == BOOKING_DUPLICATE:
+        # Usually a caller who was cut off and rang back after the first booking went through
+        state['duplicate_of'] = booking.id
+        release_hold(state.get('call_sid'))
+        return CallTurn(None, [_duplicate_booking_message(booking)])
+
+    return CallTurn(None, [
+        f"I'm sorry, there was an issue creating your booking: {message} "
+        "Please try again later or call our restaurant directly. Thank you and goodbye!"
+    ])
+
+# Stage name -> handler and the label recorded on VoiceInteraction rows
+CALL_FLOW = {
+    'name': {'label': 'Name collection', 'handle': _handle_name},
+    'party_size': {'label': 'Party size collection', 'handle': _handle_party_size},
+    'party_size_check': {'label': 'Large party check', 'handle': _handle_party_size_check},
+    'date': {'label': 'Date collection', 'handle': _handle_date},
+    'time': {'label': 'Time collection', 'handle': _handle_time},
+    'alternative_time': {'label': 'Alternative time selection', 'handle': _handle_alternative_time},
+    'confirmation': {'label': 'Booking confirmation', 'handle': _handle_confirmation},
+}
+
+SLOT_STAGES_BY_KEY = dict(SLOT_STAGES)
+
+def current_stage(state):
+    """Stage the next utterance belongs to, tolerating unknown/legacy stage names"""
+    stage = state.get('stage')
+    return stage if stage in CALL_FLOW else FIRST_STAGE
+
+def stage_label(stage):
+    """Human readable label for a stage"""
+    return CALL_FLOW.get(stage, CALL_FLOW[FIRST_STAGE])['label']
+
+def run_turn(state, speech):
+    """
+    Advance the conversation by one caller utterance
+
+    Args:
+        state (dict): Conversation state, updated in place
+        speech (str): Twilio SpeechResult for the current stage
+
+    Returns:
+        CallTurn: Next stage and the messages to say
+    """
+    stage = current_stage(state)
+    current_app.logger.debug(f"Call turn: stage={stage} speech={speech!r}")
+
+    turn = CALL_FLOW[stage]['handle'](state, speech)
+
+    if turn.next_stage == stage:
+        state['retries'] = state.get('retries', 0) + 1
+        if state['retries'] > MAX_STAGE_RETRIES:
+            turn = CallTurn(None, [GIVE_UP_MESSAGE])
+    else:
+        state['retries'] = 0
+
+    state['stage'] = turn.next_stage
+    return turn
+
+def _record_turn_stats(state, stage, next_stage):
+    """Count the turn in the funnel: time to answer, retry or exit, and entry to the next stage"""
+    now = time.time()
+    counts = {'time_spent_ms': max(0, int((now - state.get('asked_at', now)) * 1000))}
+    if state.pop('defaulted', False):
+        counts['defaults_applied'] = 1
+
+    increments = {stage: counts}
+    if next_stage == stage:
+        counts['retries'] = 1
+    elif next_stage is None:
+        if state.get('booking_id'):
+            counts['completions'] = 1
+        elif state.get('duplicate_of'):
+            counts['duplicates'] = 1
+        else:
+            counts['abandonments'] = 1
+    else:
+        increments[next_stage] = {'entries': 1}
+
+    state['asked_at'] = now
+    record_stage_stats(increments)
+
+def record_hangup(state):
+    """
+    Count a caller hanging up mid-conversation as an abandonment of their stage
+
+    Args:
+        state (dict): Conversation state of the call, before it is deleted
+    """
+    stage = state.get('stage')
+    if stage not in CALL_FLOW:
+        return
+    now = time.time()
+    record_stage_stats({stage: {
+        'abandonments': 1,
+        'time_spent_ms': max(0, int((now - state.get('asked_at', now)) * 1000))
+    }})
+
+def advance_call(call_sid, state, speech):
+    """
+    Run one turn and persist it with a single commit
+
+    Records the VoiceInteraction, then saves the state, or drops it when
+    the call is over. A booking made during the turn, with its audit entry,
+    commits in the same transaction. Shared by the Gather webhook and the
+    media stream.
+
+    Args:
+        call_sid (str): Twilio CallSid
+        state (dict): Conversation state loaded for this call
+        speech (str): Caller's utterance
+
+    Returns:
+        CallTurn: Next stage and the messages to say
+    """
+    with unit_of_work():
+        db.session.add(VoiceInteraction(
+            transcript=speech,
+            response_text=stage_label(current_stage(state))
+        ))
+
+        state['call_sid'] = call_sid
+        stage = current_stage(state)
+        turn = run_turn(state, speech)
+        _record_turn_stats(state, stage, turn.next_stage)
+
+        if turn.next_stage is None:
+            # Booked (hold already converted) or given up: free any held table
+            release_hold(call_sid)
+            delete_call_state(call_sid)
+        else:
+            save_call_state(call_sid, state)
+    return turn
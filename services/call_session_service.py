@@ -0,0 +1,334 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from flask import current_app
+from app import db
+from models import CallSession
+from services.unit_of_work import commit, in_unit_of_work
+
+# Shared store instance, created lazily from the app config
+_call_session_store = None
+_store_lock = threading.Lock()
+
+# How many writes happen between sweeps of expired/overflowing sessions
+PURGE_EVERY_WRITES = 100
+
+def _encode_value(value):
+    """JSON hook for values the call state holds that JSON can't represent"""
+    if isinstance(value, datetime):
+        return {'__datetime__': value.isoformat()}
+    if isinstance(value, date):
+        return {'__date__': value.isoformat()}
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def _decode_value(obj):
+    """JSON object hook reversing _encode_value"""
+    if '__date__' in obj:
+        return date.fromisoformat(obj['__date__'])
+    if '__datetime__' in obj:
+        return datetime.fromisoformat(obj['__datetime__'])
+    return obj
+
+def encode_state(state):
+    """
+    Serialize a conversation state dict
+
+    Args:
+        state (dict): Conversation state, may contain date/datetime values
+
+    Returns:
+        str: JSON string
+    """
+    return json.dumps(state, default=_encode_value, separators=(',', ':'))
+
+def decode_state(data):
+    """
+    Deserialize a conversation state dict produced by encode_state
+
+    Args:
+        data (str | bytes): JSON string
+
+    Returns:
+        dict: Conversation state
+    """
+    return json.loads(data, object_hook=_decode_value)
+
+class MemoryCallSessionStore:
+    """
+    In-process store with TTL expiry and LRU eviction.
+
+    Only safe with a single worker process; useful for development and tests.
+    States are kept serialized so callers never share mutable dicts, which
+    keeps the semantics identical to the out-of-process backends.
+    """
+
+    def __init__(self, ttl_seconds, max_sessions):
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+        self._sessions = OrderedDict()  # call_sid -> (expires_at, encoded state)
+        self._lock = threading.Lock()
+
+    def get(self, call_sid):
+        with self._lock:
+            entry = self._sessions.get(call_sid)
+            if entry is None:
+                return None
+            expires_at, data = entry
+            if expires_at <= time.monotonic():
+                del self._sessions[call_sid]
+                return None
+            self._sessions.move_to_end(call_sid)
+        return decode_state(data)
+
+    def set(self, call_sid, state):
+        data = encode_state(state)
+        with self._lock:
+            self._sessions[call_sid] = (time.monotonic() + self.ttl_seconds, data)
+            self._sessions.move_to_end(call_sid)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+
+    def delete(self, call_sid):
+        with self._lock:
+            self._sessions.pop(call_sid, None)
+
+    def purge_expired(self):
+        now = time.monotonic()
+        with self._lock:
+            expired = [sid for sid, (expires_at, _) in self._sessions.items() if expires_at <= now]
+            for sid in expired:
+                del self._sessions[sid]
+        return len(expired)
+
+class SQLCallSessionStore:
+    """
+    Store backed by the application database (SQLite or PostgreSQL).
+
+    Works across gunicorn workers and nodes sharing the same database.
+    Expired and excess sessions are swept every PURGE_EVERY_WRITES writes.
+    """
+
+    def __init__(self, ttl_seconds, max_sessions):
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+        self._writes = 0
+
+    def get(self, call_sid):
+        session_row = db.session.get(CallSession, call_sid)
+        if session_row is None:
+            return None
+        if session_row.expires_at <= datetime.utcnow():
+            return None
+        return decode_state(session_row.state_data)
+
+    def set(self, call_sid, state):
+        now = datetime.utcnow()
+        session_row = db.session.get(CallSession, call_sid)
+        if session_row is None:
+            session_row = CallSession(call_sid=call_sid)
+            db.session.add(session_row)
+        session_row.state_data = encode_state(state)
+        session_row.expires_at = now + timedelta(seconds=self.ttl_seconds)
+        session_row.updated_at = now
+        commit()
+
+        self._writes += 1
+        if self._writes % PURGE_EVERY_WRITES == 0:
+            self.purge_expired()
+
+    def delete(self, call_sid):
+        CallSession.query.filter(CallSession.call_sid == call_sid).delete(synchronize_session=False)
+        commit()
+
+    def purge_expired(self):
+        removed = CallSession.query.filter(
+            CallSession.expires_at <= datetime.utcnow()
+        ).delete(synchronize_session=False)
+
+        # Enforce the size bound by dropping the least recently updated sessions
+        overflow = CallSession.query.count() - self.max_sessions
+        if overflow > 0:
+            oldest = db.session.query(CallSession.call_sid).order_by(
+                CallSession.updated_at.asc()
+            ).limit(overflow).subquery()
+            removed += CallSession.query.filter(
+                CallSession.call_sid.in_(db.select(oldest.c.call_sid))
+            ).delete(synchronize_session=False)
+
+        commit()
+        return removed
+
+class RedisCallSessionStore:
+    """
+    Store backed by any Redis-protocol server (Redis, Valkey, KeyDB).
+
+    Keys expire natively; a sorted set of last-write times bounds the
+    number of live sessions.
+    """
+
+    KEY_PREFIX = 'call_session:'
+    INDEX_KEY = 'call_session_index'
+
+    def __init__(self, ttl_seconds, max_sessions, redis_url):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("The redis package is required for CALL_STATE_BACKEND=redis")
+
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+        self._client = redis.Redis.from_url(redis_url)
+
+    def get(self, call_sid):
+        data = self._client.get(self.KEY_PREFIX + call_sid)
+        if data is None:
+            return None
+        return decode_state(data)
+
+    def set(self, call_sid, state):
+        pipe = self._client.pipeline()
+        pipe.set(self.KEY_PREFIX + call_sid, encode_state(state), ex=self.ttl_seconds)
+        pipe.zadd(self.INDEX_KEY, {call_sid: time.time()})
+        pipe.zcard(self.INDEX_KEY)
+        size = pipe.execute()[-1]
+
+        if size > self.max_sessions:
+            evicted = self._client.zpopmin(self.INDEX_KEY, size - self.max_sessions)
+            if evicted:
+                self._client.delete(*[self.KEY_PREFIX + sid.decode() for sid, _ in evicted])
+
+    def delete(self, call_sid):
+        pipe = self._client.pipeline()
+        pipe.delete(self.KEY_PREFIX + call_sid)
+        pipe.zrem(self.INDEX_KEY, call_sid)
+        pipe.execute()
+
+    def purge_expired(self):
+        # Keys expire on their own; only trim index entries older than the TTL
+        return self._client.zremrangebyscore(self.INDEX_KEY, 0, time.time() - self.ttl_seconds)
+
+def create_call_session_store(config):
+    """
+    Build a call session store from application config
+
+    Args:
+        config (dict): Flask config with CALL_STATE_* settings
+
+    Returns:
+        Store instance exposing get/set/delete/purge_expired
+    """
+    backend = (config.get('CALL_STATE_BACKEND') or 'sql').lower()
+    ttl_seconds = int(config.get('CALL_STATE_TTL', 3600))
+    max_sessions = int(config.get('CALL_STATE_MAX_SESSIONS', 10000))
+
+    if backend == 'memory':
+        return MemoryCallSessionStore(ttl_seconds, max_sessions)
+    if backend == 'sql':
+        return SQLCallSessionStore(ttl_seconds, max_sessions)
+    if backend == 'redis':
+        return RedisCallSessionStore(ttl_seconds, max_sessions, config.get('REDIS_URL', 'redis://localhost:6379/0'))
+
+    raise ValueError(f"Unknown CALL_STATE_BACKEND: {backend}")
+
+def get_call_session_store():
+    """Get the shared call session store, creating it on first use"""
+    global _call_session_store
+
+    if _call_session_store is None:
+        with _store_lock:
+            if _call_session_store is None:
+                _call_session_store = create_call_session_store(current_app.config)
+                current_app.logger.info(f"Call session store: {type(_call_session_store).__name__}")
+
+    return _call_session_store
+
+def load_call_state(call_sid):
+    """
+    Load the conversation state for a call
+
+    Args:
+        call_sid (str): Twilio CallSid
+
+    Returns:
+        dict: Conversation state, or None if the call is unknown or expired
+    """
+    if not call_sid:
+        return None
+
+    try:
+        return get_call_session_store().get(call_sid)
+    except Exception as e:
+        current_app.logger.error(f"Error loading call state for {call_sid}: {str(e)}")
+        return None
+
+def save_call_state(call_sid, state):
+    """
+    Save the conversation state for a call, refreshing its TTL
+
+    Args:
+        call_sid (str): Twilio CallSid
+        state (dict): Conversation state
+
+    Returns:
+        bool: True if the state was saved
+    """
+    if not call_sid:
+        return False
+
+    try:
+        with _store_write() as store:
+            store.set(call_sid, state)
+        return True
+    except Exception as e:
+        current_app.logger.error(f"Error saving call state for {call_sid}: {str(e)}")
+        _rollback_quietly()
+        return False
+
+def delete_call_state(call_sid):
+    """
+    Remove the conversation state for a finished call
+
+    Args:
+        call_sid (str): Twilio CallSid
+    """
+    if not call_sid:
+        return
+
+    try:
+        with _store_write() as store:
+            store.delete(call_sid)
+    except Exception as e:
+        current_app.logger.error(f"Error deleting call state for {call_sid}: {str(e)}")
+        _rollback_quietly()
+
+@contextmanager
+def _store_write():
+    """
+    Write to the store; inside a unit of work a failed SQL write undoes only itself
+
+    The SQL store shares the session with the rest of the turn's writes,
+    such as the booking just made, so its writes go in a savepoint.
+    """
+    store = get_call_session_store()
+    if isinstance(store, SQLCallSessionStore) and in_unit_of_work():
+        with db.session.begin_nested():
+            yield store
+    else:
+        yield store
+
+def _rollback_quietly():
+    """
+    Reset the DB session after a failed store write so the request can continue
+
+    Inside a unit of work the failed write was already undone by its
+    savepoint, and the session still holds the rest of the turn's writes.
+    """
+    if in_unit_of_work():
+        return
+    try:
+        db.session.rollback()
+    except Exception:
+        pass
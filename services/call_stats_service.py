@@ -0,0 +1,64 @@
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import func, select
+from app import db
+from models import CallStageStat
+from utils.db_helpers import upsert_add
+
+COUNTERS = ['entries', 'retries', 'defaults_applied', 'abandonments', 'completions', 'duplicates', 'time_spent_ms']
+
+def record_stage_stats(increments):
+    """
+    Add to today's per-stage funnel counters
+
+    One upsert for all stages touched by a turn; does not commit, so the
+    counters are saved with the turn itself.
+
+    Args:
+        increments (dict): stage -> {counter: amount}
+    """
+    day = datetime.utcnow().date()
+    rows = []
+    for stage, counts in increments.items():
+        row = {'day': day, 'stage': stage}
+        for counter in COUNTERS:
+            row[counter] = int(counts.get(counter, 0))
+        rows.append(row)
+
+    try:
+        upsert_add(CallStageStat, rows, ['day', 'stage'], COUNTERS)
+    except Exception as e:
+        # Analytics must never break a call
+        current_app.logger.error(f"Error in record_stage_stats: {str(e)}")
+
+def get_call_funnel(start_date, end_date, stage_order=()):
+    """
+    Sum the funnel counters over a date range
+
+    Reads only the rollup rows (days x stages), never the interactions.
+
+    Args:
+        start_date (date): First day, inclusive
+        end_date (date): Last day, inclusive
+        stage_order (iterable, optional): Stages in call order; others follow
+
+    Returns:
+        list: One dict per stage with the counters and derived rates
+    """
+    rows = db.session.execute(
+        select(CallStageStat.stage, *[func.sum(getattr(CallStageStat, counter)) for counter in COUNTERS])
+        .where(CallStageStat.day.between(start_date, end_date))
+        .group_by(CallStageStat.stage)
+    ).all()
+
+    order = {stage: index for index, stage in enumerate(stage_order)}
+    funnel = []
+    for row in sorted(rows, key=lambda row: (order.get(row[0], len(order)), row[0])):
+        stats = {'stage': row[0]}
+        stats.update({counter: int(value or 0) for counter, value in zip(COUNTERS, row[1:])})
+        answers = stats['entries'] + stats['retries']
+        stats['retry_rate'] = round(stats['retries'] / answers, 4) if answers else 0.0
+        stats['abandonment_rate'] = round(stats['abandonments'] / stats['entries'], 4) if stats['entries'] else 0.0
+        stats['avg_answer_seconds'] = round(stats['time_spent_ms'] / answers / 1000.0, 2) if answers else 0.0
+        funnel.append(stats)
+    return funnel
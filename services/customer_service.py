@@ -0,0 +1,137 @@
+import json
+from datetime import datetime
+from typing import NamedTuple, Optional
+from flask import current_app
+from sqlalchemy import insert, select
+from app import db
+from models import Booking, Customer
+from utils.db_helpers import insert_ignore
+from utils.twilio_helper import normalize_phone_number
+
+class CustomerProfile(NamedTuple):
+    """What the call flow needs to know about a returning caller"""
+    id: int
+    name: str
+    usual_party_size: Optional[int]
+    booking_count: int
+
+def find_customer(phone_number):
+    """
+    Look up a returning caller by phone number
+
+    A single read on the unique phone index, so it stays fast however many
+    bookings are on file.
+
+    Args:
+        phone_number (str): Caller's number in any format
+
+    Returns:
+        CustomerProfile: The caller's profile, or None for new or withheld numbers
+    """
+    phone = normalize_phone_number(phone_number)
+    if not phone:
+        return None
+
+    try:
+        row = db.session.execute(
+            select(Customer.id, Customer.name, Customer.usual_party_size, Customer.booking_count)
+            .where(Customer.phone == phone)
+        ).first()
+    except Exception as e:
+        current_app.logger.error(f"Error in find_customer: {str(e)}")
+        return None
+
+    return CustomerProfile(*row) if row else None
+
+def record_customer_booking(customer_name, phone_number, party_size):
+    """
+    Update the caller's profile for a new booking
+
+    Runs inside the caller's transaction and does not commit, so the
+    profile and the booking are saved together.
+
+    Args:
+        customer_name (str): Name on the booking
+        phone_number (str): Phone number on the booking
+        party_size (int): Party size of the booking
+
+    Returns:
+        Customer: Updated profile, or None when the number can't be normalized
+    """
+    phone = normalize_phone_number(phone_number)
+    if not phone:
+        return None
+
+    customer = Customer.query.filter_by(phone=phone).first()
+    if customer is None:
+        # Two first bookings from the same number can race; only one row is created
+        insert_ignore(Customer, {
+            'phone': phone, 'name': customer_name, 'booking_count': 0, 'party_size_counts': '{}',
+            'created_at': datetime.utcnow(), 'updated_at': datetime.utcnow()
+        }, ['phone'])
+        customer = Customer.query.filter_by(phone=phone).first()
+
+    counts = json.loads(customer.party_size_counts or '{}')
+    size_key = str(party_size)
+    counts[size_key] = counts.get(size_key, 0) + 1
+
+    customer.name = customer_name
+    customer.party_size_counts = json.dumps(counts)
+    # Most frequent size; a tie goes to this booking's size
+    customer.usual_party_size = int(max(counts, key=lambda size: (counts[size], size == size_key)))
+    customer.booking_count = (customer.booking_count or 0) + 1
+    customer.last_booking_at = datetime.utcnow()
+    return customer
+
+def backfill_customers(batch_size=1000):
+    """
+    Build profiles for callers who booked before profiles existed
+
+    Streams bookings once in ID order and only creates profiles for numbers
+    that have none, so it is safe to run again.
+
+    Args:
+        batch_size (int): Profiles inserted per commit
+
+    Returns:
+        int: Number of profiles created
+    """
+    existing = set(db.session.execute(select(Customer.phone)).scalars())
+    profiles = {}
+
+    rows = db.session.execute(
+        select(Booking.customer_phone, Booking.customer_name, Booking.party_size, Booking.created_at)
+        .where(Booking.status != 'canceled')
+        .order_by(Booking.id)
+        .execution_options(yield_per=batch_size)
+    )
+    for phone_number, customer_name, party_size, created_at in rows:
+        phone = normalize_phone_number(phone_number)
+        if not phone or phone in existing:
+            continue
+        profile = profiles.setdefault(phone, {'counts': {}, 'booking_count': 0})
+        size_key = str(party_size)
+        profile['counts'][size_key] = profile['counts'].get(size_key, 0) + 1
+        profile['booking_count'] += 1
+        profile['name'] = customer_name
+        profile['last_size'] = size_key
+        profile['last_booking_at'] = created_at
+
+    now = datetime.utcnow()
+    values = [{
+        'phone': phone,
+        'name': profile['name'],
+        'usual_party_size': int(max(profile['counts'],
+                                    key=lambda size: (profile['counts'][size], size == profile['last_size']))),
+        'party_size_counts': json.dumps(profile['counts']),
+        'booking_count': profile['booking_count'],
+        'last_booking_at': profile['last_booking_at'],
+        'created_at': now,
+        'updated_at': now
+    } for phone, profile in profiles.items()]
+
+    for start in range(0, len(values), batch_size):
+        db.session.execute(insert(Customer), values[start:start + batch_size])
+        db.session.commit()
+
+    return len(values)
@@ -0,0 +1,172 @@
+"""
+Replay protection for webhooks and form posts.
+
+A view wrapped with @idempotent(key_func) claims the request's key before
+running. The claim, everything the view writes and the stored response
+are committed together, so a webhook turn is still one commit. A retry of
+a finished request gets the stored response without running the view
+again; a retry that arrives while the first is still running waits on the
+uncommitted claim's row lock and then replays it. Only successful
+responses are kept, so a request that failed can simply be sent again,
+and records expire after IDEMPOTENCY_TTL.
+"""
+import threading
+import time
+from datetime import datetime, timedelta
+from functools import wraps
+from flask import Response, current_app, jsonify, make_response
+from sqlalchemy import delete, select, update
+from sqlalchemy.exc import IntegrityError
+from app import db
+from models import IdempotencyRecord
+from services.unit_of_work import unit_of_work
+from utils.db_helpers import insert_ignore
+
+DEFAULT_TTL = 3600
+
+# A claim left behind by a crashed worker stops blocking retries after this
+PENDING_TTL = 30
+
+# How long a replay waits for the first request to finish; Twilio gives up after 15 s
+WAIT_SECONDS = 10
+POLL_SECONDS = 0.05
+
+# Expired records are ignored when claiming; they are deleted every N responses stored
+PURGE_EVERY_WRITES = 100
+
+REPLAYED_HEADER = 'Idempotent-Replayed'
+
+_writes = 0
+_writes_lock = threading.Lock()
+
+def _claim(key):
+    """
+    Take ownership of a key, replacing an expired record for it
+
+    The claim is not committed: it is saved with the view's writes.
+
+    Returns:
+        bool: True if this request should run the view
+    """
+    now = datetime.utcnow()
+    values = {'key': key, 'expires_at': now + timedelta(seconds=PENDING_TTL), 'created_at': now}
+    try:
+        claimed = insert_ignore(IdempotencyRecord, values, ['key'])
+        if not claimed:
+            # Only a retry reaches this; an expired record doesn't block it
+            expired = db.session.execute(
+                delete(IdempotencyRecord).where(IdempotencyRecord.key == key, IdempotencyRecord.expires_at <= now)
+            ).rowcount
+            if expired:
+                claimed = insert_ignore(IdempotencyRecord, values, ['key'])
+        # Without ON CONFLICT a concurrent claim only fails when flushed
+        db.session.flush()
+    except IntegrityError:
+        db.session.rollback()
+        return False
+    return claimed
+
+def _stored_response(key):
+    """The finished response for a key as (status, content type, body), or None"""
+    row = db.session.execute(
+        select(IdempotencyRecord.status_code, IdempotencyRecord.content_type, IdempotencyRecord.body)
+        .where(IdempotencyRecord.key == key, IdempotencyRecord.status_code.is_not(None))
+    ).first()
+    # End the read so the next poll sees other workers' commits
+    db.session.rollback()
+    return row
+
+def _wait_for_response(key):
+    """
+    Claim the key, or wait for the request holding it to finish
+
+    Returns:
+        Response: The stored or conflict response, or None when this request claimed the key
+    """
+    deadline = time.monotonic() + WAIT_SECONDS
+    while True:
+        if _claim(key):
+            return None
+
+        stored = _stored_response(key)
+        if stored is not None:
+            status_code, content_type, body = stored
+            response = Response(body, status=status_code, content_type=content_type)
+            response.headers[REPLAYED_HEADER] = 'true'
+            return response
+
+        if time.monotonic() >= deadline:
+            response = jsonify({'success': False, 'message': 'This request is still being processed'})
+            response.status_code = 409
+            response.headers['Retry-After'] = '1'
+            return response
+        time.sleep(POLL_SECONDS)
+
+def _complete(key, response):
+    """Store a successful response for replays, or drop the claim so a retry runs again"""
+    global _writes
+
+    if response.status_code < 400 and not response.is_streamed:
+        ttl = current_app.config.get('IDEMPOTENCY_TTL', DEFAULT_TTL)
+        db.session.execute(
+            update(IdempotencyRecord)
+            .where(IdempotencyRecord.key == key)
+            .values(status_code=response.status_code, content_type=response.content_type,
+                    body=response.get_data(), expires_at=datetime.utcnow() + timedelta(seconds=ttl))
+        )
+    else:
+        db.session.execute(delete(IdempotencyRecord).where(IdempotencyRecord.key == key))
+
+    with _writes_lock:
+        _writes += 1
+        purge = _writes % PURGE_EVERY_WRITES == 0
+    if purge:
+        purge_expired_records()
+
+def idempotent(key_func):
+    """
+    Run a view at most once per idempotency key
+
+    Args:
+        key_func (callable): Returns the current request's key, or None to
+            run the view unprotected
+
+    Returns:
+        callable: View decorator
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            key = key_func()
+            if not key:
+                return view(*args, **kwargs)
+
+            try:
+                replay = _wait_for_response(key)
+            except Exception as e:
+                # Never turn a store outage into a failed call or booking
+                db.session.rollback()
+                current_app.logger.error(f"Error checking idempotency key {key}: {str(e)}")
+                return view(*args, **kwargs)
+            if replay is not None:
+                current_app.logger.info(f"Replayed response for idempotency key {key}")
+                return replay
+
+            # The claim commits with the view's writes and its stored response, or
+            # is rolled back with them if the view fails
+            with unit_of_work():
+                response = make_response(view(*args, **kwargs))
+                _complete(key, response)
+            return response
+        return wrapper
+    return decorator
+
+def purge_expired_records():
+    """
+    Delete responses past their retention
+
+    Returns:
+        int: Number of records deleted
+    """
+    result = db.session.execute(delete(IdempotencyRecord).where(IdempotencyRecord.expires_at <= datetime.utcnow()))
+    return result.rowcount
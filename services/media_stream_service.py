@@ -0,0 +1,307 @@
+"""
+Phone bookings over a Twilio Media Stream.
+
+Instead of one <Gather> webhook per question, Twilio streams the caller's
+audio over a WebSocket as base64 mu-law frames (20 ms, 8 kHz). A
+MediaStreamSession watches the audio level to find where each utterance
+ends, transcribes it with a pluggable speech-to-text backend, runs the same
+call flow as the webhook and streams the spoken reply back on the same
+connection. There is no HTTP round trip and no Twilio end-of-speech timeout
+per question, so the reply starts END_SILENCE_MS after the caller stops
+plus transcription time.
+
+Backends are chosen with MEDIA_STREAM_STT ('whisper' or 'scripted') and
+MEDIA_STREAM_TTS ('elevenlabs' or 'none'). The scripted recogniser ignores
+the audio and returns utterances passed in the stream's start parameters,
+which is what benchmarks/fake_media_stream.py uses to test offline.
+"""
+import base64
+import io
+import threading
+import time
+import wave
+from collections import OrderedDict
+from flask import current_app
+from services.call_session_service import load_call_state, save_call_state, delete_call_state
+from services.call_flow_service import greeting, start_call, advance_call, record_hangup
+from services.slot_hold_service import release_hold
+from services.unit_of_work import unit_of_work
+from utils.mulaw import SAMPLE_RATE, BYTES_PER_MS, decode_mulaw, mean_amplitude
+
+# Mean amplitude above which a frame counts as speech
+DEFAULT_SPEECH_THRESHOLD = 500
+
+# Silence that ends an utterance; the main contributor to reply latency
+DEFAULT_END_SILENCE_MS = 400
+
+# Shorter bursts are clicks or line noise
+MIN_UTTERANCE_MS = 120
+
+# Outgoing audio is sent in chunks so playback starts before synthesis of long prompts is sent
+OUTBOUND_CHUNK_BYTES = SAMPLE_RATE  # one second
+
+# Mark sent after the goodbye; the stream is closed once Twilio has played it
+HANGUP_MARK = 'hangup'
+
+TTS_CACHE_SIZE = 256
+
+class UtteranceDetector:
+    """
+    Splits a stream of mu-law frames into utterances by audio level
+
+    Args:
+        threshold (float): Mean amplitude that counts as speech
+        end_silence_ms (int): Silence that ends an utterance
+    """
+
+    def __init__(self, threshold=DEFAULT_SPEECH_THRESHOLD, end_silence_ms=DEFAULT_END_SILENCE_MS):
+        self.threshold = threshold
+        self.end_silence_bytes = end_silence_ms * BYTES_PER_MS
+        self._audio = bytearray()
+        self._speech_bytes = 0
+        self._silence_bytes = 0
+
+    @property
+    def in_speech(self):
+        return self._speech_bytes > 0
+
+    def push(self, frame):
+        """
+        Add a frame of caller audio
+
+        Args:
+            frame (bytes): mu-law audio
+
+        Returns:
+            bytes: The complete utterance as mu-law when this frame ended one, else None
+        """
+        if mean_amplitude(frame) >= self.threshold:
+            self._audio += frame
+            self._speech_bytes += len(frame)
+            self._silence_bytes = 0
+            return None
+
+        if not self._speech_bytes:
+            return None
+
+        self._audio += frame
+        self._silence_bytes += len(frame)
+        if self._silence_bytes < self.end_silence_bytes:
+            return None
+
+        utterance = bytes(self._audio) if self._speech_bytes >= MIN_UTTERANCE_MS * BYTES_PER_MS else None
+        self.reset()
+        return utterance
+
+    def reset(self):
+        self._audio = bytearray()
+        self._speech_bytes = 0
+        self._silence_bytes = 0
+
+class ScriptedSpeechToText:
+    """
+    Returns scripted utterances in order, one per detected utterance
+
+    Args:
+        utterances (list): What the caller "says"
+    """
+
+    def __init__(self, utterances):
+        self._utterances = list(utterances)
+
+    def transcribe(self, audio):
+        return self._utterances.pop(0) if self._utterances else ''
+
+class WhisperSpeechToText:
+    """Transcribes each utterance with OpenAI Whisper"""
+
+    def __init__(self, api_key, model="whisper-1"):
+        from openai import OpenAI
+        self._client = OpenAI(api_key=api_key)
+        self._model = model
+
+    def transcribe(self, audio):
+        wav = io.BytesIO()
+        with wave.open(wav, 'wb') as wav_file:
+            wav_file.setnchannels(1)
+            wav_file.setsampwidth(2)
+            wav_file.setframerate(SAMPLE_RATE)
+            wav_file.writeframes(decode_mulaw(audio))
+
+        try:
+            response = self._client.audio.transcriptions.create(
+                model=self._model,
+                file=('utterance.wav', wav.getvalue(), 'audio/wav'),
+                language='en'
+            )
+            return getattr(response, 'text', '') or ''
+        except Exception as e:
+            current_app.logger.error(f"Error transcribing stream audio: {str(e)}")
+            return ''
+
+def create_speech_to_text(config, parameters=None):
+    """
+    Build the configured speech-to-text backend for one stream
+
+    Args:
+        config (dict): Flask config; reads MEDIA_STREAM_STT and OPENAI_API_KEY
+        parameters (dict, optional): Custom parameters from the stream's start
+            message; the scripted backend reads '|'-separated 'transcript'
+
+    Returns:
+        object: Backend with a transcribe(mulaw_bytes) -> str method
+    """
+    backend = config.get('MEDIA_STREAM_STT', 'whisper')
+    if backend == 'scripted':
+        transcript = (parameters or {}).get('transcript', '')
+        return ScriptedSpeechToText([part.strip() for part in transcript.split('|') if part.strip()])
+    if backend == 'whisper':
+        return WhisperSpeechToText(config.get('OPENAI_API_KEY'))
+    raise ValueError(f"Unknown MEDIA_STREAM_STT backend: {backend}")
+
+# text -> mu-law audio; most prompts repeat, so synthesis is mostly skipped
+_tts_cache = OrderedDict()
+_tts_cache_lock = threading.Lock()
+
+def synthesize(text):
+    """
+    Speak text as 8 kHz mu-law with the configured MEDIA_STREAM_TTS backend
+
+    Args:
+        text (str): What to say
+
+    Returns:
+        bytes: mu-law audio, or None when no audio is produced
+    """
+    if current_app.config.get('MEDIA_STREAM_TTS', 'elevenlabs') != 'elevenlabs':
+        return None
+
+    with _tts_cache_lock:
+        audio = _tts_cache.get(text)
+        if audio is not None:
+            _tts_cache.move_to_end(text)
+            return audio
+
+    from utils.elevenlabs_helper import text_to_speech
+    audio = text_to_speech(text, output_format='ulaw_8000')
+    if audio:
+        with _tts_cache_lock:
+            _tts_cache[text] = audio
+            while len(_tts_cache) > TTS_CACHE_SIZE:
+                _tts_cache.popitem(last=False)
+    return audio
+
+class MediaStreamSession:
+    """
+    One Twilio Media Stream: turns incoming stream events into outgoing ones
+
+    Args:
+        config (dict): Flask config
+        speech_to_text (object, optional): Backend to use instead of the configured one
+    """
+
+    def __init__(self, config, speech_to_text=None):
+        self.config = config
+        self.stt = speech_to_text
+        self.detector = UtteranceDetector(
+            config.get('MEDIA_STREAM_SPEECH_THRESHOLD', DEFAULT_SPEECH_THRESHOLD),
+            config.get('MEDIA_STREAM_END_SILENCE_MS', DEFAULT_END_SILENCE_MS)
+        )
+        self.stream_sid = None
+        self.call_sid = None
+        self.state = None
+        self.closed = False
+        self._pending_marks = set()
+        self.turn_timings = []   # seconds from end of utterance to reply, per turn
+
+    def handle(self, message):
+        """
+        Process one message from Twilio
+
+        Args:
+            message (dict): Decoded JSON stream event
+
+        Returns:
+            list: Messages to send back, in order
+        """
+        event = message.get('event')
+        if event == 'start':
+            return self._start(message['start'])
+        if event == 'media':
+            media = message['media']
+            if media.get('track', 'inbound') != 'inbound':
+                return []
+            return self._media(base64.b64decode(media['payload']))
+        if event == 'mark':
+            name = message['mark']['name']
+            self._pending_marks.discard(name)
+            if name == HANGUP_MARK:
+                self.closed = True
+            return []
+        if event == 'stop':
+            self.closed = True
+            self._hang_up()
+        return []
+
+    def _hang_up(self):
+        """Caller left mid-conversation: count the abandonment and free their held table"""
+        if self.call_sid and self.state is not None and self.state.get('stage') is not None:
+            with unit_of_work():
+                record_hangup(self.state)
+                release_hold(self.call_sid)
+                delete_call_state(self.call_sid)
+
+    def _start(self, start):
+        self.stream_sid = start['streamSid']
+        self.call_sid = start.get('callSid', self.stream_sid)
+        parameters = start.get('customParameters') or {}
+        if self.stt is None:
+            self.stt = create_speech_to_text(self.config, parameters)
+
+        self.state = load_call_state(self.call_sid)
+        if self.state is None:
+            with unit_of_work():
+                self.state, messages = start_call(parameters.get('From', ''))
+                save_call_state(self.call_sid, self.state)
+        else:
+            messages = [greeting(self.state)]
+        return self._speak(messages, self.state['stage'])
+
+    def _media(self, frame):
+        outbound = []
+        was_in_speech = self.detector.in_speech
+        utterance = self.detector.push(frame)
+
+        # Caller started talking over a prompt: stop playback
+        if not was_in_speech and self.detector.in_speech and self._pending_marks:
+            outbound.append({'event': 'clear', 'streamSid': self.stream_sid})
+            self._pending_marks.clear()
+
+        if utterance is None or self.state is None or self.state.get('stage') is None:
+            return outbound
+
+        started = time.perf_counter()
+        speech = self.stt.transcribe(utterance)
+        current_app.logger.debug(f"Stream {self.stream_sid} heard {speech!r}")
+
+        call_turn = advance_call(self.call_sid, self.state, speech)
+        outbound.extend(self._speak(call_turn.messages, call_turn.next_stage))
+        self.turn_timings.append(time.perf_counter() - started)
+        return outbound
+
+    def _speak(self, messages, next_stage):
+        """Audio for the messages followed by a mark naming the stage that listens next"""
+        outbound = []
+        for text in messages:
+            audio = synthesize(text)
+            for offset in range(0, len(audio or b''), OUTBOUND_CHUNK_BYTES):
+                outbound.append({
+                    'event': 'media',
+                    'streamSid': self.stream_sid,
+                    'media': {'payload': base64.b64encode(audio[offset:offset + OUTBOUND_CHUNK_BYTES]).decode('ascii')}
+                })
+
+        mark = next_stage or HANGUP_MARK
+        self._pending_marks.add(mark)
+        outbound.append({'event': 'mark', 'streamSid': self.stream_sid, 'mark': {'name': mark}})
+        return outbound
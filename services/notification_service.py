@@ -49,6 +49,51 @@ def send_booking_confirmation(booking):
         current_app.logger.error(f"Error in send_booking_confirmation: {str(e)}")
         return False
 
+def send_waitlist_promotion(booking):
+    """
+    Tell a waitlisted customer that a cancellation got them a table
+    
+    Args:
+        booking (Booking): Booking made from the waitlist entry
+        
+    Returns:
+        bool: True if SMS was sent successfully, False otherwise
+    """
+    try:
+        if not booking or not booking.customer_phone:
+            current_app.logger.error("Cannot send waitlist SMS: Invalid booking or missing phone number")
+            return False
+            
+        # Prepare message text
+        message = f"Good news {booking.customer_name}, a table opened up at Demo Restaurant! You're booked for {booking.booking_date.strftime('%A, %B %d')} at {booking.booking_time} for {booking.party_size} people. Reference #: {booking.id}. Reply or call us if you can no longer make it."
+        
+        # Send SMS via Twilio
+        success = send_sms(booking.customer_phone, message)
+        
+        if success:
+            # Log the SMS notification
+            log_action(
+                'sms_waitlist_promotion',
+                'booking',
+                booking.id,
+                f"SMS waitlist promotion sent to {booking.customer_phone}",
+                json.dumps({
+                    'booking_id': booking.id,
+                    'phone': booking.customer_phone,
+                    'message': message
+                })
+            )
+            
+            current_app.logger.info(f"SMS waitlist promotion sent to {booking.customer_phone}")
+            return True
+        else:
+            current_app.logger.error(f"Failed to send waitlist SMS to {booking.customer_phone}")
+            return False
+            
+    except Exception as e:
+        current_app.logger.error(f"Error in send_waitlist_promotion: {str(e)}")
+        return False
+
 def send_booking_reminder(booking):
     """
     Send booking reminder SMS to customer
@@ -0,0 +1,376 @@
+"""
+Seated covers per 15-minute bucket, kept in memory per restaurant and day.
+
+A day is loaded from the bookings table with one grouped query and then
+updated in place as bookings are created and canceled, so checking whether
+a party fits at a time reads a few array cells instead of querying. Days
+are reloaded after AVAILABILITY_CACHE_TTL so bookings made by other worker
+processes show up, and the least recently used days are dropped past
+AVAILABILITY_CACHE_SIZE.
+
+A booking occupies its buckets for BOOKING_DURATION_MINUTES from its start
+time; the part of a late booking that runs past midnight is not counted.
+
+The in-memory days only answer "is there room?" quickly. Admission itself
+goes through the slot_occupancy counters with a guarded UPDATE, which the
+database serializes across workers, so two bookings can never both take
+the last seats. Seats held for callers still confirming count against
+capacity too: bookings and holds lock the counters they need before
+reading the holds, so neither can slip past the other.
+"""
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from flask import current_app
+from datetime import datetime
+from sqlalchemy import case, func, select, update
+from app import db
+from models import Booking, SlotHold, SlotOccupancy
+from services.restaurant_service import time_to_minutes
+from utils.db_helpers import insert_ignore
+
+BUCKET_MINUTES = 15
+BUCKETS_PER_DAY = 24 * 60 // BUCKET_MINUTES
+
+DEFAULT_DURATION_MINUTES = 60
+DEFAULT_TTL = 60
+DEFAULT_SIZE = 512
+
+# Statuses whose guests take up seats
+OCCUPYING_STATUSES = ('confirmed',)
+
+class DayOccupancy:
+    """
+    Covers seated in each 15-minute bucket of one day
+
+    Args:
+        duration_minutes (int): How long a booking keeps its seats
+    """
+    __slots__ = ('covers', 'span', 'expires_at')
+
+    def __init__(self, duration_minutes=DEFAULT_DURATION_MINUTES, expires_at=0.0):
+        self.covers = array('l', [0]) * BUCKETS_PER_DAY
+        self.span = _span(duration_minutes)
+        self.expires_at = expires_at
+
+    def _window(self, booking_time):
+        return _window(booking_time, self.span)
+
+    def add(self, booking_time, party_size):
+        """
+        Seat a party from a start time; a negative size frees the seats
+
+        Args:
+            booking_time (str): 'HH:MM'
+            party_size (int): Covers
+        """
+        start, end = self._window(booking_time)
+        covers = self.covers
+        for bucket in range(start, end):
+            covers[bucket] += party_size
+
+    def peak(self, booking_time):
+        """
+        Most covers seated at once while a booking at this time would be seated
+
+        Args:
+            booking_time (str): 'HH:MM'
+
+        Returns:
+            int: Covers
+        """
+        start, end = self._window(booking_time)
+        return max(self.covers[start:end], default=0)
+
+    def copy(self):
+        other = DayOccupancy.__new__(DayOccupancy)
+        other.covers = array('l', self.covers)
+        other.span = self.span
+        other.expires_at = self.expires_at
+        return other
+
+def _span(duration_minutes=None):
+    """Buckets a booking occupies, rounded up"""
+    if duration_minutes is None:
+        duration_minutes = current_app.config.get('BOOKING_DURATION_MINUTES', DEFAULT_DURATION_MINUTES)
+    return max(1, -(-duration_minutes // BUCKET_MINUTES))
+
+def _window(booking_time, span):
+    """First and past-the-end bucket of a booking, clipped to the day"""
+    start = time_to_minutes(booking_time) // BUCKET_MINUTES
+    return start, min(start + span, BUCKETS_PER_DAY)
+
+# (restaurant_id, date) -> DayOccupancy, least recently used first
+_days = OrderedDict()
+_days_lock = threading.Lock()
+
+def _load_day(restaurant_id, booking_date):
+    """Build a day from the bookings table with one grouped query"""
+    config = current_app.config
+    day = DayOccupancy(
+        config.get('BOOKING_DURATION_MINUTES', DEFAULT_DURATION_MINUTES),
+        time.monotonic() + config.get('AVAILABILITY_CACHE_TTL', DEFAULT_TTL)
+    )
+    rows = db.session.execute(
+        select(Booking.booking_time, func.sum(Booking.party_size))
+        .where(Booking.restaurant_id == restaurant_id,
+               Booking.booking_date == booking_date,
+               Booking.status.in_(OCCUPYING_STATUSES))
+        .group_by(Booking.booking_time)
+    )
+    for booking_time, seats in rows:
+        day.add(booking_time, int(seats))
+    return day
+
+def get_day_occupancy(restaurant_id, booking_date, refresh=False):
+    """
+    Get the occupancy of a day, loading it if it isn't in memory or is stale
+
+    Args:
+        restaurant_id (int): Restaurant ID
+        booking_date (date): Booking date
+        refresh (bool, optional): Reload from the database even if fresh
+
+    Returns:
+        DayOccupancy: Snapshot that is safe to read and modify
+    """
+    key = (restaurant_id, booking_date)
+    if not refresh:
+        with _days_lock:
+            day = _days.get(key)
+            if day is not None and day.expires_at > time.monotonic():
+                _days.move_to_end(key)
+                return day.copy()
+
+    # Load outside the lock so other days can be read meanwhile
+    day = _load_day(restaurant_id, booking_date)
+
+    max_size = current_app.config.get('AVAILABILITY_CACHE_SIZE', DEFAULT_SIZE)
+    with _days_lock:
+        _days[key] = day
+        _days.move_to_end(key)
+        while len(_days) > max_size:
+            _days.popitem(last=False)
+        return day.copy()
+
+def record_occupancy(restaurant_id, booking_date, booking_time, party_size):
+    """
+    Apply a committed booking change to the day if it is in memory
+
+    Days not in memory are left alone; they are loaded with the change.
+
+    Args:
+        restaurant_id (int): Restaurant ID
+        booking_date (date): Booking date
+        booking_time (str): 'HH:MM'
+        party_size (int): Covers seated, or negative for covers freed
+    """
+    with _days_lock:
+        day = _days.get((restaurant_id, booking_date))
+        if day is not None:
+            day.add(booking_time, party_size)
+
+def invalidate_occupancy(restaurant_id=None):
+    """
+    Forget in-memory days so they are reloaded
+
+    Args:
+        restaurant_id (int, optional): Restaurant to forget; all when omitted
+    """
+    with _days_lock:
+        if restaurant_id is None:
+            _days.clear()
+            return
+        for key in [key for key in _days if key[0] == restaurant_id]:
+            del _days[key]
+
+def _seed_counters(restaurant_id, booking_date):
+    """Create a day's counters from its bookings; workers seeding at once compute the same counts"""
+    day = _load_day(restaurant_id, booking_date)
+    insert_ignore(SlotOccupancy, [
+        {'restaurant_id': restaurant_id, 'booking_date': booking_date, 'bucket': bucket, 'covers': covers}
+        for bucket, covers in enumerate(day.covers)
+    ], ['restaurant_id', 'booking_date', 'bucket'])
+
+def _lock_counters(restaurant_id, booking_date, buckets):
+    """
+    Lock the counters of these buckets until commit, creating the day's first
+
+    A no-op UPDATE takes the same row locks as an admission, so a booking or
+    hold for an overlapping time waits here until this transaction ends.
+
+    Returns:
+        dict: bucket -> covers booked
+    """
+    def touch():
+        return dict(db.session.execute(
+            update(SlotOccupancy)
+            .where(SlotOccupancy.restaurant_id == restaurant_id,
+                   SlotOccupancy.booking_date == booking_date,
+                   SlotOccupancy.bucket.in_(buckets))
+            .values(covers=SlotOccupancy.covers)
+            .returning(SlotOccupancy.bucket, SlotOccupancy.covers)
+            .execution_options(synchronize_session=False)
+        ).all())
+
+    covers = touch()
+    if len(covers) < len(buckets):
+        # First booking or hold of the day: its counters don't exist yet
+        _seed_counters(restaurant_id, booking_date)
+        covers = touch()
+    return covers
+
+def _held_covers(restaurant_id, booking_date, buckets, exclude_call_sid=None):
+    """Covers held by callers still confirming, per bucket; read with the counters locked"""
+    query = (
+        select(SlotHold.booking_time, func.sum(SlotHold.party_size))
+        .where(SlotHold.restaurant_id == restaurant_id,
+               SlotHold.booking_date == booking_date,
+               SlotHold.expires_at > datetime.utcnow())
+        .group_by(SlotHold.booking_time)
+    )
+    if exclude_call_sid:
+        query = query.where(SlotHold.call_sid != exclude_call_sid)
+
+    held = {}
+    span = _span()
+    for booking_time, seats in db.session.execute(query):
+        start, end = _window(booking_time, span)
+        for bucket in range(start, end):
+            if bucket in buckets:
+                held[bucket] = held.get(bucket, 0) + int(seats)
+    return held
+
+def _take_covers(restaurant_id, booking_date, buckets, party_size, capacity, held):
+    """Guarded increment of the buckets that stay within capacity; returns the buckets changed"""
+    booked = SlotOccupancy.covers + party_size
+    if held:
+        booked = booked + case(held, value=SlotOccupancy.bucket, else_=0)
+    return db.session.execute(
+        update(SlotOccupancy)
+        .where(SlotOccupancy.restaurant_id == restaurant_id,
+               SlotOccupancy.booking_date == booking_date,
+               SlotOccupancy.bucket.in_(buckets),
+               booked <= capacity)
+        .values(covers=SlotOccupancy.covers + party_size)
+        .returning(SlotOccupancy.bucket)
+        .execution_options(synchronize_session=False)
+    ).scalars().all()
+
+def reserve_covers(restaurant_id, booking_date, booking_time, party_size, capacity, call_sid=None):
+    """
+    Take seats for a new booking if every bucket it spans has room
+
+    A single guarded UPDATE adds the party to each bucket whose covers,
+    plus the seats other callers hold, stay within capacity. The database
+    locks the rows it changes until commit, so a concurrent booking
+    re-checks against the new counts instead of the ones it read. If only
+    some buckets had room they are given back. Call before adding the
+    booking to the session, and commit or roll back with it.
+
+    Args:
+        restaurant_id (int): Restaurant ID
+        booking_date (date): Booking date
+        booking_time (str): 'HH:MM'
+        party_size (int): Covers
+        capacity (int): Restaurant capacity
+        call_sid (str, optional): Call booking; its own hold doesn't count against it
+
+    Returns:
+        bool: True if the seats were taken
+    """
+    start, end = _window(booking_time, _span())
+    buckets = list(range(start, end))
+    if not buckets:
+        # A time past the end of the day takes no seats, so it can't be admitted
+        return False
+
+    # Locked before the holds are read, so a hold placed meanwhile waits for this booking
+    _lock_counters(restaurant_id, booking_date, buckets)
+    held = _held_covers(restaurant_id, booking_date, buckets, call_sid)
+    taken = _take_covers(restaurant_id, booking_date, buckets, party_size, capacity, held)
+
+    if len(taken) == len(buckets):
+        return True
+
+    if taken:
+        release_covers(restaurant_id, booking_date, booking_time, party_size, buckets=taken)
+    return False
+
+def has_room_for_hold(restaurant_id, booking_date, booking_time, party_size, capacity, call_sid):
+    """
+    Check, with the counters locked, that a caller's hold fits alongside bookings and other holds
+
+    The counters stay locked until commit, so place the hold in the same
+    transaction; bookings and holds for overlapping times wait until then.
+
+    Args:
+        restaurant_id (int): Restaurant ID
+        booking_date (date): Booking date
+        booking_time (str): 'HH:MM'
+        party_size (int): Seats to hold
+        capacity (int): Restaurant capacity
+        call_sid (str): Call holding; its earlier hold doesn't count
+
+    Returns:
+        bool: True if the seats can be held
+    """
+    start, end = _window(booking_time, _span())
+    buckets = list(range(start, end))
+    if not buckets:
+        return False
+
+    covers = _lock_counters(restaurant_id, booking_date, buckets)
+    held = _held_covers(restaurant_id, booking_date, buckets, call_sid)
+    return all(covers[bucket] + held.get(bucket, 0) + party_size <= capacity for bucket in buckets)
+
+def release_covers(restaurant_id, booking_date, booking_time, party_size, buckets=None):
+    """
+    Give back a booking's seats when it stops being confirmed
+
+    Does not commit. Days without counters are left alone; they are seeded
+    from the bookings table when first needed.
+
+    Args:
+        restaurant_id (int): Restaurant ID
+        booking_date (date): Booking date
+        booking_time (str): 'HH:MM'
+        party_size (int): Covers to give back, or negative to take them again
+        buckets (list, optional): Only these buckets of the booking
+    """
+    if buckets is None:
+        start, end = _window(booking_time, _span())
+        buckets = list(range(start, end))
+    db.session.execute(
+        update(SlotOccupancy)
+        .where(SlotOccupancy.restaurant_id == restaurant_id,
+               SlotOccupancy.booking_date == booking_date,
+               SlotOccupancy.bucket.in_(buckets))
+        .values(covers=SlotOccupancy.covers - party_size)
+        .execution_options(synchronize_session=False)
+    )
+
+def add_bulk_covers(restaurant_id, seats):
+    """
+    Count bookings inserted in bulk on days whose counters already exist
+
+    Days without counters need nothing; they are seeded from the bookings
+    table, bulk inserts included. Does not commit.
+
+    Args:
+        restaurant_id (int): Restaurant ID
+        seats (dict): (booking_date, 'HH:MM') -> covers
+    """
+    if not seats:
+        return
+
+    seeded = set(db.session.execute(
+        select(SlotOccupancy.booking_date).distinct()
+        .where(SlotOccupancy.restaurant_id == restaurant_id,
+               SlotOccupancy.booking_date.in_({booking_date for booking_date, _ in seats}))
+    ).scalars())
+
+    for (booking_date, booking_time), party_size in seats.items():
+        if booking_date in seeded:
+            release_covers(restaurant_id, booking_date, booking_time, -party_size)
@@ -0,0 +1,219 @@
+import json
+import re
+import threading
+import time
+from typing import NamedTuple
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+from app import db
+from models import Restaurant
+from services.audit_service import log_action
+from services.unit_of_work import after_commit, unit_of_work
+
+DEFAULT_RESTAURANT_ID = 1
+DEFAULT_CONFIG_TTL = 300
+
+# Booking and opening times as stored, 24-hour 'HH:MM' (a leading zero may be missing)
+TIME_RE = re.compile(r'^([01]?\d|2[0-3]):([0-5]\d)$')
+
+class RestaurantConfig(NamedTuple):
+    """Immutable snapshot of a restaurant row with hours as minutes past midnight"""
+    id: int
+    name: str
+    phone_number: str
+    address: str
+    opening_time: str
+    closing_time: str
+    opening_minute: int
+    closing_minute: int
+    capacity: int
+
+    def is_open_at(self, minute):
+        """
+        Check whether a booking can start at a time
+
+        Args:
+            minute (int): Minutes past midnight
+
+        Returns:
+            bool: True if the restaurant is open, closing time inclusive
+        """
+        if self.closing_minute >= self.opening_minute:
+            return self.opening_minute <= minute <= self.closing_minute
+        # Open past midnight, e.g. 18:00 - 02:00
+        return minute >= self.opening_minute or minute <= self.closing_minute
+
+# restaurant_id -> (version, expires_at, RestaurantConfig). update_restaurant()
+# drops this worker's entry; other workers pick the change up when theirs expire
+_config_cache = {}
+_config_lock = threading.Lock()
+_config_version = 0
+
+def time_to_minutes(time_str):
+    """
+    Convert 'HH:MM' to minutes past midnight
+
+    Args:
+        time_str (str): Time in 24-hour 'HH:MM' format
+
+    Returns:
+        int: Minutes past midnight
+    """
+    hours, minutes = time_str.split(':', 1)
+    return int(hours) * 60 + int(minutes)
+
+def minutes_to_time(minute):
+    """
+    Convert minutes past midnight to 'HH:MM'
+
+    Args:
+        minute (int): Minutes past midnight
+
+    Returns:
+        str: Time in 24-hour 'HH:MM' format
+    """
+    return f"{(minute // 60) % 24:02d}:{minute % 60:02d}"
+
+def _build_config(restaurant):
+    return RestaurantConfig(
+        id=restaurant.id,
+        name=restaurant.name,
+        phone_number=restaurant.phone_number,
+        address=restaurant.address,
+        opening_time=restaurant.opening_time,
+        closing_time=restaurant.closing_time,
+        opening_minute=time_to_minutes(restaurant.opening_time),
+        closing_minute=time_to_minutes(restaurant.closing_time),
+        capacity=restaurant.capacity
+    )
+
+def get_restaurant_config(restaurant_id=None):
+    """
+    Get a restaurant's configuration without a database round trip when cached
+
+    Args:
+        restaurant_id (int, optional): Restaurant ID, defaults to the default restaurant
+
+    Returns:
+        RestaurantConfig: Cached configuration, or None if the restaurant doesn't exist
+    """
+    restaurant_id = int(restaurant_id or DEFAULT_RESTAURANT_ID)
+    now = time.monotonic()
+
+    entry = _config_cache.get(restaurant_id)
+    if entry is not None and entry[0] == _config_version and entry[1] > now:
+        return entry[2]
+
+    restaurant = db.session.get(Restaurant, restaurant_id)
+    if restaurant is None:
+        return None
+
+    config = _build_config(restaurant)
+    ttl = current_app.config.get('RESTAURANT_CONFIG_TTL', DEFAULT_CONFIG_TTL)
+    with _config_lock:
+        _config_cache[restaurant_id] = (_config_version, now + ttl, config)
+    return config
+
+def invalidate_restaurant_config(restaurant_id=None):
+    """
+    Discard cached restaurant configuration after a restaurant row changes
+
+    Other worker processes pick up the change when their entries expire
+    after RESTAURANT_CONFIG_TTL seconds.
+
+    Args:
+        restaurant_id (int, optional): Restaurant to discard; all when omitted
+    """
+    global _config_version
+
+    with _config_lock:
+        if restaurant_id is None:
+            _config_version += 1
+        else:
+            _config_cache.pop(int(restaurant_id), None)
+
+def update_restaurant(restaurant_id, opening_time=None, closing_time=None, capacity=None):
+    """
+    Change a restaurant's opening hours or capacity
+
+    Bookings already made are kept even if they no longer fit; the new
+    hours and capacity apply to bookings made from now on.
+
+    Args:
+        restaurant_id (int): Restaurant ID
+        opening_time (str, optional): New opening time, 'HH:MM'
+        closing_time (str, optional): New closing time, 'HH:MM'
+        capacity (int, optional): New number of covers per time slot
+
+    Returns:
+        tuple: (Restaurant object or None, success boolean, message string)
+    """
+    restaurant = db.session.get(Restaurant, restaurant_id)
+    if restaurant is None:
+        return None, False, "Restaurant not found"
+
+    changes = {}
+    for field, value in (('opening_time', opening_time), ('closing_time', closing_time)):
+        if value is None:
+            continue
+        match = TIME_RE.match(str(value).strip())
+        if not match:
+            return None, False, f"{field.replace('_', ' ').capitalize()} must be HH:MM"
+        changes[field] = f"{int(match.group(1)):02d}:{match.group(2)}"
+    if capacity is not None:
+        if not isinstance(capacity, int) or capacity <= 0:
+            return None, False, "Capacity must be a positive number of covers"
+        changes['capacity'] = capacity
+    if not changes:
+        return restaurant, True, "Nothing to change"
+
+    old = {field: getattr(restaurant, field) for field in changes}
+    with unit_of_work():
+        for field, value in changes.items():
+            setattr(restaurant, field, value)
+        log_action(
+            'update_restaurant',
+            'restaurant',
+            restaurant.id,
+            "Restaurant updated: " + ', '.join(f"{field} {old[field]} -> {value}" for field, value in changes.items()),
+            json.dumps({'old': old, 'new': changes})
+        )
+        # Admission and opening hours in this worker use the new values straight away
+        after_commit(lambda: invalidate_restaurant_config(restaurant_id))
+    return restaurant, True, "Restaurant updated"
+
+def ensure_default_restaurant():
+    """
+    Create the default restaurant on first start-up
+
+    Runs once per process at start-up instead of inside request handlers.
+    Safe to run from several workers at once: the row has a fixed ID, so
+    only one insert can win.
+
+    Returns:
+        Restaurant: The default restaurant
+    """
+    restaurant = db.session.get(Restaurant, DEFAULT_RESTAURANT_ID)
+    if restaurant:
+        return restaurant
+
+    restaurant = Restaurant(
+        id=DEFAULT_RESTAURANT_ID,
+        name="Our Restaurant",
+        phone_number="+11234567890",
+        address="123 Main St",
+        opening_time="11:00",
+        closing_time="22:00",
+        capacity=100
+    )
+
+    try:
+        db.session.add(restaurant)
+        db.session.commit()
+        current_app.logger.info(f"Created default restaurant with ID: {restaurant.id}")
+    except IntegrityError:
+        # Another worker created it first
+        db.session.rollback()
+        restaurant = db.session.get(Restaurant, DEFAULT_RESTAURANT_ID)
+
+    return restaurant
@@ -0,0 +1,445 @@
+"""
+Booking search by guest name or phone number.
+
+Names match by word prefix ("smi" finds John Smith), then anywhere in the
+name; only when nothing matches as typed are misspellings looked for
+("jonson" finds Johnson). Queries made only of digits
+and phone punctuation search phone numbers instead, so the last four
+digits are enough.
+
+The index depends on the database:
+
+  - SQLite: two FTS5 tables kept in step with the booking table by
+    triggers: booking_name_search, whole words with a prefix index, for
+    prefix matches, and booking_search, with the trigram tokenizer, for
+    substrings, fuzzy candidates and phone digits. Bulk imports pause the
+    insert trigger and index each batch with one INSERT ... SELECT per
+    table, which is several times faster than a trigger per row.
+  - PostgreSQL: pg_trgm GiST indexes on the lower-cased name and the
+    phone digits.
+  - Anything else, or when neither is available: unindexed LIKE.
+
+Ranking every match (FTS5's bm25, say) costs hundreds of milliseconds for
+a common name on a million bookings. Instead each kind of match takes at
+most SEARCH_CANDIDATES bookings from the index, newest first, and only
+those are ranked: prefix matches before substring matches, then by
+trigram similarity to the query, then newest first. Lists that combine a
+search with other filters use booking_search_condition() instead, which
+selects every match in SQL, unranked and uncapped.
+"""
+import re
+import unicodedata
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import NamedTuple
+from flask import current_app
+from sqlalchemy import and_, bindparam, false, func, literal_column, or_, select, text
+from sqlalchemy.exc import DBAPIError
+from app import db
+from models import Booking
+from services.restaurant_service import DEFAULT_RESTAURANT_ID
+
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 100
+
+# Bookings taken from the index per kind of match before ranking
+SEARCH_CANDIDATES = 50
+
+# Fuzzy matches need at least this trigram similarity to a word or the whole name
+FUZZY_THRESHOLD = 0.3
+
+# Digits needed before a query is taken as a phone number
+MIN_PHONE_DIGITS = 3
+
+MATCH_PREFIX = 'prefix'
+MATCH_CONTAINS = 'contains'
+MATCH_FUZZY = 'fuzzy'
+MATCH_PHONE = 'phone'
+
+_MATCH_ORDER = {MATCH_PREFIX: 0, MATCH_PHONE: 0, MATCH_CONTAINS: 1, MATCH_FUZZY: 2}
+
+_PHONE_QUERY_RE = re.compile(r'^[\d\s()+.-]+$')
+_TOKEN_RE = re.compile(r'[^\s"]+')
+
+# 'fts5', 'pg_trgm' or 'like', decided by init_booking_search()
+_backend = 'like'
+
+# Phone digits as SQL over a booking row
+_SQLITE_PHONE = ("replace(replace(replace(replace(replace(replace({row}.customer_phone, "
+                 "'+', ''), ' ', ''), '-', ''), '(', ''), ')', ''), '.', '')")
+
+_SQLITE_INSERT = """
+    INSERT INTO booking_name_search(rowid, name, restaurant_id) VALUES (new.id, new.customer_name, new.restaurant_id);
+    INSERT INTO booking_search(rowid, name, phone, restaurant_id)
+    VALUES (new.id, new.customer_name, {phone}, new.restaurant_id);
+""".format(phone=_SQLITE_PHONE.format(row='new'))
+
+_SQLITE_DELETE = """
+    DELETE FROM booking_name_search WHERE rowid = old.id;
+    DELETE FROM booking_search WHERE rowid = old.id;
+"""
+
+# The insert trigger skips rows while this table has a row; only ever
+# filled inside the transaction of a bulk insert, so no other connection sees it
+_SQLITE_PAUSED_TABLE = 'booking_search_paused'
+
+# Triggers from before the insert trigger could be paused
+_SQLITE_OUTDATED_TRIGGER = (
+    "SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = 'booking_search_insert' "
+    f"AND sql NOT LIKE '%{_SQLITE_PAUSED_TABLE}%'"
+)
+
+_SQLITE_SETUP = [
+    f"CREATE TABLE IF NOT EXISTS {_SQLITE_PAUSED_TABLE} (paused INTEGER)",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS booking_name_search USING fts5("
+    "name, restaurant_id UNINDEXED, tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS booking_search USING fts5("
+    "name, phone, restaurant_id UNINDEXED, tokenize='trigram')",
+    "CREATE TRIGGER IF NOT EXISTS booking_search_insert AFTER INSERT ON booking "
+    f"WHEN NOT EXISTS (SELECT 1 FROM {_SQLITE_PAUSED_TABLE}) BEGIN {_SQLITE_INSERT} END",
+    f"CREATE TRIGGER IF NOT EXISTS booking_search_delete AFTER DELETE ON booking BEGIN {_SQLITE_DELETE} END",
+    "CREATE TRIGGER IF NOT EXISTS booking_search_update "
+    f"AFTER UPDATE OF customer_name, customer_phone, restaurant_id ON booking BEGIN {_SQLITE_DELETE} {_SQLITE_INSERT} END",
+]
+
+_SQLITE_BACKFILL = [
+    "INSERT INTO booking_name_search(rowid, name, restaurant_id) SELECT id, customer_name, restaurant_id FROM booking",
+    "INSERT INTO booking_search(rowid, name, phone, restaurant_id) "
+    f"SELECT id, customer_name, {_SQLITE_PHONE.format(row='booking')}, restaurant_id FROM booking",
+]
+
+_POSTGRES_SETUP = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS ix_booking_name_trgm ON booking USING gist (lower(customer_name) gist_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_booking_phone_trgm ON booking "
+    "USING gist (regexp_replace(customer_phone, '[^0-9]', '', 'g') gist_trgm_ops)",
+]
+
+class SearchHit(NamedTuple):
+    """A booking found by search_bookings()"""
+    booking: Booking
+    match: str  # 'prefix', 'contains', 'fuzzy' or 'phone'
+    score: float  # trigram similarity of the name to the query, 1.0 for phone matches
+
+def _init_sqlite():
+    created = not db.session.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'booking_search'")
+    ).first()
+    if db.session.execute(text(_SQLITE_OUTDATED_TRIGGER)).first():
+        db.session.execute(text("DROP TRIGGER booking_search_insert"))
+    for statement in _SQLITE_SETUP:
+        db.session.execute(text(statement))
+    if created:
+        # Bookings made before the index existed
+        for statement in _SQLITE_BACKFILL:
+            db.session.execute(text(statement))
+    db.session.commit()
+
+def _init_postgres():
+    for statement in _POSTGRES_SETUP:
+        db.session.execute(text(statement))
+    db.session.commit()
+
+def init_booking_search(app):
+    """
+    Create the search index for the database in use and fill it once
+
+    Falls back to unindexed LIKE searches if the database can't build it
+    (SQLite without FTS5, or no permission to enable pg_trgm).
+
+    Args:
+        app (Flask): Application
+    """
+    global _backend
+
+    dialect = db.engine.dialect.name
+    try:
+        if dialect == 'sqlite':
+            _init_sqlite()
+            _backend = 'fts5'
+        elif dialect == 'postgresql':
+            _init_postgres()
+            _backend = 'pg_trgm'
+    except DBAPIError as e:
+        db.session.rollback()
+        app.logger.warning(f"Booking search index unavailable, searches will scan: {str(e)}")
+        _backend = 'like'
+
+@contextmanager
+def batch_search_indexing():
+    """
+    Index bookings inserted in the block once at the end, not row by row
+
+    Must be used inside the transaction that inserts them and that
+    transaction committed or rolled back afterwards; on SQLite it holds the
+    write lock from the start, so the new rows are exactly those with
+    higher IDs. Other databases index through ordinary indexes and need
+    nothing.
+    """
+    if _backend != 'fts5':
+        yield
+        return
+
+    db.session.execute(text(f"INSERT INTO {_SQLITE_PAUSED_TABLE} (paused) VALUES (1)"))
+    last_id = db.session.execute(text("SELECT coalesce(max(id), 0) FROM booking")).scalar()
+    yield
+    for statement in _SQLITE_BACKFILL:
+        db.session.execute(text(f"{statement} WHERE booking.id > :last_id"), {'last_id': last_id})
+    db.session.execute(text(f"DELETE FROM {_SQLITE_PAUSED_TABLE}"))
+
+# Names and words recur across searches, so their folded forms and trigrams are kept
+@lru_cache(maxsize=65536)
+def _fold(value):
+    """Lower-case and strip accents, as the word index does"""
+    decomposed = unicodedata.normalize('NFKD', value.lower())
+    return ''.join(char for char in decomposed if not unicodedata.combining(char))
+
+@lru_cache(maxsize=65536)
+def _trigrams(value):
+    """Trigrams of a word or name, padded like pg_trgm"""
+    padded = f"  {value} "
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+def _similarity(query_trigrams, name):
+    """
+    Trigram similarity of the query to the whole name or its closest word
+
+    The Jaccard similarity is averaged with the share of the query's
+    trigrams found, so "jonson" is closer to Johnson than to Jon.
+    """
+    best = 0.0
+    for candidate in [name] + name.split():
+        candidate_trigrams = _trigrams(candidate)
+        shared = len(query_trigrams & candidate_trigrams)
+        best = max(best, (shared / len(query_trigrams | candidate_trigrams) + shared / len(query_trigrams)) / 2)
+    return best
+
+def _rank_name(tokens, query_trigrams, name):
+    """(kind of match, similarity) of a folded name, or None when it doesn't match"""
+    words = name.split()
+    similarity = _similarity(query_trigrams, name)
+    if all(any(word.startswith(token) for word in words) for token in tokens):
+        return MATCH_PREFIX, similarity
+    if all(token in name for token in tokens):
+        return MATCH_CONTAINS, similarity
+    if similarity >= FUZZY_THRESHOLD:
+        return MATCH_FUZZY, similarity
+    return None
+
+def _fts_candidates(table, match, restaurant_id):
+    """Newest bookings matching an FTS5 query: (id, name) rows"""
+    return db.session.execute(
+        text(f"SELECT rowid, name FROM {table} "
+             f"WHERE {table} MATCH :match AND restaurant_id = :restaurant_id "
+             "ORDER BY rowid DESC LIMIT :limit"),
+        {'match': match, 'restaurant_id': restaurant_id, 'limit': SEARCH_CANDIDATES}
+    ).all()
+
+def _ngrams(token):
+    """Runs of four letters (three in short words) that survive most single typos somewhere"""
+    size = 4 if len(token) > 4 else 3
+    return {token[i:i + size] for i in range(len(token) - size + 1)}
+
+def _name_candidates_fts5(tokens, limit, restaurant_id):
+    # Every word a prefix, from the word index
+    candidates = dict(_fts_candidates('booking_name_search', ' '.join(f'"{token}"*' for token in tokens),
+                                      restaurant_id))
+    # Substring matches only ever rank below these, and a name typed as
+    # several words that matched as words is the name that was meant
+    if len(candidates) >= limit or (candidates and len(tokens) > 1):
+        return candidates
+
+    # Substrings of the longest word (the trigram tokenizer needs three
+    # characters); the other words are checked when ranking
+    longest = max(tokens, key=len)
+    if len(longest) >= 3:
+        for booking_id, name in _fts_candidates('booking_search', f'name : "{longest}"', restaurant_id):
+            candidates.setdefault(booking_id, name)
+
+    # Misspellings are only looked for when nothing matches as typed: names
+    # sharing runs of letters with any word, to be ranked by similarity
+    grams = set().union(*(_ngrams(token) for token in tokens if len(token) >= 4))
+    if grams and not candidates:
+        match = 'name : (' + ' OR '.join(f'"{gram}"' for gram in sorted(grams)) + ')'
+        candidates.update(_fts_candidates('booking_search', match, restaurant_id))
+    return candidates
+
+def _name_candidates_pg_trgm(tokens, query, restaurant_id):
+    like_conditions = ' AND '.join(f"lower(customer_name) LIKE :token{i}" for i in range(len(tokens)))
+    params = {f"token{i}": f"%{token}%" for i, token in enumerate(tokens)}
+    params.update({'query': query, 'restaurant_id': restaurant_id, 'limit': SEARCH_CANDIDATES})
+
+    rows = db.session.execute(
+        text(f"SELECT id, customer_name FROM booking WHERE restaurant_id = :restaurant_id AND {like_conditions} "
+             "ORDER BY id DESC LIMIT :limit"),
+        params
+    ).all()
+    candidates = dict(rows)
+
+    if not candidates:
+        # Nearest names by word similarity, straight from the GiST index
+        rows = db.session.execute(
+            text("SELECT id, customer_name FROM booking WHERE restaurant_id = :restaurant_id "
+                 "ORDER BY CAST(:query AS text) <<-> lower(customer_name), id DESC LIMIT :limit"),
+            params
+        ).all()
+        for booking_id, name in rows:
+            candidates.setdefault(booking_id, name)
+    return candidates
+
+def _name_candidates_like(tokens, restaurant_id):
+    query = select(Booking.id, Booking.customer_name).where(Booking.restaurant_id == restaurant_id)
+    for token in tokens:
+        query = query.where(Booking.customer_name.ilike(f"%{token}%"))
+    return dict(db.session.execute(query.order_by(Booking.id.desc()).limit(SEARCH_CANDIDATES)).all())
+
+def _phone_candidates(digits, restaurant_id):
+    """IDs of the newest bookings whose phone number contains the digits"""
+    if _backend == 'fts5':
+        return [booking_id for booking_id, _ in
+                _fts_candidates('booking_search', f'phone : "{digits}"', restaurant_id)]
+    if _backend == 'pg_trgm':
+        return db.session.execute(
+            text("SELECT id FROM booking WHERE restaurant_id = :restaurant_id "
+                 "AND regexp_replace(customer_phone, '[^0-9]', '', 'g') LIKE :pattern "
+                 "ORDER BY id DESC LIMIT :limit"),
+            {'restaurant_id': restaurant_id, 'pattern': f"%{digits}%", 'limit': SEARCH_CANDIDATES}
+        ).scalars().all()
+
+    bookings = db.session.execute(
+        select(Booking.id, Booking.customer_phone).where(Booking.restaurant_id == restaurant_id)
+        .order_by(Booking.id.desc())
+    )
+    found = []
+    for booking_id, phone in bookings:
+        if digits in re.sub(r'\D', '', phone or ''):
+            found.append(booking_id)
+            if len(found) >= SEARCH_CANDIDATES:
+                break
+    return found
+
+def search_bookings(query, limit=DEFAULT_LIMIT, restaurant_id=DEFAULT_RESTAURANT_ID):
+    """
+    Find bookings by guest name or phone number, best matches first
+
+    Args:
+        query (str): Part of a name, a misspelt name, or phone digits
+        limit (int): Most bookings returned, up to MAX_LIMIT
+        restaurant_id (int): Restaurant to search
+
+    Returns:
+        list: SearchHit tuples
+    """
+    query = (query or '').strip()
+    limit = max(1, min(limit, MAX_LIMIT))
+    digits = re.sub(r'\D', '', query)
+
+    try:
+        if _PHONE_QUERY_RE.match(query):
+            if len(digits) < MIN_PHONE_DIGITS:
+                return []
+            ids = _phone_candidates(digits, restaurant_id)[:limit]
+            ranked = [(booking_id, MATCH_PHONE, 1.0) for booking_id in ids]
+        else:
+            query = _fold(query)
+            tokens = _TOKEN_RE.findall(query)
+            if not any(len(token) >= 2 for token in tokens):
+                return []
+
+            if _backend == 'fts5':
+                candidates = _name_candidates_fts5(tokens, limit, restaurant_id)
+            elif _backend == 'pg_trgm':
+                candidates = _name_candidates_pg_trgm(tokens, query, restaurant_id)
+            else:
+                candidates = _name_candidates_like(tokens, restaurant_id)
+
+            # Regulars and common names repeat, so each name is ranked once
+            query_trigrams = _trigrams(query)
+            name_ranks = {}
+            ranked = []
+            for booking_id, name in candidates.items():
+                if name not in name_ranks:
+                    name_ranks[name] = _rank_name(tokens, query_trigrams, _fold(name))
+                if name_ranks[name] is not None:
+                    ranked.append((booking_id,) + name_ranks[name])
+            ranked.sort(key=lambda hit: (_MATCH_ORDER[hit[1]], -hit[2], -hit[0]))
+            ranked = ranked[:limit]
+
+        bookings = {booking.id: booking for booking in
+                    Booking.query.filter(Booking.id.in_([booking_id for booking_id, _, _ in ranked]))}
+    except DBAPIError as e:
+        db.session.rollback()
+        current_app.logger.error(f"Error in search_bookings: {str(e)}")
+        return []
+
+    return [SearchHit(bookings[booking_id], match, round(score, 3))
+            for booking_id, match, score in ranked if booking_id in bookings]
+
+def _fts_ids(table, match):
+    """Booking IDs matching an FTS5 query, as a subquery"""
+    return select(literal_column('rowid')).select_from(text(table)).where(
+        # Unique, as a condition may hold several of these subqueries
+        text(f"{table} MATCH :match").bindparams(bindparam('match', match, unique=True))
+    )
+
+def _phone_digits():
+    """The phone number's digits as SQL, matching the phone index"""
+    if _backend == 'pg_trgm':
+        return func.regexp_replace(Booking.customer_phone, '[^0-9]', '', 'g')
+    digits = Booking.customer_phone
+    for char in '+ -().':
+        digits = func.replace(digits, char, '')
+    return digits
+
+def booking_search_condition(query, restaurant_id=DEFAULT_RESTAURANT_ID):
+    """
+    Condition selecting every booking a guest search matches, unranked and uncapped
+
+    For lists that also filter by status or date, where taking the best
+    ranked matches first would drop bookings that pass those filters. A
+    name matches when it contains every word of the query (or, on SQLite,
+    has words starting with them, accents ignored). Only when no booking
+    matches are misspellings looked for, as search_bookings()'s best
+    MAX_LIMIT fuzzy matches.
+
+    Args:
+        query (str): Part of a name, a misspelt name, or phone digits
+        restaurant_id (int): Restaurant to search
+
+    Returns:
+        ColumnElement: Condition on Booking, false when the query is too short
+    """
+    query = (query or '').strip()
+    digits = re.sub(r'\D', '', query)
+    in_restaurant = Booking.restaurant_id == restaurant_id
+
+    if _PHONE_QUERY_RE.match(query):
+        if len(digits) < MIN_PHONE_DIGITS:
+            return false()
+        if _backend == 'fts5':
+            return and_(in_restaurant, Booking.id.in_(_fts_ids('booking_search', f'phone : "{digits}"')))
+        return and_(in_restaurant, _phone_digits().contains(digits, autoescape=True))
+
+    tokens = _TOKEN_RE.findall(_fold(query))
+    if not any(len(token) >= 2 for token in tokens):
+        return false()
+
+    condition = and_(*[func.lower(Booking.customer_name).contains(token, autoescape=True) for token in tokens])
+    if _backend == 'fts5':
+        longest = max(tokens, key=len)
+        prefix_ids = _fts_ids('booking_name_search', ' '.join(f'"{token}"*' for token in tokens))
+        if len(longest) >= 3:
+            condition = and_(Booking.id.in_(_fts_ids('booking_search', f'name : "{longest}"')), condition)
+            condition = or_(Booking.id.in_(prefix_ids), condition)
+        else:
+            condition = Booking.id.in_(prefix_ids)
+    condition = and_(in_restaurant, condition)
+
+    try:
+        if db.session.execute(select(Booking.id).where(condition).limit(1)).first():
+            return condition
+    except DBAPIError as e:
+        db.session.rollback()
+        current_app.logger.error(f"Error in booking_search_condition: {str(e)}")
+        return false()
+    return Booking.id.in_([hit.booking.id for hit in search_bookings(query, MAX_LIMIT, restaurant_id)])
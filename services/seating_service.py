@@ -0,0 +1,370 @@
+"""
+Table assignment: which tables each party sits at over the day.
+
+A restaurant's tables are numbered by bit, and every way to seat a party
+(one table, or up to MAX_COMBINED_TABLES neighbouring tables of a join
+group pushed together) is a SeatingOption with a bitmask. A day keeps the
+mask of tables in use for each 15-minute bucket, so "can N sit at T?" ORs
+the few buckets the booking spans and takes the first option for N that
+doesn't overlap: no query, a few microseconds.
+
+Options for a party size are ordered best fit first (fewest empty seats,
+then fewest tables), so a couple takes a two-top and leaves the six-top
+for a group. optimise_day() seats a whole day twice, largest parties first
+(first-fit decreasing, as in bin packing) and earliest first (interval
+scheduling), and keeps whichever seats more parties.
+
+Restaurants without tables are limited by Restaurant.capacity alone. Table
+fit is checked from memory rather than serialized across workers like
+reserve_covers(), so two workers can promise the last table at once; the
+day's seating plan then lists one party as unseated for the host.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import NamedTuple
+from flask import current_app
+from sqlalchemy import select
+from app import db
+from models import Booking, RestaurantTable
+from services.occupancy_service import BUCKETS_PER_DAY, OCCUPYING_STATUSES, _span, _window
+from services.restaurant_service import time_to_minutes
+from services.slot_hold_service import held_parties
+
+# Most tables pushed together for one party
+MAX_COMBINED_TABLES = 3
+
+DEFAULT_TTL = 60
+DEFAULT_SIZE = 512
+DEFAULT_PLAN_TTL = 300
+
+class SeatingOption(NamedTuple):
+    """One way to seat a party: a table, or neighbouring tables pushed together"""
+    mask: int  # one bit per table, by index in the floor plan
+    seats: int
+    min_seats: int
+    table_ids: tuple
+
+class SeatingResult(NamedTuple):
+    """A seated day"""
+    day: 'DaySeating'
+    unseated: list  # keys of parties no table was free for
+
+class FloorPlan:
+    """
+    A restaurant's tables and every way to seat each party size
+
+    Args:
+        tables (list): RestaurantTable rows
+        max_combined (int): Most tables pushed together for one party
+    """
+    __slots__ = ('table_names', 'options', 'max_party', '_by_party')
+
+    def __init__(self, tables, max_combined=MAX_COMBINED_TABLES):
+        # Neighbours within a join group end up next to each other
+        tables = sorted(tables, key=lambda table: (table.join_group or '', table.position, table.id))
+        self.table_names = {table.id: table.name for table in tables}
+
+        options = []
+        for first, table in enumerate(tables):
+            options.append(SeatingOption(1 << first, table.seats, table.min_seats, (table.id,)))
+            if not table.join_group:
+                continue
+            mask, seats, largest, table_ids = 1 << first, table.seats, table.seats, (table.id,)
+            for last in range(first + 1, min(first + max_combined, len(tables))):
+                neighbour = tables[last]
+                if neighbour.join_group != table.join_group:
+                    break
+                mask |= 1 << last
+                seats += neighbour.seats
+                largest = max(largest, neighbour.seats)
+                table_ids += (neighbour.id,)
+                # Only worth pushing together for parties no single table of the run can take
+                options.append(SeatingOption(mask, seats, largest + 1, table_ids))
+
+        self.options = options
+        self.max_party = max((option.seats for option in options), default=0)
+        self._by_party = [()] + [
+            tuple(sorted(
+                (option for option in options if option.min_seats <= party_size <= option.seats),
+                key=lambda option: (option.seats - party_size, bin(option.mask).count('1'), option.mask)
+            ))
+            for party_size in range(1, self.max_party + 1)
+        ]
+
+    def options_for(self, party_size):
+        """
+        Ways to seat a party, best fit first
+
+        Args:
+            party_size (int): Covers
+
+        Returns:
+            tuple: SeatingOption tuples
+        """
+        if 0 < party_size <= self.max_party:
+            return self._by_party[party_size]
+        return ()
+
+class DaySeating:
+    """
+    Tables in use in each 15-minute bucket of one day, as bitmasks
+
+    Args:
+        plan (FloorPlan): Tables to seat parties at
+        duration_minutes (int, optional): How long a party keeps its table
+    """
+    __slots__ = ('plan', 'busy', 'span', 'assignments', 'expires_at')
+
+    def __init__(self, plan, duration_minutes=None, expires_at=0.0):
+        self.plan = plan
+        self.busy = [0] * BUCKETS_PER_DAY
+        self.span = _span(duration_minutes)
+        self.assignments = {}
+        self.expires_at = expires_at
+
+    def find(self, booking_time, party_size):
+        """
+        Best free table or combination for a party arriving at a time
+
+        Args:
+            booking_time (str): 'HH:MM'
+            party_size (int): Covers
+
+        Returns:
+            SeatingOption: Tables to use, or None if nothing is free
+        """
+        start, end = _window(booking_time, self.span)
+        used = 0
+        for mask in self.busy[start:end]:
+            used |= mask
+        for option in self.plan.options_for(party_size):
+            if not option.mask & used:
+                return option
+        return None
+
+    def seat(self, key, booking_time, party_size):
+        """
+        Seat a party at its best free option
+
+        Args:
+            key: Booking ID or other identifier for the party
+            booking_time (str): 'HH:MM'
+            party_size (int): Covers
+
+        Returns:
+            SeatingOption: Tables taken, or None if nothing was free
+        """
+        option = self.find(booking_time, party_size)
+        if option is not None:
+            start, end = _window(booking_time, self.span)
+            busy = self.busy
+            for bucket in range(start, end):
+                busy[bucket] |= option.mask
+            self.assignments[key] = option
+        return option
+
+    def copy(self):
+        other = DaySeating.__new__(DaySeating)
+        other.plan = self.plan
+        other.busy = list(self.busy)
+        other.span = self.span
+        other.assignments = dict(self.assignments)
+        other.expires_at = self.expires_at
+        return other
+
+_ORDERS = (
+    # Largest parties first: they fit the fewest tables
+    lambda party: (-party[2], time_to_minutes(party[1])),
+    # Earliest first: fills each table's evening back to back
+    lambda party: (time_to_minutes(party[1]), -party[2]),
+)
+
+def optimise_day(plan, parties, duration_minutes=None):
+    """
+    Seat a day's parties, seating as many as possible
+
+    Args:
+        plan (FloorPlan): Tables
+        parties (list): (key, 'HH:MM', party size) per party
+        duration_minutes (int, optional): How long a party keeps its table
+
+    Returns:
+        SeatingResult: Seated day and the parties left without a table
+    """
+    best = None
+    for order in _ORDERS:
+        day = DaySeating(plan, duration_minutes)
+        unseated = [key for key, booking_time, party_size in sorted(parties, key=order)
+                    if day.seat(key, booking_time, party_size) is None]
+        if best is None or len(unseated) < len(best.unseated):
+            best = SeatingResult(day, unseated)
+            if not unseated:
+                break
+    return best
+
+# restaurant_id -> (expires_at, FloorPlan or None)
+_plans = {}
+_plans_lock = threading.Lock()
+
+# (restaurant_id, date) -> SeatingResult, least recently used first
+_days = OrderedDict()
+_days_lock = threading.Lock()
+
+def get_floor_plan(restaurant_id):
+    """
+    Get a restaurant's active tables, cached for RESTAURANT_CONFIG_TTL
+
+    Args:
+        restaurant_id (int): Restaurant ID
+
+    Returns:
+        FloorPlan: Tables, or None if the restaurant has none
+    """
+    now = time.monotonic()
+    entry = _plans.get(restaurant_id)
+    if entry is not None and entry[0] > now:
+        return entry[1]
+
+    tables = RestaurantTable.query.filter_by(restaurant_id=restaurant_id, active=True).all()
+    plan = FloorPlan(tables) if tables else None
+    ttl = current_app.config.get('RESTAURANT_CONFIG_TTL', DEFAULT_PLAN_TTL)
+    with _plans_lock:
+        _plans[restaurant_id] = (now + ttl, plan)
+    return plan
+
+def get_day_seating(restaurant_id, booking_date):
+    """
+    Get a day's confirmed bookings seated by optimise_day(), cached like occupancy
+
+    Args:
+        restaurant_id (int): Restaurant ID
+        booking_date (date): Booking date
+
+    Returns:
+        SeatingResult: Shared with the cache, so treat as read-only; None
+            if the restaurant has no tables
+    """
+    plan = get_floor_plan(restaurant_id)
+    if plan is None:
+        return None
+
+    key = (restaurant_id, booking_date)
+    with _days_lock:
+        result = _days.get(key)
+        if result is not None and result.day.plan is plan and result.day.expires_at > time.monotonic():
+            _days.move_to_end(key)
+            return result
+
+    parties = db.session.execute(
+        select(Booking.id, Booking.booking_time, Booking.party_size)
+        .where(Booking.restaurant_id == restaurant_id,
+               Booking.booking_date == booking_date,
+               Booking.status.in_(OCCUPYING_STATUSES))
+    ).all()
+    config = current_app.config
+    result = optimise_day(plan, parties, config.get('BOOKING_DURATION_MINUTES'))
+    result.day.expires_at = time.monotonic() + config.get('AVAILABILITY_CACHE_TTL', DEFAULT_TTL)
+
+    with _days_lock:
+        _days[key] = result
+        _days.move_to_end(key)
+        while len(_days) > config.get('AVAILABILITY_CACHE_SIZE', DEFAULT_SIZE):
+            _days.popitem(last=False)
+    return result
+
+def get_seating_with_holds(restaurant_id, booking_date, call_sid=None):
+    """
+    A day's seating with other callers' held parties seated as well
+
+    Args:
+        restaurant_id (int): Restaurant ID
+        booking_date (date): Booking date
+        call_sid (str, optional): Call asking; its own hold isn't seated
+
+    Returns:
+        DaySeating: Copy that is safe to modify, or None if the restaurant
+            has no tables
+    """
+    result = get_day_seating(restaurant_id, booking_date)
+    if result is None:
+        return None
+
+    day = result.day.copy()
+    for hold_call_sid, booking_time, party_size in held_parties(restaurant_id, booking_date, call_sid):
+        day.seat(('hold', hold_call_sid), booking_time, party_size)
+    return day
+
+def invalidate_seating(restaurant_id, booking_date=None):
+    """
+    Forget seated days so they are optimised again with the latest bookings
+
+    Args:
+        restaurant_id (int): Restaurant ID
+        booking_date (date, optional): Day to forget; all days when omitted
+    """
+    with _days_lock:
+        if booking_date is not None:
+            _days.pop((restaurant_id, booking_date), None)
+            return
+        for key in [key for key in _days if key[0] == restaurant_id]:
+            del _days[key]
+
+def get_seating_plan(restaurant_id, booking_date):
+    """
+    Tables assigned to each confirmed booking of a day, for the host
+
+    Args:
+        restaurant_id (int): Restaurant ID
+        booking_date (date): Booking date
+
+    Returns:
+        dict: {'tables': {id: name}, 'assignments': {booking ID: [table
+            names]}, 'unseated': [booking IDs]}, or None if the restaurant
+            has no tables
+    """
+    result = get_day_seating(restaurant_id, booking_date)
+    if result is None:
+        return None
+
+    table_names = result.day.plan.table_names
+    return {
+        'tables': table_names,
+        'assignments': {
+            booking_id: [table_names[table_id] for table_id in option.table_ids]
+            for booking_id, option in result.day.assignments.items()
+        },
+        'unseated': sorted(result.unseated)
+    }
+
+def add_table(restaurant_id, name, seats, min_seats=1, join_group=None, position=0):
+    """
+    Add a table to a restaurant's floor
+
+    Args:
+        restaurant_id (int): Restaurant ID
+        name (str): Table name or number shown to the host
+        seats (int): Most guests the table seats
+        min_seats (int, optional): Smallest party worth seating at it
+        join_group (str, optional): Tables in the same group can be pushed
+            together with their neighbours
+        position (int, optional): Order within the join group
+
+    Returns:
+        RestaurantTable: The new table
+    """
+    table = RestaurantTable(
+        restaurant_id=restaurant_id,
+        name=name,
+        seats=seats,
+        min_seats=min_seats,
+        join_group=join_group,
+        position=position
+    )
+    db.session.add(table)
+    db.session.commit()
+
+    with _plans_lock:
+        _plans.pop(restaurant_id, None)
+    invalidate_seating(restaurant_id)
+    return table
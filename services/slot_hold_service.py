@@ -0,0 +1,157 @@
+import threading
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import delete, func, select
+from app import db
+from models import SlotHold
+from services.occupancy_service import has_room_for_hold
+from services.restaurant_service import get_restaurant_config
+
+DEFAULT_HOLD_TTL = 300
+
+# Expired holds are ignored by every query; they are deleted every N holds placed
+PURGE_EVERY_WRITES = 100
+
+_writes = 0
+_writes_lock = threading.Lock()
+
+def held_seats(restaurant_id, booking_date, exclude_call_sid=None):
+    """
+    Seats held by callers who are still confirming, per time slot
+
+    One indexed query over the few holds active for the date, cheap enough
+    to run on every availability check.
+
+    Args:
+        restaurant_id (int): Restaurant ID
+        booking_date (date): Booking date
+        exclude_call_sid (str, optional): Call whose own hold should not count
+
+    Returns:
+        dict: 'HH:MM' -> seats held
+    """
+    query = (
+        select(SlotHold.booking_time, func.sum(SlotHold.party_size))
+        .where(SlotHold.restaurant_id == restaurant_id,
+               SlotHold.booking_date == booking_date,
+               SlotHold.expires_at > datetime.utcnow())
+        .group_by(SlotHold.booking_time)
+    )
+    if exclude_call_sid:
+        query = query.where(SlotHold.call_sid != exclude_call_sid)
+    return {booking_time: int(seats) for booking_time, seats in db.session.execute(query)}
+
+def held_parties(restaurant_id, booking_date, exclude_call_sid=None):
+    """
+    Parties held by callers who are still confirming, one per hold
+
+    Args:
+        restaurant_id (int): Restaurant ID
+        booking_date (date): Booking date
+        exclude_call_sid (str, optional): Call whose own hold should not count
+
+    Returns:
+        list: (call_sid, 'HH:MM', party size) tuples
+    """
+    query = (
+        select(SlotHold.call_sid, SlotHold.booking_time, SlotHold.party_size)
+        .where(SlotHold.restaurant_id == restaurant_id,
+               SlotHold.booking_date == booking_date,
+               SlotHold.expires_at > datetime.utcnow())
+    )
+    if exclude_call_sid:
+        query = query.where(SlotHold.call_sid != exclude_call_sid)
+    return [tuple(row) for row in db.session.execute(query)]
+
+def place_hold(call_sid, restaurant_id, booking_date, booking_time, party_size):
+    """
+    Hold seats for a call, replacing any earlier hold for the same call
+
+    The seats are checked against bookings and other holds with the seat
+    counters locked, so two callers can't both hold the last seats, nor a
+    booking take them meanwhile. If they are gone the earlier hold is
+    dropped too. Does not commit; the caller commits with the rest of the
+    turn, which releases the counters.
+
+    Args:
+        call_sid (str): Twilio CallSid
+        restaurant_id (int): Restaurant ID
+        booking_date (date): Booking date
+        booking_time (str): 'HH:MM'
+        party_size (int): Seats to hold
+
+    Returns:
+        SlotHold: The hold, or None if the seats were taken since they were offered
+    """
+    global _writes
+
+    restaurant = get_restaurant_config(restaurant_id)
+    if restaurant is None or not has_room_for_hold(restaurant_id, booking_date, booking_time, party_size,
+                                                   restaurant.capacity, call_sid):
+        release_hold(call_sid)
+        return None
+
+    ttl = current_app.config.get('SLOT_HOLD_TTL', DEFAULT_HOLD_TTL)
+    expires_at = datetime.utcnow() + timedelta(seconds=ttl)
+
+    hold = db.session.get(SlotHold, call_sid)
+    if hold is None:
+        hold = SlotHold(call_sid=call_sid)
+        db.session.add(hold)
+    hold.restaurant_id = restaurant_id
+    hold.booking_date = booking_date
+    hold.booking_time = booking_time
+    hold.party_size = party_size
+    hold.expires_at = expires_at
+
+    with _writes_lock:
+        _writes += 1
+        purge = _writes % PURGE_EVERY_WRITES == 0
+    if purge:
+        purge_expired_holds()
+    return hold
+
+def get_active_hold(call_sid):
+    """
+    Get a call's hold if it hasn't expired
+
+    Args:
+        call_sid (str): Twilio CallSid
+
+    Returns:
+        SlotHold: The hold, or None
+    """
+    hold = db.session.get(SlotHold, call_sid)
+    if hold is None or hold.expires_at <= datetime.utcnow():
+        return None
+    return hold
+
+def release_hold(call_sid):
+    """
+    Drop a call's hold, e.g. on hangup or once it became a booking
+
+    Does not commit.
+
+    Args:
+        call_sid (str): Twilio CallSid
+
+    Returns:
+        bool: True if a hold was released
+    """
+    if not call_sid:
+        return False
+    hold = db.session.get(SlotHold, call_sid)
+    if hold is None:
+        return False
+    db.session.delete(hold)
+    return True
+
+def purge_expired_holds():
+    """
+    Delete holds that have timed out
+
+    Returns:
+        int: Number of holds deleted
+    """
+    result = db.session.execute(delete(SlotHold).where(SlotHold.expires_at <= datetime.utcnow()))
+    return result.rowcount
@@ -0,0 +1,123 @@
+"""
+Background sweep that completes bookings once they are over.
+
+Nobody clicks "complete" for most bookings, so without this they stay
+confirmed forever, inflating the dashboard's confirmed count and every
+query for confirmed bookings. Every BOOKING_SWEEP_INTERVAL seconds a
+daemon thread marks confirmed bookings as completed once they ended
+(BOOKING_DURATION_MINUTES after their time) more than
+BOOKING_SWEEP_GRACE_MINUTES ago, so a late table can still be marked a
+no-show by hand first.
+
+Bookings are found through the (status, booking_date) index and changed
+with bulk_update_status() in batches of BOOKING_SWEEP_BATCH_SIZE, each its
+own short transaction, pausing between batches so bookings being made
+meanwhile never wait long for the write lock. Every worker runs a sweeper;
+a booking swept by two at once is only changed by the first, since the
+update is guarded by its status.
+"""
+import threading
+import time
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import select
+from app import db
+from models import Booking
+from services.booking_service import bulk_update_status
+from services.restaurant_service import time_to_minutes
+
+DEFAULT_INTERVAL = 300
+DEFAULT_GRACE_MINUTES = 120
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_DURATION_MINUTES = 60
+
+# Seconds between batches, letting other writers in
+BATCH_PAUSE_SECONDS = 0.05
+
+_sweeper = None
+_sweeper_lock = threading.Lock()
+
+def _past_booking_ids(cutoff, limit):
+    """IDs of up to limit confirmed bookings that started at or before cutoff, oldest first"""
+    ids = db.session.execute(
+        select(Booking.id)
+        .where(Booking.status == 'confirmed', Booking.booking_date < cutoff.date())
+        .order_by(Booking.booking_date)
+        .limit(limit)
+    ).scalars().all()
+
+    if len(ids) < limit:
+        # The cutoff's own day is only over up to the cutoff time
+        cutoff_minute = cutoff.hour * 60 + cutoff.minute
+        rows = db.session.execute(
+            select(Booking.id, Booking.booking_time)
+            .where(Booking.status == 'confirmed', Booking.booking_date == cutoff.date())
+        )
+        ids += [booking_id for booking_id, booking_time in rows
+                if time_to_minutes(booking_time) <= cutoff_minute][:limit - len(ids)]
+    return ids
+
+def sweep_past_bookings(now=None):
+    """
+    Mark confirmed bookings that are over as completed
+
+    Args:
+        now (datetime, optional): Time to sweep up to; defaults to now
+
+    Returns:
+        int: Number of bookings completed
+    """
+    config = current_app.config
+    duration = config.get('BOOKING_DURATION_MINUTES', DEFAULT_DURATION_MINUTES)
+    grace = config.get('BOOKING_SWEEP_GRACE_MINUTES', DEFAULT_GRACE_MINUTES)
+    batch_size = config.get('BOOKING_SWEEP_BATCH_SIZE', DEFAULT_BATCH_SIZE)
+    cutoff = (now or datetime.now()) - timedelta(minutes=duration + grace)
+
+    swept = 0
+    while True:
+        booking_ids = _past_booking_ids(cutoff, batch_size)
+        if not booking_ids:
+            break
+
+        # Guarded by status, so bookings changed since they were read are left alone
+        result = bulk_update_status('completed', booking_ids, {'status': 'confirmed'})
+        if not result.success:
+            current_app.logger.error(f"Booking sweep stopped: {result.message}")
+            break
+        swept += result.updated
+
+        if len(booking_ids) < batch_size:
+            break
+        time.sleep(BATCH_PAUSE_SECONDS)
+
+    if swept:
+        current_app.logger.info(f"Booking sweep completed {swept} past bookings")
+    return swept
+
+def _run_sweeper(app, interval):
+    while True:
+        time.sleep(interval)
+        with app.app_context():
+            try:
+                sweep_past_bookings()
+            except Exception as e:
+                app.logger.error(f"Booking sweep failed: {str(e)}")
+
+def init_booking_sweeper(app):
+    """
+    Start the background sweep, unless BOOKING_SWEEP_INTERVAL is 0
+
+    Args:
+        app (Flask): Application
+    """
+    global _sweeper
+
+    interval = app.config.get('BOOKING_SWEEP_INTERVAL', DEFAULT_INTERVAL)
+    if interval <= 0:
+        return
+
+    with _sweeper_lock:
+        if _sweeper is None:
+            _sweeper = threading.Thread(target=_run_sweeper, args=(app, interval),
+                                        name='booking-sweeper', daemon=True)
+            _sweeper.start()
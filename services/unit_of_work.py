@@ -0,0 +1,122 @@
+"""
+One commit per logical operation.
+
+Services that write call commit() instead of db.session.commit(). On
+their own they still commit straight away, but inside a
+`with unit_of_work():` block they only flush, and the outermost block
+commits once: a booking, its audit entry, the call state and the voice
+interaction are saved together or not at all. Work that must wait until
+the data is committed, such as updating in-memory indexes, is deferred
+with after_commit().
+
+Commits are counted per request and returned in the X-DB-Commits header.
+"""
+from contextlib import contextmanager
+from flask import g, has_app_context, has_request_context
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app import db
+
+COMMIT_COUNT_HEADER = 'X-DB-Commits'
+
+def in_unit_of_work():
+    """
+    Check whether writes are currently being grouped
+
+    Returns:
+        bool: True inside a unit_of_work() block
+    """
+    return has_app_context() and g.get('unit_of_work_depth', 0) > 0
+
+@contextmanager
+def unit_of_work():
+    """
+    Commit everything written in the block once, or roll it all back
+
+    Nested blocks join the outermost one.
+    """
+    depth = g.get('unit_of_work_depth', 0)
+    g.unit_of_work_depth = depth + 1
+    try:
+        yield
+        if depth == 0:
+            db.session.commit()
+    except Exception:
+        if depth == 0:
+            db.session.rollback()
+        raise
+    finally:
+        g.unit_of_work_depth = depth
+
+    if depth == 0:
+        for callback in g.pop('after_commit_callbacks', []):
+            callback()
+
+@contextmanager
+def savepoint():
+    """
+    Undo only the block's writes, and its after_commit() callbacks, if it fails
+
+    Inside a unit of work the block runs in a savepoint so the caller's other
+    writes survive; outside one it just runs, and the caller rolls back.
+    """
+    if not in_unit_of_work():
+        yield
+        return
+    callback_count = len(g.get('after_commit_callbacks', []))
+    try:
+        with db.session.begin_nested():
+            yield
+    except Exception:
+        del g.get('after_commit_callbacks', [])[callback_count:]
+        raise
+
+def commit():
+    """Commit now, or only flush when an enclosing unit of work will commit"""
+    if in_unit_of_work():
+        db.session.flush()
+    else:
+        db.session.commit()
+
+def after_commit(callback):
+    """
+    Run a callback once the current unit of work has committed
+
+    Runs it straight away outside a unit of work. Callbacks are dropped if
+    the unit is rolled back.
+
+    Args:
+        callback (callable): Function taking no arguments
+    """
+    if in_unit_of_work():
+        g.setdefault('after_commit_callbacks', []).append(callback)
+    else:
+        callback()
+
+# Both also fire when a savepoint is released or rolled back; only the outermost transaction counts
+
+@event.listens_for(Session, 'after_commit')
+def _count_commit(session):
+    if has_request_context() and not session.in_nested_transaction():
+        g.db_commits = g.get('db_commits', 0) + 1
+
+@event.listens_for(Session, 'after_rollback')
+def _drop_callbacks(session):
+    if has_app_context() and not session.in_nested_transaction():
+        g.pop('after_commit_callbacks', None)
+
+def init_unit_of_work(app):
+    """
+    Report each request's commit count in a response header
+
+    Args:
+        app (Flask): Application
+    """
+    @app.before_request
+    def reset_commit_count():
+        g.db_commits = 0
+
+    @app.after_request
+    def add_commit_count(response):
+        response.headers[COMMIT_COUNT_HEADER] = str(g.get('db_commits', 0))
+        return response
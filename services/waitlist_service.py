@@ -0,0 +1,334 @@
+"""
+Waitlist for full time slots, refilled automatically from cancellations.
+
+A party joins for a date and preferred time and waits in the window of
+WAITLIST_WINDOW_MINUTES containing that time (the hour, by default). Each
+(restaurant, date, window) keeps a heap of its waiting entries ordered by
+when they joined, so joining and taking the next party are O(log n).
+
+When a confirmed booking is canceled, the parties waiting in the window of
+its time are offered the freed seats at that time in heap order. Each is
+booked through create_booking(), so capacity and tables are checked as for
+any booking, and told by SMS. Parties that don't fit stay in the heap for
+the next cancellation. Promotion runs on a background thread so the
+cancellation itself returns straight away.
+
+Heaps are per worker and reloaded from the waitlist table after
+AVAILABILITY_CACHE_TTL, so entries added through other workers are picked
+up. An entry is marked promoted with a guarded update in the same commit
+as its booking, so two workers can never book it twice.
+"""
+import heapq
+import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import select, update
+from app import db
+from models import WaitlistEntry
+from services.audit_service import log_action
+from services.booking_service import BOOKING_DUPLICATE, create_booking, validate_party_and_time
+from services.notification_service import send_waitlist_promotion
+from services.restaurant_service import time_to_minutes
+from services.unit_of_work import after_commit, unit_of_work
+
+DEFAULT_WINDOW_MINUTES = 60
+DEFAULT_PROMOTION_WORKERS = 2
+DEFAULT_TTL = 60
+DEFAULT_SIZE = 512
+
+# Waiting parties tried per cancellation before giving up on it
+MAX_PROMOTION_ATTEMPTS = 20
+
+# (restaurant_id, date, window) -> (expires_at, heap of (created_at, entry id, party size))
+_heaps = OrderedDict()
+_heaps_lock = threading.Lock()
+
+_promotion_pool = None
+
+class _NotPromoted(Exception):
+    """Roll back a promotion attempt"""
+
+    def __init__(self, still_waiting):
+        super().__init__()
+        self.still_waiting = still_waiting
+
+def _window_of(booking_time):
+    """Index of the window a 'HH:MM' time falls in"""
+    window_minutes = current_app.config.get('WAITLIST_WINDOW_MINUTES', DEFAULT_WINDOW_MINUTES)
+    return time_to_minutes(booking_time) // window_minutes
+
+def _load_heap(key):
+    """Heap of a window's waiting entries from the waitlist table"""
+    restaurant_id, booking_date, window = key
+    window_minutes = current_app.config.get('WAITLIST_WINDOW_MINUTES', DEFAULT_WINDOW_MINUTES)
+    first, last = window * window_minutes, (window + 1) * window_minutes - 1
+    rows = db.session.execute(
+        select(WaitlistEntry.created_at, WaitlistEntry.id, WaitlistEntry.party_size, WaitlistEntry.booking_time)
+        .where(WaitlistEntry.restaurant_id == restaurant_id,
+               WaitlistEntry.booking_date == booking_date,
+               WaitlistEntry.status == 'waiting')
+    )
+    # Times are compared as minutes since stored times may lack a leading zero
+    heap = [(created_at, entry_id, party_size) for created_at, entry_id, party_size, booking_time in rows
+            if first <= time_to_minutes(booking_time) <= last]
+    heapq.heapify(heap)
+    return heap
+
+def _pop(key):
+    """Take the longest-waiting entry of a window, loading the window first if needed"""
+    with _heaps_lock:
+        cached = _heaps.get(key)
+        fresh = cached is not None and cached[0] > time.monotonic()
+
+    if not fresh:
+        heap = _load_heap(key)
+        config = current_app.config
+        with _heaps_lock:
+            _heaps[key] = (time.monotonic() + config.get('AVAILABILITY_CACHE_TTL', DEFAULT_TTL), heap)
+            _heaps.move_to_end(key)
+            while len(_heaps) > config.get('AVAILABILITY_CACHE_SIZE', DEFAULT_SIZE):
+                _heaps.popitem(last=False)
+
+    with _heaps_lock:
+        cached = _heaps.get(key)
+        if cached is None or not cached[1]:
+            return None
+        return heapq.heappop(cached[1])
+
+def _push(key, item):
+    """Add an entry to a window's heap if the window is in memory; otherwise it is loaded with it"""
+    with _heaps_lock:
+        cached = _heaps.get(key)
+        if cached is not None:
+            heapq.heappush(cached[1], item)
+
+def join_waitlist(entry_data):
+    """
+    Put a party on the waitlist for a date and time
+
+    Args:
+        entry_data (dict): customer_name, customer_phone, party_size,
+            booking_date, booking_time and restaurant_id, optionally
+            customer_email and special_requests
+
+    Returns:
+        tuple: (WaitlistEntry object, success boolean, message string)
+    """
+    try:
+        if not all(key in entry_data for key in ['customer_name', 'customer_phone', 'party_size', 'booking_date', 'booking_time', 'restaurant_id']):
+            return None, False, "Missing required waitlist information"
+
+        # Validated as for a booking, since the entry is booked as one when seats free up
+        entry_data, error = validate_party_and_time(entry_data)
+        if error:
+            return None, False, error
+
+        entry = WaitlistEntry(
+            restaurant_id=entry_data['restaurant_id'],
+            customer_name=entry_data['customer_name'],
+            customer_phone=entry_data['customer_phone'],
+            customer_email=entry_data.get('customer_email', ''),
+            party_size=entry_data['party_size'],
+            booking_date=entry_data['booking_date'],
+            booking_time=entry_data['booking_time'],
+            special_requests=entry_data.get('special_requests', ''),
+            created_at=datetime.utcnow()
+        )
+
+        with unit_of_work():
+            db.session.add(entry)
+            db.session.flush()
+
+            log_action(
+                'join_waitlist',
+                'waitlist',
+                entry.id,
+                f"{entry.customer_name} joined the waitlist for {entry.booking_date} at {entry.booking_time}",
+                json.dumps(entry_data, default=str)
+            )
+
+            key = (entry.restaurant_id, entry.booking_date, _window_of(entry.booking_time))
+            item = (entry.created_at, entry.id, entry.party_size)
+            after_commit(lambda: _push(key, item))
+
+        return entry, True, "Added to the waitlist"
+
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Error in join_waitlist: {str(e)}")
+        return None, False, f"An error occurred: {str(e)}"
+
+def leave_waitlist(entry):
+    """
+    Take a party off the waitlist
+
+    Its heap item is dropped when it comes up, since it is no longer waiting.
+
+    Args:
+        entry (WaitlistEntry): Entry to cancel
+
+    Returns:
+        tuple: (success boolean, message string)
+    """
+    if entry.status != 'waiting':
+        return False, f"Waitlist entry is already {entry.status}"
+
+    try:
+        with unit_of_work():
+            entry.status = 'canceled'
+            log_action(
+                'leave_waitlist',
+                'waitlist',
+                entry.id,
+                f"{entry.customer_name} left the waitlist for {entry.booking_date} at {entry.booking_time}"
+            )
+        return True, "Removed from the waitlist"
+
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Error in leave_waitlist: {str(e)}")
+        return False, f"An error occurred: {str(e)}"
+
+def get_waitlist(restaurant_id, booking_date):
+    """
+    Parties still waiting on a date, longest waiting first
+
+    Args:
+        restaurant_id (int): Restaurant ID
+        booking_date (date): Booking date
+
+    Returns:
+        list: WaitlistEntry objects
+    """
+    return WaitlistEntry.query.filter_by(
+        restaurant_id=restaurant_id, booking_date=booking_date, status='waiting'
+    ).order_by(WaitlistEntry.created_at, WaitlistEntry.id).all()
+
+def _promote(entry_id, booking_time):
+    """
+    Book a waiting entry at a freed time
+
+    Returns:
+        tuple: (Booking or None, whether the entry is still waiting)
+    """
+    entry = db.session.get(WaitlistEntry, entry_id)
+    if entry is None or entry.status != 'waiting':
+        return None, False
+
+    booking_data = {
+        'customer_name': entry.customer_name,
+        'customer_phone': entry.customer_phone,
+        'customer_email': entry.customer_email,
+        'party_size': entry.party_size,
+        'booking_date': entry.booking_date,
+        'booking_time': booking_time,
+        'special_requests': entry.special_requests,
+        'restaurant_id': entry.restaurant_id
+    }
+
+    try:
+        with unit_of_work():
+            booking, success, message, code = create_booking(booking_data)
+            if not success:
+                # A party that has since booked at this time themselves needn't be offered it
+                raise _NotPromoted(still_waiting=code != BOOKING_DUPLICATE)
+
+            promoted = db.session.execute(
+                update(WaitlistEntry)
+                .where(WaitlistEntry.id == entry_id, WaitlistEntry.status == 'waiting')
+                .values(status='promoted', booking_id=booking.id, promoted_at=datetime.utcnow())
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            if not promoted:
+                # Another worker promoted it first; drop our booking
+                raise _NotPromoted(still_waiting=False)
+
+            log_action(
+                'promote_waitlist',
+                'waitlist',
+                entry_id,
+                f"Waitlist entry booked as booking {booking.id} at {booking_time}",
+                json.dumps({'entry_id': entry_id, 'booking_id': booking.id, 'booking_time': booking_time})
+            )
+    except _NotPromoted as e:
+        return None, e.still_waiting
+
+    return booking, False
+
+def promote_waitlist(restaurant_id, booking_date, booking_time):
+    """
+    Book waiting parties into seats freed at a time, longest waiting first
+
+    Args:
+        restaurant_id (int): Restaurant ID
+        booking_date (date): Date of the canceled booking
+        booking_time (str): 'HH:MM' the seats were freed at
+
+    Returns:
+        list: Bookings made from the waitlist
+    """
+    key = (restaurant_id, booking_date, _window_of(booking_time))
+    promoted = []
+    still_waiting = []
+
+    try:
+        for _ in range(MAX_PROMOTION_ATTEMPTS):
+            item = _pop(key)
+            if item is None:
+                break
+
+            booking, waiting = _promote(item[1], booking_time)
+            if booking is not None:
+                promoted.append(booking)
+            elif waiting:
+                still_waiting.append(item)
+    finally:
+        # Parties that didn't fit keep their place for the next cancellation
+        for item in still_waiting:
+            _push(key, item)
+
+    for booking in promoted:
+        send_waitlist_promotion(booking)
+
+    if promoted:
+        current_app.logger.info(f"Promoted {len(promoted)} waitlisted parties into {booking_date} {booking_time}")
+    return promoted
+
+def _promote_in_background(app, restaurant_id, booking_date, booking_time):
+    with app.app_context():
+        try:
+            promote_waitlist(restaurant_id, booking_date, booking_time)
+        except Exception as e:
+            app.logger.error(f"Waitlist promotion for {booking_date} {booking_time} failed: {str(e)}")
+
+def _get_promotion_pool():
+    global _promotion_pool
+
+    if _promotion_pool is None:
+        workers = current_app.config.get('WAITLIST_PROMOTION_WORKERS', DEFAULT_PROMOTION_WORKERS)
+        if workers <= 0:
+            return None
+        _promotion_pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='waitlist-promotion')
+    return _promotion_pool
+
+def schedule_promotion(restaurant_id, booking_date, booking_time):
+    """
+    Offer freed seats to the waitlist on a background thread
+
+    Runs promote_waitlist() in the calling thread when
+    WAITLIST_PROMOTION_WORKERS is 0.
+
+    Args:
+        restaurant_id (int): Restaurant ID
+        booking_date (date): Date of the canceled booking
+        booking_time (str): 'HH:MM' the seats were freed at
+    """
+    pool = _get_promotion_pool()
+    if pool is None:
+        promote_waitlist(restaurant_id, booking_date, booking_time)
+        return
+    pool.submit(_promote_in_background, current_app._get_current_object(), restaurant_id, booking_date, booking_time)
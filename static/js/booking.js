@@ -109,6 +109,9 @@ document.addEventListener('DOMContentLoaded', function() {
     
     // Booking form submission
     if (bookingForm) {
+        // Repeated submissions of the same booking share a key, so the server creates it once
+        let idempotencyKey = newIdempotencyKey();
+        
         bookingForm.addEventListener('submit', function(e) {
             e.preventDefault();
             showLoading();
@@ -117,10 +120,12 @@ document.addEventListener('DOMContentLoaded', function() {
             
             fetch('/booking/create', {
                 method: 'POST',
+                headers: {'Idempotency-Key': idempotencyKey},
                 body: formData
             })
             .then(response => {
-                if (!response.ok) {
+                // Rejected bookings (400, or 409 for a duplicate) still say why
+                if (!response.ok && response.status !== 400 && response.status !== 409) {
                     throw new Error('Network response was not ok');
                 }
                 return response.json();
@@ -138,8 +143,9 @@ document.addEventListener('DOMContentLoaded', function() {
                         }, 5000);
                     }
                     
-                    // Clear form
+                    // Clear form; the next booking gets a new key
                     bookingForm.reset();
+                    idempotencyKey = newIdempotencyKey();
                 } else {
                     showError(data.message || 'Failed to create booking');
                 }
@@ -153,6 +159,13 @@ document.addEventListener('DOMContentLoaded', function() {
     }
     
     // Helper functions
+    function newIdempotencyKey() {
+        if (window.crypto && crypto.randomUUID) {
+            return crypto.randomUUID();
+        }
+        return Date.now().toString(36) + Math.random().toString(36).slice(2);
+    }
+    
     function fillBookingForm(data) {
         for (const [key, value] of Object.entries(data)) {
             const input = bookingForm.querySelector(`[name="${key}"]`);
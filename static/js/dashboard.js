@@ -19,6 +19,16 @@ document.addEventListener('DOMContentLoaded', function() {
         statusFilter.addEventListener('change', filterBookings);
     }
     
+    const bookingSearch = document.getElementById('booking-search');
+    if (bookingSearch) {
+        bookingSearch.addEventListener('keydown', function(e) {
+            if (e.key === 'Enter') {
+                e.preventDefault();
+                filterBookings();
+            }
+        });
+    }
+    
     // Booking action buttons (confirm, cancel, etc.)
     document.querySelectorAll('.booking-action').forEach(button => {
         button.addEventListener('click', function(e) {
@@ -36,7 +46,8 @@ document.addEventListener('DOMContentLoaded', function() {
     const exportCsvBtn = document.getElementById('export-csv');
     if (exportCsvBtn) {
         exportCsvBtn.addEventListener('click', function() {
-            window.location.href = '/dashboard/export-csv';
+            // Export what the dashboard is showing
+            window.location.href = '/dashboard/export-csv' + window.location.search;
         });
     }
     
@@ -80,7 +91,16 @@ document.addEventListener('DOMContentLoaded', function() {
         const dateRange = bookingDateFilter && bookingDateFilter._flatpickr ? 
                         bookingDateFilter._flatpickr.selectedDates : [];
         
+        const searchValue = bookingSearch ? bookingSearch.value.trim() : '';
+        
         let params = new URLSearchParams();
+        const restaurantId = new URLSearchParams(window.location.search).get('restaurant_id');
+        if (restaurantId) {
+            params.append('restaurant_id', restaurantId);
+        }
+        if (searchValue) {
+            params.append('q', searchValue);
+        }
         if (statusValue) {
             params.append('status', statusValue);
         }
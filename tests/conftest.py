@@ -0,0 +1,89 @@
+"""
+Shared fixtures: the app runs against a scratch SQLite database that is
+emptied between tests, along with the per-worker caches built from it.
+"""
+import os
+import sys
+import tempfile
+
+# Set before app is imported, since it reads its config at import time
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'test.db')
+os.environ['BOOKING_SWEEP_INTERVAL'] = '0'
+os.environ['WAITLIST_PROMOTION_WORKERS'] = '0'
+os.environ['AVAILABILITY_PREFETCH_WORKERS'] = '0'
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import re
+from datetime import date, timedelta
+
+import pytest
+
+from app import app as flask_app, db
+
+GATHER_ACTION_RE = re.compile(r'<Gather[^>]*action="([^"]+)"')
+
+def _clear_caches():
+    from services import (availability_service, call_session_service, occupancy_service,
+                          restaurant_service, seating_service, waitlist_service)
+    availability_service._slot_cache.clear()
+    occupancy_service._days.clear()
+    restaurant_service._config_cache.clear()
+    seating_service._plans.clear()
+    seating_service._days.clear()
+    waitlist_service._heaps.clear()
+    call_session_service._call_session_store = None
+
+@pytest.fixture
+def app():
+    """The application with an empty database and only the default restaurant"""
+    from services.restaurant_service import ensure_default_restaurant
+
+    with flask_app.app_context():
+        for table in reversed(db.metadata.sorted_tables):
+            db.session.execute(table.delete())
+        db.session.commit()
+        _clear_caches()
+        ensure_default_restaurant()
+        yield flask_app
+        db.session.remove()
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+@pytest.fixture
+def booking_date():
+    """A date far enough ahead that no check treats it as past or today"""
+    return date.today() + timedelta(days=7)
+
+@pytest.fixture
+def booking_data(booking_date):
+    """Valid create_booking() input; tests override what they exercise"""
+    return {
+        'customer_name': 'Ada Lovelace',
+        'customer_phone': '+15551230001',
+        'party_size': 2,
+        'booking_date': booking_date,
+        'booking_time': '19:00',
+        'restaurant_id': 1
+    }
+
+# A call that books a table for four tomorrow at 6 pm, a time the mock Calendly offers
+CALL = ['my name is Sam', 'four people', 'tomorrow', '6 pm', 'yes']
+
+def place_call(client, call_sid, utterances, caller='+15551230001'):
+    """
+    Drive a Twilio call through the flow, one utterance per turn
+
+    Returns:
+        str: TwiML of the last response
+    """
+    params = {'CallSid': call_sid, 'From': caller}
+    body = client.post('/twilio/incoming-call', data=params).get_data(as_text=True)
+    for speech in utterances:
+        action = GATHER_ACTION_RE.search(body)
+        assert action, f"call ended before {speech!r}: {body}"
+        body = client.post(action.group(1).replace('&amp;', '&'),
+                           data=dict(params, SpeechResult=speech)).get_data(as_text=True)
+    return body
@@ -0,0 +1,29 @@
+from services.availability_service import get_availability_cache_stats, get_open_slots, get_slots
+from services.booking_service import BOOKING_CREATED, bulk_update_status, create_booking
+
+def open_times(booking_date, party_size):
+    return {slot['time'] for slot in get_open_slots(1, booking_date, party_size)}
+
+def test_full_slot_is_not_offered_from_a_warm_cache(app, booking_data, booking_date):
+    get_slots(1, booking_date)
+    assert '18:00' in open_times(booking_date, 4)
+
+    # The default restaurant seats 100
+    result = create_booking(dict(booking_data, party_size=50, booking_time='18:00'))
+    assert result.code == BOOKING_CREATED
+    result = create_booking(dict(booking_data, customer_phone='+15551230002', party_size=48,
+                                 booking_time='18:00'))
+    assert result.code == BOOKING_CREATED
+
+    assert get_availability_cache_stats()['hits'] > 0
+    assert '18:00' not in open_times(booking_date, 4)
+    assert '18:00' in open_times(booking_date, 2)
+
+def test_canceled_seats_are_offered_again(app, booking_data, booking_date):
+    big = create_booking(dict(booking_data, party_size=50, booking_time='18:00'))
+    create_booking(dict(booking_data, customer_phone='+15551230002', party_size=50, booking_time='18:00'))
+    assert '18:00' not in open_times(booking_date, 4)
+
+    bulk_update_status('canceled', [big.booking.id])
+
+    assert '18:00' in open_times(booking_date, 4)
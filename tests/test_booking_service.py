@@ -0,0 +1,238 @@
+import json
+import sqlite3
+
+import pytest
+
+from app import db
+from models import AuditLog, Booking, SlotOccupancy
+from services import booking_service
+from services.audit_service import log_action
+from services.booking_service import (BOOKING_CREATED, BOOKING_DUPLICATE, BOOKING_ERROR, BOOKING_INVALID,
+                                      BOOKING_UNAVAILABLE, BOOKING_UPDATED, bulk_update_status, create_booking,
+                                      find_duplicate_booking, update_booking_status)
+from services.unit_of_work import unit_of_work
+
+def test_same_phone_at_overlapping_time_is_duplicate(app, booking_data):
+    first = create_booking(dict(booking_data, customer_phone='(555) 123-0001'))
+    assert first.code == BOOKING_CREATED
+    assert first.booking.customer_phone == '+15551230001'
+
+    again = create_booking(dict(booking_data, booking_time='19:30'))
+    assert again.code == BOOKING_DUPLICATE
+    assert not again.success
+    assert again.booking.id == first.booking.id
+    assert Booking.query.count() == 1
+
+def test_same_phone_at_separate_time_is_booked(app, booking_data):
+    create_booking(booking_data)
+    later = create_booking(dict(booking_data, booking_time='20:00'))
+    assert later.code == BOOKING_CREATED
+
+def other_connection():
+    """A second connection to the database, giving up at once if it is locked"""
+    return sqlite3.connect(db.engine.url.database, timeout=0.1)
+
+def assert_not_locked():
+    with other_connection() as connection:
+        connection.execute("UPDATE restaurant SET capacity = capacity")
+
+def test_duplicate_takes_no_seats(app, booking_data):
+    create_booking(booking_data)
+    covers = [row.covers for row in SlotOccupancy.query.order_by(SlotOccupancy.bucket)]
+
+    assert create_booking(dict(booking_data, booking_time='19:15')).code == BOOKING_DUPLICATE
+    assert_not_locked()
+    assert [row.covers for row in SlotOccupancy.query.order_by(SlotOccupancy.bucket)] == covers
+
+def test_duplicate_made_while_reserving_is_rolled_back(app, booking_data, monkeypatch):
+    has_room = booking_service.has_room
+
+    def has_room_then_redial(*args):
+        # The same caller's other call books between the duplicate check and the seat counters
+        with other_connection() as connection:
+            connection.execute(
+                "INSERT INTO booking (restaurant_id, customer_name, customer_phone, party_size, booking_date, "
+                "booking_time, status) VALUES (1, 'Ada Lovelace', '+15551230001', 2, ?, '19:00', 'confirmed')",
+                (booking_data['booking_date'].isoformat(),)
+            )
+        return has_room(*args)
+    monkeypatch.setattr(booking_service, 'has_room', has_room_then_redial)
+
+    result = create_booking(dict(booking_data, booking_time='19:30'))
+
+    assert result.code == BOOKING_DUPLICATE
+    assert_not_locked()
+    assert SlotOccupancy.query.filter(SlotOccupancy.covers != 0).count() == 0
+
+def test_duplicate_made_while_reserving_keeps_callers_unit_of_work(app, booking_data, monkeypatch):
+    has_room = booking_service.has_room
+
+    def has_room_then_book(*args):
+        db.session.add(Booking(restaurant_id=1, customer_name='Ada Lovelace', customer_phone='+15551230001',
+                               party_size=2, booking_date=booking_data['booking_date'], booking_time='19:00',
+                               status='confirmed'))
+        db.session.flush()
+        return has_room(*args)
+    monkeypatch.setattr(booking_service, 'has_room', has_room_then_book)
+
+    with unit_of_work():
+        log_action('call_turn', 'call', None, "Earlier work in the same turn")
+        result = create_booking(dict(booking_data, booking_time='19:30'))
+
+    assert result.code == BOOKING_DUPLICATE
+    assert AuditLog.query.filter_by(action='call_turn').count() == 1
+    assert SlotOccupancy.query.filter(SlotOccupancy.covers != 0).count() == 0
+
+def test_failed_booking_keeps_callers_unit_of_work(app, booking_data, monkeypatch):
+    def failing_log_action(action, *args):
+        if action == 'create_booking':
+            raise RuntimeError("audit log unavailable")
+        return log_action(action, *args)
+    monkeypatch.setattr(booking_service, 'log_action', failing_log_action)
+
+    with unit_of_work():
+        log_action('call_turn', 'call', None, "Earlier work in the same turn")
+        result = create_booking(booking_data)
+
+    assert result.code == BOOKING_ERROR
+    assert AuditLog.query.filter_by(action='call_turn').count() == 1
+    assert Booking.query.count() == 0
+    assert SlotOccupancy.query.filter(SlotOccupancy.covers != 0).count() == 0
+
+@pytest.mark.parametrize('phone', ['anonymous', '', '+266696687'])
+def test_withheld_numbers_are_never_duplicates(app, booking_data, phone):
+    first = create_booking(dict(booking_data, customer_phone=phone))
+    second = create_booking(dict(booking_data, customer_phone=phone, customer_name='Someone Else'))
+
+    assert first.code == BOOKING_CREATED
+    assert second.code == BOOKING_CREATED
+    assert find_duplicate_booking(1, phone, booking_data['booking_date'], '19:00') is None
+
+@pytest.mark.parametrize('party_size', [-3, 0, 51, '4'])
+def test_invalid_party_size_is_rejected(app, booking_data, party_size):
+    result = create_booking(dict(booking_data, party_size=party_size))
+
+    assert result.code == BOOKING_INVALID
+    assert Booking.query.count() == 0
+    assert SlotOccupancy.query.filter(SlotOccupancy.covers != 0).count() == 0
+
+@pytest.mark.parametrize('booking_time', ['25:99', '7pm', '19', ''])
+def test_invalid_time_is_rejected(app, booking_data, booking_time):
+    result = create_booking(dict(booking_data, booking_time=booking_time))
+
+    assert result.code == BOOKING_INVALID
+    assert Booking.query.count() == 0
+
+def test_time_is_stored_zero_padded(app, booking_data):
+    result = create_booking(dict(booking_data, booking_time='9:30'))
+    assert result.booking.booking_time == '09:30'
+
+def test_create_route_rejects_spoken_time(client, booking_date):
+    response = client.post('/booking/create', data={
+        'customer_name': 'Ada Lovelace', 'customer_phone': '+15551230001', 'party_size': '2',
+        'booking_date': booking_date.isoformat(), 'booking_time': '7pm'
+    })
+
+    assert response.status_code == 400
+    assert response.get_json()['code'] == BOOKING_INVALID
+
+def bulk_audit_rows():
+    return [json.loads(row.data) for row in AuditLog.query.filter_by(action='update_booking_status_canceled')]
+
+def test_bulk_update_audits_each_changed_booking(app, booking_data):
+    ids = [create_booking(dict(booking_data, customer_phone=f'+1555123000{n}')).booking.id for n in range(1, 4)]
+    assert bulk_update_status('canceled', ids[:1])[:2] == (1, True)
+
+    # The booking canceled first is left alone, and not audited again
+    updated, success, _, _ = bulk_update_status('canceled', ids)
+
+    assert (updated, success) == (2, True)
+    rows = bulk_audit_rows()
+    assert sorted(row['booking_id'] for row in rows) == ids
+    assert all(row['bulk'] and (row['old_status'], row['new_status']) == ('confirmed', 'canceled') for row in rows)
+    assert SlotOccupancy.query.filter(SlotOccupancy.covers != 0).count() == 0
+
+def test_bulk_update_by_filter_only_touches_matching_status(app, booking_data):
+    kept = create_booking(booking_data).booking.id
+    no_show = create_booking(dict(booking_data, customer_phone='+15551230002')).booking.id
+    bulk_update_status('no_show', [no_show])
+
+    filters = {'restaurant_id': 1, 'status': 'no_show', 'booking_date': booking_data['booking_date']}
+    updated, success, _, _ = bulk_update_status('canceled', filters=filters)
+
+    assert (updated, success) == (1, True)
+    assert [row['booking_id'] for row in bulk_audit_rows()] == [no_show]
+    assert db.session.get(Booking, kept).status == 'confirmed'
+
+def test_bulk_update_rejects_unknown_status(app, booking_data):
+    booking_id = create_booking(booking_data).booking.id
+
+    assert bulk_update_status('seated', [booking_id])[:2] == (0, False)
+    assert bulk_audit_rows() == []
+
+def covers():
+    return [row.covers for row in SlotOccupancy.query.order_by(SlotOccupancy.bucket)]
+
+def test_confirming_again_takes_the_seats_back(app, booking_data):
+    booking = create_booking(booking_data).booking
+    taken = covers()
+    update_booking_status(booking, 'canceled')
+
+    assert update_booking_status(booking, 'confirmed')[::2] == (True, BOOKING_UPDATED)
+    assert covers() == taken
+
+def test_confirming_again_is_refused_once_the_seats_are_gone(app, booking_data):
+    # The default restaurant seats 100
+    booking = create_booking(dict(booking_data, party_size=50)).booking
+    update_booking_status(booking, 'canceled')
+    create_booking(dict(booking_data, customer_phone='+15551230002', party_size=50))
+    create_booking(dict(booking_data, customer_phone='+15551230003', party_size=10))
+    taken = covers()
+
+    success, _, code = update_booking_status(booking, 'confirmed')
+
+    assert (success, code) == (False, BOOKING_UNAVAILABLE)
+    assert db.session.get(Booking, booking.id).status == 'canceled'
+    assert covers() == taken
+
+def test_confirming_again_is_refused_once_the_guest_has_rebooked(app, booking_data):
+    booking = create_booking(booking_data).booking
+    update_booking_status(booking, 'no_show')
+    create_booking(dict(booking_data, booking_time='19:30'))
+    taken = covers()
+
+    success, _, code = update_booking_status(booking, 'confirmed')
+
+    assert (success, code) == (False, BOOKING_DUPLICATE)
+    assert db.session.get(Booking, booking.id).status == 'no_show'
+    assert covers() == taken
+
+def test_confirm_route_refuses_a_full_slot_with_409(client, booking_data):
+    booking_id = create_booking(dict(booking_data, party_size=50)).booking.id
+    client.post(f'/booking/cancel/{booking_id}')
+    create_booking(dict(booking_data, customer_phone='+15551230002', party_size=50))
+    create_booking(dict(booking_data, customer_phone='+15551230003', party_size=10))
+
+    response = client.post(f'/booking/confirm/{booking_id}')
+
+    assert response.status_code == 409
+    assert response.get_json()['code'] == BOOKING_UNAVAILABLE
+
+def test_bulk_confirm_admits_each_booking_and_reports_the_rest(app, booking_data):
+    sizes = {'+15551230001': 50, '+15551230002': 30, '+15551230003': 15}
+    ids = [create_booking(dict(booking_data, customer_phone=phone, party_size=size)).booking.id
+           for phone, size in sizes.items()]
+    bulk_update_status('canceled', ids)
+    # The first guest booked again at an overlapping time, so only one of theirs can stand
+    ids.append(create_booking(dict(booking_data, booking_time='19:30')).booking.id)
+    bulk_update_status('canceled', ids[3:])
+    create_booking(dict(booking_data, customer_phone='+15551230004', party_size=10))
+
+    updated, success, _, rejected = bulk_update_status('confirmed', ids)
+
+    assert (updated, success) == (2, True)
+    assert [(row['booking_id'], row['code']) for row in rejected] == [(ids[2], BOOKING_UNAVAILABLE),
+                                                                      (ids[3], BOOKING_DUPLICATE)]
+    assert [db.session.get(Booking, booking_id).status for booking_id in ids] == [
+        'confirmed', 'confirmed', 'canceled', 'canceled']
+    assert max(covers()) == 90
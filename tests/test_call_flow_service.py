@@ -0,0 +1,45 @@
+from conftest import CALL, place_call
+from models import Booking, CallStageStat, SlotHold
+from services.call_flow_service import BOOKING_CONFIRMED_MESSAGE, PARTY_SIZE_QUESTION
+
+def confirmation_stats():
+    return CallStageStat.query.filter_by(stage='confirmation').one()
+
+def test_confirmed_call_counts_as_completion(client):
+    body = place_call(client, 'CA-first', CALL)
+
+    assert BOOKING_CONFIRMED_MESSAGE in body
+    stats = confirmation_stats()
+    assert (stats.completions, stats.duplicates) == (1, 0)
+
+def test_redial_after_booking_counts_as_duplicate(client):
+    place_call(client, 'CA-first', CALL)
+    body = place_call(client, 'CA-redial', CALL)
+
+    assert 'already have a table for 4' in body
+    assert Booking.query.count() == 1
+    stats = confirmation_stats()
+    assert (stats.completions, stats.duplicates, stats.abandonments) == (1, 1, 0)
+
+def test_time_at_party_size_prompt_is_not_a_party_size(client):
+    body = place_call(client, 'CA-time', ['my name is Sam', 'tomorrow at 7:30 please'])
+
+    assert PARTY_SIZE_QUESTION in body
+    assert SlotHold.query.count() == 0
+
+def test_large_party_is_read_back_before_holding(client):
+    body = place_call(client, 'CA-large', ['my name is Sam', '14 people', 'tomorrow', '6 pm'])
+
+    assert "that's a table for 14 people?" in body
+    assert SlotHold.query.count() == 0
+
+    body = place_call(client, 'CA-large', ['my name is Sam', '14 people', 'tomorrow', '6 pm', 'yes'])
+
+    assert 'Is this correct' in body
+    assert [hold.party_size for hold in SlotHold.query] == [14]
+
+def test_large_party_can_be_corrected(client):
+    body = place_call(client, 'CA-fewer', ['my name is Sam', 'table for 30 tomorrow at 6 pm', 'no, five'])
+
+    assert 'table for 5' in body
+    assert [hold.party_size for hold in SlotHold.query] == [5]
@@ -0,0 +1,60 @@
+from conftest import CALL, place_call
+from sqlalchemy import text
+
+from app import db
+from models import Booking, SlotOccupancy, VoiceInteraction
+from services import call_session_service
+from services.call_flow_service import BOOKING_CONFIRMED_MESSAGE
+from services.call_session_service import get_call_session_store, load_call_state
+from services.unit_of_work import COMMIT_COUNT_HEADER
+
+def test_confirmed_booking_survives_failed_state_delete(client, monkeypatch):
+    store = get_call_session_store()
+
+    def unavailable(call_sid):
+        raise ConnectionError('session store unavailable')
+    monkeypatch.setattr(store, 'delete', unavailable)
+
+    body = place_call(client, 'CA-store-down', CALL)
+
+    assert BOOKING_CONFIRMED_MESSAGE in body
+    assert Booking.query.count() == 1
+    assert VoiceInteraction.query.count() > 0
+
+def test_failed_state_save_outside_a_turn_resets_session(app, monkeypatch):
+    from services.call_session_service import save_call_state
+
+    store = get_call_session_store()
+
+    def unavailable(call_sid, state):
+        raise ConnectionError('session store unavailable')
+    monkeypatch.setattr(store, 'set', unavailable)
+
+    assert save_call_state('CA-1', {'stage': 'name'}) is False
+    assert not db.session().in_transaction()
+
+def test_failed_sql_state_save_keeps_the_rest_of_the_turn(client, monkeypatch):
+    place_call(client, 'CA-flush', ['my name is Sam'])
+    # A NULL state breaks the NOT NULL constraint when the store's write is flushed
+    monkeypatch.setattr(call_session_service, 'encode_state', lambda state: None)
+
+    response = client.post('/twilio/turn', data={'CallSid': 'CA-flush', 'From': '+15551230001',
+                                                 'SpeechResult': 'four people'})
+
+    assert response.status_code == 200
+    assert response.headers[COMMIT_COUNT_HEADER] == '1'
+    assert VoiceInteraction.query.count() == 2
+    assert load_call_state('CA-flush')['stage'] == 'party_size'
+
+def test_confirmed_booking_survives_failed_sql_state_delete(client, monkeypatch):
+    store = get_call_session_store()
+
+    def failing_delete(call_sid):
+        db.session.execute(text("INSERT INTO call_session (call_sid) VALUES (:call_sid)"), {'call_sid': call_sid})
+    monkeypatch.setattr(store, 'delete', failing_delete)
+
+    body = place_call(client, 'CA-sql-down', CALL)
+
+    assert BOOKING_CONFIRMED_MESSAGE in body
+    assert Booking.query.count() == 1
+    assert SlotOccupancy.query.filter(SlotOccupancy.covers != 0).count() > 0
@@ -0,0 +1,42 @@
+from conftest import CALL, GATHER_ACTION_RE
+from models import Booking, IdempotencyRecord
+from services.idempotency_service import REPLAYED_HEADER
+from services.unit_of_work import COMMIT_COUNT_HEADER
+
+def post_turn(client, url, params, token):
+    return client.post(url, data=params, headers={'I-Twilio-Idempotency-Token': token})
+
+def test_each_webhook_turn_is_one_commit(client):
+    params = {'CallSid': 'CA-idem', 'From': '+15551230001'}
+    response = post_turn(client, '/twilio/incoming-call', params, 'token-0')
+    assert response.headers[COMMIT_COUNT_HEADER] == '1'
+
+    for number, speech in enumerate(CALL, start=1):
+        action = GATHER_ACTION_RE.search(response.get_data(as_text=True)).group(1).replace('&amp;', '&')
+        response = post_turn(client, action, dict(params, SpeechResult=speech), f'token-{number}')
+        assert response.headers[COMMIT_COUNT_HEADER] == '1', speech
+
+    assert Booking.query.count() == 1
+    assert IdempotencyRecord.query.filter(IdempotencyRecord.status_code.is_(None)).count() == 0
+
+def test_retried_turn_replays_stored_response(client):
+    params = {'CallSid': 'CA-retry', 'From': '+15551230001'}
+    first = post_turn(client, '/twilio/incoming-call', params, 'token-0')
+    retry = post_turn(client, '/twilio/incoming-call', params, 'token-0')
+
+    assert retry.headers[REPLAYED_HEADER] == 'true'
+    assert retry.headers[COMMIT_COUNT_HEADER] == '0'
+    assert retry.get_data() == first.get_data()
+
+def test_rejected_booking_is_not_replayed(client, booking_date):
+    form = {'customer_name': 'Ada Lovelace', 'customer_phone': '+15551230001', 'party_size': '0',
+            'booking_date': booking_date.isoformat(), 'booking_time': '18:00'}
+    headers = {'Idempotency-Key': 'form-1'}
+
+    assert client.post('/booking/create', data=form, headers=headers).status_code == 400
+    assert IdempotencyRecord.query.count() == 0
+
+    response = client.post('/booking/create', data=dict(form, party_size='2'), headers=headers)
+    assert response.status_code == 200
+    assert REPLAYED_HEADER not in response.headers
+    assert response.headers[COMMIT_COUNT_HEADER] == '1'
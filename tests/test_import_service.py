@@ -0,0 +1,34 @@
+import io
+
+from app import db
+from services import search_service
+from services.booking_service import create_booking
+from services.import_service import import_bookings
+from services.search_service import search_bookings
+
+def csv_stream(booking_date, names):
+    lines = ['customer_name,customer_phone,party_size,booking_date,booking_time,status']
+    lines += [f"{name},+1555987{index:04d},2,{booking_date.isoformat()},18:00,completed"
+              for index, name in enumerate(names)]
+    return io.StringIO('\n'.join(lines) + '\n')
+
+def found(query):
+    return [hit.booking.customer_name for hit in search_bookings(query)]
+
+def test_imported_bookings_are_searchable(app, booking_date):
+    assert search_service._backend == 'fts5'
+
+    result = import_bookings(csv_stream(booking_date, ['Grace Hopper', 'Alan Turing', 'Edsger Dijkstra']),
+                             batch_size=2)
+
+    assert result.imported == 3
+    assert found('hopp') == ['Grace Hopper']
+    assert found('dijkstra') == ['Edsger Dijkstra']
+    assert [hit.booking.customer_name for hit in search_bookings('9870001')] == ['Alan Turing']
+
+def test_bookings_after_an_import_are_indexed_by_trigger(app, booking_data, booking_date):
+    import_bookings(csv_stream(booking_date, ['Grace Hopper']))
+    create_booking(dict(booking_data, customer_name='Barbara Liskov'))
+
+    assert found('liskov') == ['Barbara Liskov']
+    assert db.session.execute(db.text("SELECT count(*) FROM booking_search_paused")).scalar() == 0
@@ -0,0 +1,39 @@
+from app import db
+from models import SlotOccupancy
+from services.occupancy_service import release_covers, reserve_covers
+
+CAPACITY = 10
+
+def counters(booking_date):
+    rows = SlotOccupancy.query.filter_by(restaurant_id=1, booking_date=booking_date)
+    return {row.bucket: row.covers for row in rows if row.covers}
+
+def test_reserve_takes_every_bucket_of_the_booking(app, booking_date):
+    assert reserve_covers(1, booking_date, '19:00', 4, CAPACITY)
+    db.session.commit()
+
+    # 19:00 is bucket 76; a 60-minute booking spans four quarter hours
+    assert counters(booking_date) == {76: 4, 77: 4, 78: 4, 79: 4}
+
+def test_reserve_is_all_or_nothing(app, booking_date):
+    assert reserve_covers(1, booking_date, '19:45', 8, CAPACITY)
+    db.session.commit()
+    before = counters(booking_date)
+
+    # Buckets 76-78 have room, 79 (19:45) doesn't
+    assert not reserve_covers(1, booking_date, '19:00', 4, CAPACITY)
+    db.session.commit()
+    assert counters(booking_date) == before
+
+def test_release_gives_back_what_reserve_took(app, booking_date):
+    assert reserve_covers(1, booking_date, '19:00', 4, CAPACITY)
+    assert reserve_covers(1, booking_date, '19:30', 3, CAPACITY)
+    release_covers(1, booking_date, '19:00', 4)
+    db.session.commit()
+
+    assert counters(booking_date) == {78: 3, 79: 3, 80: 3, 81: 3}
+
+def test_time_past_the_end_of_the_day_takes_no_seats(app, booking_date):
+    assert not reserve_covers(1, booking_date, '25:99', 4, CAPACITY)
+    db.session.commit()
+    assert counters(booking_date) == {}
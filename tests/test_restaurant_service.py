@@ -0,0 +1,61 @@
+import time
+
+import pytest
+
+from app import db
+from models import AuditLog, Restaurant
+from services import restaurant_service
+from services.booking_service import create_booking
+from services.restaurant_service import get_restaurant_config, invalidate_restaurant_config, update_restaurant
+
+def test_config_change_is_used_once_cached_entry_expires(app, monkeypatch):
+    assert get_restaurant_config(1).capacity == 100
+
+    db.session.get(Restaurant, 1).capacity = 40
+    db.session.commit()
+    assert get_restaurant_config(1).capacity == 100
+
+    later = time.monotonic() + app.config['RESTAURANT_CONFIG_TTL'] + 1
+    monkeypatch.setattr(restaurant_service.time, 'monotonic', lambda: later)
+    assert get_restaurant_config(1).capacity == 40
+
+def test_hours_are_minutes_past_midnight(app):
+    config = get_restaurant_config(1)
+    assert (config.opening_minute, config.closing_minute) == (11 * 60, 22 * 60)
+    assert config.is_open_at(22 * 60)
+    assert not config.is_open_at(22 * 60 + 15)
+
+def test_update_is_used_at_once(app):
+    assert get_restaurant_config(1).capacity == 100
+
+    restaurant, success, _ = update_restaurant(1, closing_time='23:30', capacity=40)
+
+    assert success
+    config = get_restaurant_config(1)
+    assert (config.capacity, config.closing_time) == (40, '23:30')
+    assert AuditLog.query.filter_by(action='update_restaurant').count() == 1
+
+def test_full_slot_admits_after_capacity_is_raised(app, booking_data):
+    update_restaurant(1, capacity=2)
+    assert create_booking(booking_data).success
+    assert not create_booking(dict(booking_data, customer_phone='+15551230002')).success
+
+    update_restaurant(1, capacity=4)
+    assert create_booking(dict(booking_data, customer_phone='+15551230002')).success
+
+@pytest.mark.parametrize('changes', [{'opening_time': '9am'}, {'closing_time': '24:00'}, {'capacity': 0}])
+def test_invalid_update_is_rejected(app, changes):
+    restaurant, success, _ = update_restaurant(1, **changes)
+
+    assert not success
+    assert get_restaurant_config(1).capacity == 100
+    assert db.session.get(Restaurant, 1).opening_time == '11:00'
+
+def test_invalidating_every_restaurant_drops_cached_entries(app):
+    assert get_restaurant_config(1).capacity == 100
+    db.session.get(Restaurant, 1).capacity = 40
+    db.session.commit()
+
+    invalidate_restaurant_config()
+
+    assert get_restaurant_config(1).capacity == 40
@@ -0,0 +1,52 @@
+import csv
+import io
+from datetime import timedelta
+
+import pytest
+
+from services import search_service
+from services.import_service import import_bookings
+from services.search_service import SEARCH_CANDIDATES
+
+def import_guests(booking_date, rows):
+    """Import (name, phone, days after booking_date) rows, oldest first"""
+    lines = ['customer_name,customer_phone,party_size,booking_date,booking_time,status']
+    lines += [f"{name},{phone},2,{(booking_date + timedelta(days=days)).isoformat()},18:00,completed"
+              for name, phone, days in rows]
+    import_bookings(io.StringIO('\n'.join(lines) + '\n'))
+
+def exported_ids(client, **params):
+    body = client.get('/dashboard/export-csv', query_string=params).get_data(as_text=True)
+    return [int(row[0]) for row in list(csv.reader(io.StringIO(body)))[1:]]
+
+def test_date_filter_sees_matches_beyond_the_ranked_candidates(client, booking_date):
+    # The guest's oldest bookings fall outside the newest SEARCH_CANDIDATES matches
+    rows = [('Grace Hopper', f'+1555987{index:04d}', 0) for index in range(10)]
+    rows += [('Grace Hopper', f'+1555988{index:04d}', 1) for index in range(SEARCH_CANDIDATES)]
+    import_guests(booking_date, rows)
+
+    day = booking_date.isoformat()
+    assert len(exported_ids(client, q='hopper', start_date=day, end_date=day)) == 10
+    assert len(exported_ids(client, q='hopper')) == SEARCH_CANDIDATES + 10
+
+@pytest.mark.parametrize('backend', ['fts5', 'like'])
+def test_export_matches_every_word_and_phone(client, booking_date, monkeypatch, backend):
+    monkeypatch.setattr(search_service, '_backend', backend)
+    import_guests(booking_date, [('Grace Hopper', '+15559870001', 0), ('Grace Kelly', '+15559870002', 0),
+                                 ('Ada Lovelace', '+15559870003', 0)])
+
+    assert len(exported_ids(client, q='grace')) == 2
+    assert len(exported_ids(client, q='grace hop')) == 1
+    assert len(exported_ids(client, q='987-0003')) == 1
+    assert exported_ids(client, q='g') == []
+
+def test_misspelt_name_falls_back_to_fuzzy_matches(client, booking_date):
+    import_guests(booking_date, [('Ada Lovelace', '+15559870003', 0)])
+
+    assert len(exported_ids(client, q='lovelase')) == 1
+
+def test_search_stays_in_the_restaurant(client, booking_date):
+    import_guests(booking_date, [('Grace Hopper', '+15559870001', 0)])
+
+    assert len(exported_ids(client, q='hopper', restaurant_id=1)) == 1
+    assert exported_ids(client, q='hopper', restaurant_id=2) == []
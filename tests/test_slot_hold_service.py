@@ -0,0 +1,72 @@
+import threading
+from datetime import datetime
+
+from app import db
+from models import SlotHold, SlotOccupancy
+from services.booking_service import BOOKING_CREATED, BOOKING_UNAVAILABLE, create_booking
+from services.occupancy_service import reserve_covers
+from services.slot_hold_service import place_hold
+from services.unit_of_work import unit_of_work
+
+# The default restaurant seats 100
+CAPACITY = 100
+
+def seats_taken(booking_date):
+    """Covers booked plus covers held in each bucket of the day"""
+    taken = {row.bucket: row.covers for row in SlotOccupancy.query.filter_by(booking_date=booking_date)}
+    active = SlotHold.query.filter(SlotHold.booking_date == booking_date, SlotHold.expires_at > datetime.utcnow())
+    for hold in active:
+        # 19:00 is bucket 76; a 60-minute booking spans four quarter hours
+        for bucket in range(76, 80):
+            taken[bucket] = taken.get(bucket, 0) + hold.party_size
+    return taken
+
+def test_booking_counts_other_callers_holds(app, booking_data, booking_date):
+    with unit_of_work():
+        assert place_hold('CA-held', 1, booking_date, '19:00', 50)
+
+    assert not reserve_covers(1, booking_date, '19:00', 51, CAPACITY)
+    db.session.rollback()
+    assert create_booking(dict(booking_data, party_size=50)).code == BOOKING_CREATED
+    assert create_booking(dict(booking_data, customer_phone='+15551230002', party_size=1)).code == BOOKING_UNAVAILABLE
+
+def test_hold_is_refused_once_the_seats_are_booked(app, booking_data, booking_date):
+    create_booking(dict(booking_data, party_size=50))
+    create_booking(dict(booking_data, customer_phone='+15551230002', party_size=40))
+
+    with unit_of_work():
+        assert place_hold('CA-first', 1, booking_date, '19:00', 10)
+        assert place_hold('CA-second', 1, booking_date, '19:00', 1) is None
+
+    # A caller's own hold doesn't count against their next one or their booking
+    with unit_of_work():
+        assert place_hold('CA-first', 1, booking_date, '19:00', 10)
+    result = create_booking(dict(booking_data, customer_phone='+15551230003', party_size=10), call_sid='CA-first')
+    assert result.code == BOOKING_CREATED
+    assert SlotHold.query.count() == 0
+
+def test_parallel_holds_and_bookings_never_oversell(app, booking_data, booking_date):
+    callers = 16
+    barrier = threading.Barrier(callers)
+    outcomes = []
+
+    def call(number):
+        with app.app_context():
+            barrier.wait()
+            if number % 2:
+                with unit_of_work():
+                    admitted = place_hold(f'CA-{number}', 1, booking_date, '19:00', 10) is not None
+            else:
+                data = dict(booking_data, customer_phone=f'+155512300{number:02d}', party_size=10)
+                admitted = create_booking(data).code == BOOKING_CREATED
+            outcomes.append(admitted)
+            db.session.remove()
+
+    threads = [threading.Thread(target=call, args=(number,)) for number in range(callers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert outcomes.count(True) == CAPACITY // 10
+    assert max(seats_taken(booking_date).values()) == CAPACITY
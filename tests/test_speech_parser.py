@@ -0,0 +1,16 @@
+import pytest
+
+from utils.speech_parser import parse_party_size
+
+@pytest.mark.parametrize('speech', ['7:30', 'at 19:30', 'tomorrow at 7:30 please', 'around 7.30'])
+def test_minutes_of_a_time_are_not_a_party_size(speech):
+    assert parse_party_size(speech) is None
+
+@pytest.mark.parametrize('speech, size', [
+    ('4', 4),
+    ('four people at 7:30', 4),
+    ('table for 6 at 19:30', 6),
+    ('uh five', 5),
+])
+def test_party_size_next_to_a_time(speech, size):
+    assert parse_party_size(speech).value == size
@@ -0,0 +1,56 @@
+from datetime import datetime, time, timedelta
+
+import pytest
+
+from app import db
+from models import Booking
+from services import sweeper_service
+from services.booking_service import bulk_update_status, create_booking
+from services.sweeper_service import sweep_past_bookings
+
+def book(booking_data, phone, booking_time='19:00', **changes):
+    data = dict(booking_data, customer_phone=phone, booking_time=booking_time, **changes)
+    return create_booking(data).booking.id
+
+def statuses(*booking_ids):
+    return [db.session.get(Booking, booking_id).status for booking_id in booking_ids]
+
+def test_booking_is_completed_once_over_and_past_grace(app, booking_data, booking_date):
+    booking_id = book(booking_data, '+15551230001')
+    # Defaults: a 60-minute booking at 19:00 ends at 20:00, plus a 120-minute grace
+    over = datetime.combine(booking_date, time(22, 0))
+
+    assert sweep_past_bookings(now=over - timedelta(minutes=1)) == 0
+    assert statuses(booking_id) == ['confirmed']
+
+    assert sweep_past_bookings(now=over) == 1
+    assert statuses(booking_id) == ['completed']
+
+def test_only_confirmed_bookings_are_swept(app, booking_data, booking_date):
+    confirmed = book(booking_data, '+15551230001')
+    canceled = book(booking_data, '+15551230002')
+    no_show = book(booking_data, '+15551230003')
+    tomorrow = book(booking_data, '+15551230004', booking_date=booking_date + timedelta(days=1))
+    bulk_update_status('canceled', [canceled])
+    bulk_update_status('no_show', [no_show])
+
+    swept = sweep_past_bookings(now=datetime.combine(booking_date, time(23, 0)))
+
+    assert swept == 1
+    assert statuses(confirmed, canceled, no_show, tomorrow) == ['completed', 'canceled', 'no_show', 'confirmed']
+
+def test_sweep_runs_in_batches(app, booking_data, booking_date, monkeypatch):
+    monkeypatch.setitem(app.config, 'BOOKING_SWEEP_BATCH_SIZE', 2)
+    monkeypatch.setattr(sweeper_service, 'BATCH_PAUSE_SECONDS', 0)
+    booking_ids = [book(booking_data, f'+1555123000{n}', f'1{n}:00') for n in range(1, 6)]
+
+    assert sweep_past_bookings(now=datetime.combine(booking_date, time(23, 0))) == 5
+    assert set(statuses(*booking_ids)) == {'completed'}
+
+@pytest.mark.parametrize('days_later', [2, 30])
+def test_earlier_days_are_swept_whatever_the_time(app, booking_data, booking_date, days_later):
+    booking_id = book(booking_data, '+15551230001', '23:00')
+
+    sweep_past_bookings(now=datetime.combine(booking_date + timedelta(days=days_later), time(0, 30)))
+
+    assert statuses(booking_id) == ['completed']
@@ -0,0 +1,35 @@
+import pytest
+
+from models import WaitlistEntry
+from services.waitlist_service import join_waitlist
+
+@pytest.mark.parametrize('party_size', [0, -2, 51, '4'])
+def test_invalid_party_size_is_not_waitlisted(app, booking_data, party_size):
+    entry, success, message = join_waitlist(dict(booking_data, party_size=party_size))
+
+    assert (entry, success) == (None, False)
+    assert message == "Party size must be between 1 and 50"
+    assert WaitlistEntry.query.count() == 0
+
+@pytest.mark.parametrize('booking_time', ['7pm', '25:00', '19:5', ''])
+def test_invalid_time_is_not_waitlisted(app, booking_data, booking_time):
+    entry, success, message = join_waitlist(dict(booking_data, booking_time=booking_time))
+
+    assert (entry, success) == (None, False)
+    assert message == "Booking time must be HH:MM"
+    assert WaitlistEntry.query.count() == 0
+
+def test_waitlist_time_is_stored_zero_padded(app, booking_data):
+    entry, success, _ = join_waitlist(dict(booking_data, booking_time='9:30'))
+
+    assert success
+    assert entry.booking_time == '09:30'
+
+def test_waitlist_route_rejects_bad_party_size_with_400(client, booking_date):
+    response = client.post('/booking/waitlist', data={
+        'customer_name': 'Ada Lovelace', 'customer_phone': '+15551230001', 'party_size': '500',
+        'booking_date': booking_date.isoformat(), 'booking_time': '19:00'
+    })
+
+    assert response.status_code == 400
+    assert response.get_json()['message'] == "Party size must be between 1 and 50"
@@ -0,0 +1,74 @@
+"""
+Portable INSERT ... ON CONFLICT statements.
+
+PostgreSQL and SQLite both support ON CONFLICT, but SQLAlchemy only exposes
+it through their dialect-specific insert() constructs. These helpers pick
+the right one for the bound engine and fall back to read-then-write on
+other databases.
+"""
+from sqlalchemy import insert
+from app import db
+
+def _dialect_insert():
+    """The ON CONFLICT capable insert() for the current database, or None"""
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        return dialect_insert
+    if dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        return dialect_insert
+    return None
+
+def insert_ignore(model, values, conflict_columns):
+    """
+    Insert rows unless ones with the same unique key exist
+
+    Args:
+        model: Mapped class
+        values (dict | list): Column values, or a list of them for several rows
+        conflict_columns (list): Columns of the unique key
+
+    Returns:
+        bool: True if any row was inserted
+    """
+    dialect_insert = _dialect_insert()
+    if dialect_insert is None:
+        # A concurrent insert surfaces as IntegrityError on commit
+        db.session.execute(insert(model).values(values))
+        return True
+    result = db.session.execute(
+        dialect_insert(model).values(values).on_conflict_do_nothing(index_elements=conflict_columns)
+    )
+    return result.rowcount > 0
+
+def upsert_add(model, rows, key_columns, counter_columns):
+    """
+    Add to counter columns, creating rows that don't exist yet, in one statement
+
+    Args:
+        model: Mapped class
+        rows (list): Dicts with every key and counter column
+        key_columns (list): Primary key columns
+        counter_columns (list): Columns incremented by the row's value
+    """
+    if not rows:
+        return
+
+    dialect_insert = _dialect_insert()
+    if dialect_insert is None:
+        for row in rows:
+            existing = db.session.get(model, tuple(row[column] for column in key_columns))
+            if existing is None:
+                db.session.add(model(**row))
+                continue
+            for column in counter_columns:
+                setattr(existing, column, (getattr(existing, column) or 0) + row[column])
+        return
+
+    statement = dialect_insert(model).values(rows)
+    statement = statement.on_conflict_do_update(
+        index_elements=key_columns,
+        set_={column: getattr(model, column) + getattr(statement.excluded, column) for column in counter_columns}
+    )
+    db.session.execute(statement)
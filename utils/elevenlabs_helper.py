@@ -2,13 +2,15 @@ import os
 import requests
 from flask import current_app
 
-def text_to_speech(text, voice_id="EXAVITQu4vr4xnSDxMaL"):
+def text_to_speech(text, voice_id="EXAVITQu4vr4xnSDxMaL", output_format=None):
     """
     Convert text to speech using ElevenLabs API
     
     Args:
         text (str): Text to convert to speech
         voice_id (str, optional): ID of the voice to use
+        output_format (str, optional): ElevenLabs output format, e.g. 'ulaw_8000'
+            for Twilio Media Streams; MP3 when omitted
         
     Returns:
         bytes: Audio data as bytes
@@ -44,8 +46,13 @@ def text_to_speech(text, voice_id="EXAVITQu4vr4xnSDxMaL"):
             }
         }
         
+        params = {}
+        if output_format:
+            params["output_format"] = output_format
+            headers["Accept"] = "*/*"
+        
         # Make request to ElevenLabs API
-        response = requests.post(url, json=data, headers=headers)
+        response = requests.post(url, json=data, headers=headers, params=params)
         
         if response.status_code == 200:
             return response.content
@@ -0,0 +1,87 @@
+"""
+G.711 mu-law audio as used by Twilio Media Streams (8 kHz, mono).
+
+Decoding goes through two 256-entry byte tables (low and high byte of the
+16-bit sample) so a whole frame is converted with bytes.translate() rather
+than a Python loop. This replaces the audioop module, which is deprecated
+and removed in Python 3.13.
+"""
+from array import array
+
+SAMPLE_RATE = 8000
+BYTES_PER_MS = SAMPLE_RATE // 1000
+
+MULAW_BIAS = 0x84
+MULAW_CLIP = 32635
+
+# Encoded byte for a silent sample
+MULAW_SILENCE = 0xFF
+
+def _decode_sample(byte):
+    byte = ~byte & 0xFF
+    exponent = (byte >> 4) & 0x07
+    sample = ((((byte & 0x0F) << 3) + MULAW_BIAS) << exponent) - MULAW_BIAS
+    return -sample if byte & 0x80 else sample
+
+def _encode_sample(sample):
+    sign = 0x80 if sample < 0 else 0
+    sample = min(abs(sample), MULAW_CLIP) + MULAW_BIAS
+    exponent = 7
+    for exponent in range(7, -1, -1):
+        if sample & (0x4000 >> (7 - exponent)):
+            break
+    mantissa = (sample >> (exponent + 3)) & 0x0F
+    return ~(sign | (exponent << 4) | mantissa) & 0xFF
+
+MULAW_TO_PCM = array('h', [_decode_sample(byte) for byte in range(256)])
+
+# Absolute amplitude per encoded byte, for level detection without decoding
+MULAW_MAGNITUDE = [abs(sample) for sample in MULAW_TO_PCM]
+
+_LOW_BYTES = bytes(sample & 0xFF for sample in MULAW_TO_PCM)
+_HIGH_BYTES = bytes((sample >> 8) & 0xFF for sample in MULAW_TO_PCM)
+
+# Indexed by (sample >> 2) + 8192; the low two bits never change the code
+_PCM_TO_MULAW = bytes(_encode_sample(value << 2) for value in range(-8192, 8192))
+
+def decode_mulaw(data):
+    """
+    Decode mu-law bytes to 16-bit little-endian PCM
+
+    Args:
+        data (bytes): mu-law encoded audio
+
+    Returns:
+        bytes: PCM audio, two bytes per sample
+    """
+    pcm = bytearray(len(data) * 2)
+    pcm[0::2] = data.translate(_LOW_BYTES)
+    pcm[1::2] = data.translate(_HIGH_BYTES)
+    return bytes(pcm)
+
+def encode_mulaw(samples):
+    """
+    Encode 16-bit samples as mu-law
+
+    Args:
+        samples (iterable): Integer samples in the range -32768..32767
+
+    Returns:
+        bytes: mu-law encoded audio
+    """
+    table = _PCM_TO_MULAW
+    return bytes([table[(sample >> 2) + 8192] for sample in samples])
+
+def mean_amplitude(data):
+    """
+    Average absolute sample value of a mu-law frame
+
+    Args:
+        data (bytes): mu-law encoded audio
+
+    Returns:
+        float: Mean amplitude on the 16-bit PCM scale, 0 for an empty frame
+    """
+    if not data:
+        return 0.0
+    return sum(map(MULAW_MAGNITUDE.__getitem__, data)) / len(data)
@@ -0,0 +1,523 @@
+"""
+Utterance parsing for booking details (party size, date, time, name, yes/no).
+
+Every pattern and lookup table is built once at import time; the parse
+functions only tokenize and do dict/set lookups, so a call costs a few
+microseconds. Run benchmarks/bench_speech_parser.py after changing them.
+"""
+import re
+from datetime import date, timedelta
+from typing import Any, NamedTuple
+
+class ParseResult(NamedTuple):
+    """A value extracted from an utterance"""
+    value: Any           # int party size, datetime.date, "HH:MM" string, name string or bool
+    confidence: float    # 0.0 - 1.0, how sure the parser is about the value
+    matched: str         # the part of the utterance the value came from
+
+MAX_PARTY_SIZE = 50
+
+# Restaurants rarely take bookings before this hour, so "at 7" means 7 PM
+ASSUME_PM_BEFORE_HOUR = 11
+
+_NUMBER_WORDS = {
+    'one': 1, 'two': 2, 'three': 3, 'four': 4, 'five': 5,
+    'six': 6, 'seven': 7, 'eight': 8, 'nine': 9, 'ten': 10,
+    'eleven': 11, 'twelve': 12, 'thirteen': 13, 'fourteen': 14, 'fifteen': 15,
+    'sixteen': 16, 'seventeen': 17, 'eighteen': 18, 'nineteen': 19, 'twenty': 20,
+    'thirty': 30, 'forty': 40, 'fifty': 50,
+    # Common speech-to-text homophones
+    'won': 1, 'to': 2, 'too': 2, 'for': 4, 'ate': 8,
+}
+
+# Homophones are only trusted as numbers right after a party-size phrase
+_HOMOPHONES = frozenset(['won', 'to', 'too', 'for', 'ate'])
+
+# Vague quantities: accepted, but with low confidence
+_QUANTITY_WORDS = {
+    'single': (1, 0.6), 'couple': (2, 0.7), 'pair': (2, 0.7),
+    'few': (3, 0.4), 'several': (4, 0.4), 'family': (4, 0.3),
+}
+
+_PARTNER_WORDS = frozenset([
+    'wife', 'husband', 'partner', 'girlfriend', 'boyfriend', 'friend',
+    'date', 'mom', 'mum', 'dad', 'mother', 'father', 'son', 'daughter',
+])
+
+_ORDINAL_WORDS = {
+    'first': 1, 'second': 2, 'third': 3, 'fourth': 4, 'fifth': 5,
+    'sixth': 6, 'seventh': 7, 'eighth': 8, 'ninth': 9, 'tenth': 10,
+    'eleventh': 11, 'twelfth': 12, 'thirteenth': 13, 'fourteenth': 14, 'fifteenth': 15,
+    'sixteenth': 16, 'seventeenth': 17, 'eighteenth': 18, 'nineteenth': 19, 'twentieth': 20,
+    'thirtieth': 30,
+}
+for _unit_word, _unit in list(_ORDINAL_WORDS.items())[:9]:
+    _ORDINAL_WORDS[f'twenty {_unit_word}'] = 20 + _unit
+_ORDINAL_WORDS['thirty first'] = 31
+
+_WEEKDAYS = {
+    'monday': 0, 'tuesday': 1, 'wednesday': 2, 'thursday': 3,
+    'friday': 4, 'saturday': 5, 'sunday': 6,
+}
+
+_MONTHS = {
+    'january': 1, 'february': 2, 'march': 3, 'april': 4, 'may': 5, 'june': 6,
+    'july': 7, 'august': 8, 'september': 9, 'october': 10, 'november': 11, 'december': 12,
+    'jan': 1, 'feb': 2, 'mar': 3, 'apr': 4, 'jun': 6, 'jul': 7, 'aug': 8,
+    'sep': 9, 'sept': 9, 'oct': 10, 'nov': 11, 'dec': 12,
+}
+
+_MINUTE_WORDS = {
+    'oh five': 5, 'ten': 10, 'fifteen': 15, 'twenty': 20, 'thirty': 30,
+    'forty': 40, 'forty five': 45, 'fifty': 50,
+}
+
+_YES_WORDS = frozenset([
+    'yes', 'yeah', 'yep', 'yup', 'correct', 'right', 'sure', 'confirm',
+    'ok', 'okay', 'perfect', 'absolutely', 'great', 'fine', 'definitely',
+])
+_NO_WORDS = frozenset(['no', 'nope', 'nah', 'wrong', 'not', 'incorrect', 'cancel', 'change'])
+
+_NAME_STOP_WORDS = frozenset([
+    'and', 'for', 'i', "i'd", "i'm", 'id', 'im', 'table', 'party', 'at', 'on',
+    'tomorrow', 'today', 'tonight', 'please', 'thanks', 'thank', 'calling',
+    'would', 'like', 'want', 'to', 'book', 'a', 'the', 'with', 'looking',
+    'trying', 'hoping', 'wondering', 'just', 'here', 'good', 'fine', 'going',
+    'not', 'sorry', 'reservation', 'booking', 'people', 'we', "we're", 'are',
+    'my', 'our', 'there', 'from',
+])
+_NOT_A_NAME_WORDS = (
+    _NAME_STOP_WORDS | _YES_WORDS | _NO_WORDS | frozenset(_WEEKDAYS)
+    | (frozenset(_NUMBER_WORDS) - _HOMOPHONES)
+    | frozenset(['am', 'pm', 'noon', 'next', 'this', 'that', "that's", 'it', "it's", 'is', 'of', 'o\'clock'])
+)
+_FILLER_WORDS = frozenset(['uh', 'um', 'er', 'erm', 'hmm', 'hi', 'hello', 'hey', 'yes', 'yeah', 'oh', 'well', 'so'])
+
+# ---------------------------------------------------------------------------
+# Precompiled patterns
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+_MERIDIEM_RE = re.compile(r"\b([ap])\.?\s?m\b\.?")
+_PUNCT_RE = re.compile(r"[,!?;]")
+
+# Not the minutes of a clock time ("7:30", "7.30")
+_PARTY_DIGIT_RE = re.compile(
+    r"(?<![\d/:.])\b(\d{1,3})\b(?!\s*(?::|\.\d|am\b|pm\b|o'?clock|th\b|st\b|nd\b|rd\b|/))"
+)
+_PARTY_CONTEXT_NUMBER_RE = re.compile(
+    r"\b(?:table for|party of|group of|we are|we're|there(?:'ll| will) be|reservation for|booking for|for)"
+    r"\s+(?:a\s+)?(\d{1,3}|[a-z]+)\b(?!\s*(?:am\b|pm\b|o'?clock|[:.]\d))"
+)
+_PARTY_SUFFIX_NUMBER_RE = re.compile(r"\b(\d{1,3}|[a-z]+)\s+(?:people|persons|guests|adults|of us)\b")
+_JUST_ME_RE = re.compile(r"\b(?:just me|only me|myself|just one|by myself|solo)\b")
+_ME_AND_RE = re.compile(r"\bme and (?:my |a )?(\w+)")
+
+_TIME_DIGIT_RE = re.compile(
+    r"(?<![\d/])\b(\d{1,2})(?:[:.](\d{2}))?\s*(am|pm|o'?clock)?"
+    r"(?![\d/]|(?:st|nd|rd|th)\b|\s*(?:people|persons|guests|of us)\b)"
+)
+_TIME_COMPACT_RE = re.compile(r"\b(\d{1,2})(\d{2})\s*(am|pm)\b")
+_TIME_PREPOSITIONS = frozenset(['at', 'around', 'about', 'by'])
+_TIME_CONTEXT_RE = re.compile(r"\b(?:at|around|about|by)\s+$")
+_TIME_WORD_RE = re.compile(
+    r"\b(?:(half|quarter) (past|after|to) )?"
+    r"(one|two|three|four|five|six|seven|eight|nine|ten|eleven|twelve)"
+    r"(?: (oh five|forty five|fifteen|twenty|thirty|forty|fifty|ten))?"
+    r"(?: (am|pm|o'?clock))?\b"
+)
+_NOON_RE = re.compile(r"\b(?:noon|midday|lunchtime)\b")
+_EVENING_RE = re.compile(r"\b(?:evening|tonight|night|dinner)\b")
+_MORNING_RE = re.compile(r"\b(?:morning|breakfast)\b")
+
+_MONTH_NAMES = '|'.join(sorted(_MONTHS, key=len, reverse=True))
+_ORDINAL_NAMES = '|'.join(sorted(_ORDINAL_WORDS, key=len, reverse=True))
+_DAY_MONTH_RE = re.compile(
+    rf"\b(\d{{1,2}}|{_ORDINAL_NAMES})(?:st|nd|rd|th)?\s+(?:of\s+)?({_MONTH_NAMES})\b"
+)
+_MONTH_DAY_RE = re.compile(
+    rf"\b({_MONTH_NAMES})\s+(?:the\s+)?(\d{{1,2}}|{_ORDINAL_NAMES})(?:st|nd|rd|th)?\b"
+)
+_DAY_ONLY_RE = re.compile(rf"\bthe\s+(\d{{1,2}}(?:st|nd|rd|th)|{_ORDINAL_NAMES})\b")
+_NUMERIC_DATE_RE = re.compile(r"\b(\d{1,2})/(\d{1,2})(?:/(\d{2,4}))?\b")
+_IN_DAYS_RE = re.compile(r"\bin (\w+) days?\b")
+
+_NAME_INTRO_RE = re.compile(
+    r"\b(?:my name is|my name's|name is|name's|this is|it's|it is|i'm|i am|call me|"
+    r"under the name(?: of)?|under)\s+([a-z][a-z'\-]*(?:\s+[a-z][a-z'\-]*){0,3})"
+)
+
+_PHONE_RE = re.compile(
+    r"(?:my phone|my number|phone number|call me at|reach me at)\s+(?:is\s+)?(?:1-)?(\d{3}[-.\s]?\d{3}[-.\s]?\d{4})",
+    re.IGNORECASE
+)
+
+def normalize_utterance(text):
+    """
+    Lower-case an utterance and canonicalize AM/PM spellings
+
+    Args:
+        text (str): Raw speech result
+
+    Returns:
+        str: Normalized text ("7 P.M." -> "7 pm")
+    """
+    if not text:
+        return ''
+    text = _PUNCT_RE.sub(' ', text.lower())
+    return _MERIDIEM_RE.sub(r'\1m', text)
+
+def _word_or_digit_to_int(token, allow_homophones=False):
+    """Convert '4' or 'four' to 4; returns None for anything else"""
+    if token.isdigit():
+        return int(token)
+    if token in _HOMOPHONES and not allow_homophones:
+        return None
+    return _NUMBER_WORDS.get(token)
+
+def parse_party_size(text, require_context=False):
+    """
+    Extract the number of guests from an utterance
+
+    Args:
+        text (str): Speech result
+        require_context (bool): Only accept numbers introduced by a party-size
+            phrase ("table for four", "6 people"); use when the utterance may
+            also contain a time or date
+
+    Returns:
+        ParseResult: value is an int, or None if nothing was found
+    """
+    speech = normalize_utterance(text)
+    if not speech:
+        return None
+
+    # "table for 4", "party of six", "reservation for a couple"
+    # Matches may overlap: in "we are a party of 6" the number follows the second phrase
+    match = _PARTY_CONTEXT_NUMBER_RE.search(speech)
+    while match:
+        token = match.group(1)
+        size, confidence = _word_or_digit_to_int(token, allow_homophones=True), 0.95
+        if size is None and token in _QUANTITY_WORDS:
+            size, confidence = _QUANTITY_WORDS[token]
+        if size and 0 < size <= MAX_PARTY_SIZE:
+            return ParseResult(size, confidence, match.group(0))
+        match = _PARTY_CONTEXT_NUMBER_RE.search(speech, match.start() + 1)
+
+    # "4 people", "three of us"
+    match = _PARTY_SUFFIX_NUMBER_RE.search(speech)
+    if match:
+        size = _word_or_digit_to_int(match.group(1))
+        if size and 0 < size <= MAX_PARTY_SIZE:
+            return ParseResult(size, 0.95, match.group(0))
+
+    match = _JUST_ME_RE.search(speech)
+    if match:
+        return ParseResult(1, 0.85, match.group(0))
+
+    match = _ME_AND_RE.search(speech)
+    if match and match.group(1) in _PARTNER_WORDS:
+        return ParseResult(2, 0.85, match.group(0))
+
+    if require_context:
+        return None
+
+    # A bare number: "4", "four", "uh five" - but not "at 7"
+    for match in _PARTY_DIGIT_RE.finditer(speech):
+        size = int(match.group(1))
+        if 0 < size <= MAX_PARTY_SIZE and not _TIME_CONTEXT_RE.search(speech[:match.start()]):
+            return ParseResult(size, 0.85, match.group(0))
+
+    tokens = _TOKEN_RE.findall(speech)
+    for index, token in enumerate(tokens):
+        size = _NUMBER_WORDS.get(token) if token not in _HOMOPHONES else None
+        if size and size <= MAX_PARTY_SIZE:
+            # "seven pm" and "at seven" are times, not party sizes
+            next_token = tokens[index + 1] if index + 1 < len(tokens) else ''
+            previous_token = tokens[index - 1] if index else ''
+            if next_token in ('am', 'pm', "o'clock", 'oclock') or previous_token in _TIME_PREPOSITIONS:
+                continue
+            return ParseResult(size, 0.8, token)
+
+    for token in tokens:
+        if token in _QUANTITY_WORDS:
+            size, confidence = _QUANTITY_WORDS[token]
+            return ParseResult(size, confidence, token)
+
+    return None
+
+def _next_weekday(today, weekday):
+    """Next occurrence of weekday strictly after today"""
+    days_ahead = weekday - today.weekday()
+    if days_ahead <= 0:
+        days_ahead += 7
+    return today + timedelta(days=days_ahead)
+
+def _day_number(token):
+    """Convert '5', '5th' or 'fifth' to 5"""
+    token = token.rstrip('stndrh') if token[:1].isdigit() else token
+    if token.isdigit():
+        return int(token)
+    return _ORDINAL_WORDS.get(token)
+
+def _upcoming_date(today, month, day, year=None):
+    """Build a date, rolling into next year when it has already passed"""
+    try:
+        if year is not None:
+            return date(year, month, day)
+        candidate = date(today.year, month, day)
+        if candidate < today:
+            candidate = date(today.year + 1, month, day)
+        return candidate
+    except ValueError:
+        return None
+
+def parse_date(text, today=None):
+    """
+    Extract a booking date from an utterance
+
+    Args:
+        text (str): Speech result
+        today (datetime.date, optional): Reference date, defaults to today
+
+    Returns:
+        ParseResult: value is a datetime.date, or None if nothing was found
+    """
+    speech = normalize_utterance(text)
+    if not speech:
+        return None
+    today = today or date.today()
+
+    if 'day after tomorrow' in speech:
+        return ParseResult(today + timedelta(days=2), 0.95, 'day after tomorrow')
+
+    tokens = _TOKEN_RE.findall(speech)
+    token_set = set(tokens)
+
+    if 'today' in token_set or 'tonight' in token_set:
+        return ParseResult(today, 0.95, 'today')
+    if 'tomorrow' in token_set:
+        return ParseResult(today + timedelta(days=1), 0.95, 'tomorrow')
+
+    match = _DAY_MONTH_RE.search(speech)
+    if match:
+        booking_date = _upcoming_date(today, _MONTHS[match.group(2)], _day_number(match.group(1)))
+        if booking_date:
+            return ParseResult(booking_date, 0.95, match.group(0))
+
+    match = _MONTH_DAY_RE.search(speech)
+    if match:
+        booking_date = _upcoming_date(today, _MONTHS[match.group(1)], _day_number(match.group(2)))
+        if booking_date:
+            return ParseResult(booking_date, 0.95, match.group(0))
+
+    match = _NUMERIC_DATE_RE.search(speech)
+    if match:
+        year = match.group(3)
+        if year:
+            year = int(year)
+            year = year + 2000 if year < 100 else year
+        booking_date = _upcoming_date(today, int(match.group(1)), int(match.group(2)), year)
+        if booking_date:
+            return ParseResult(booking_date, 0.8, match.group(0))
+
+    for token in tokens:
+        weekday = _WEEKDAYS.get(token)
+        if weekday is not None:
+            return ParseResult(_next_weekday(today, weekday), 0.9, token)
+
+    if 'weekend' in token_set:
+        return ParseResult(_next_weekday(today, _WEEKDAYS['saturday']), 0.6, 'weekend')
+
+    match = _IN_DAYS_RE.search(speech)
+    if match:
+        days = _word_or_digit_to_int(match.group(1))
+        if days:
+            return ParseResult(today + timedelta(days=days), 0.85, match.group(0))
+
+    # "the 5th" - this month, or next month if it has passed
+    match = _DAY_ONLY_RE.search(speech)
+    if match:
+        day = _day_number(match.group(1))
+        if day:
+            month, year = today.month, today.year
+            if day < today.day:
+                month, year = (1, year + 1) if month == 12 else (month + 1, year)
+            booking_date = _upcoming_date(today, month, day, year)
+            if booking_date:
+                return ParseResult(booking_date, 0.6, match.group(0))
+
+    return None
+
+def _to_24_hour(hour, minute, meridiem, speech):
+    """Resolve AM/PM; returns (hour, confidence) or (None, 0) for invalid times"""
+    if minute > 59 or hour > 23:
+        return None, 0.0
+
+    if meridiem == 'pm':
+        if hour > 12:
+            return None, 0.0
+        return (hour + 12 if hour < 12 else hour), 0.95
+    if meridiem == 'am':
+        if hour > 12:
+            return None, 0.0
+        return (0 if hour == 12 else hour), 0.95
+
+    if hour > 12:
+        return hour, 0.9  # 24-hour clock
+    if _MORNING_RE.search(speech):
+        return (0 if hour == 12 else hour), 0.85
+    if _EVENING_RE.search(speech) and hour < 12:
+        return hour + 12, 0.85
+    if 0 < hour < ASSUME_PM_BEFORE_HOUR:
+        return hour + 12, 0.7
+    return hour, 0.75
+
+def parse_time(text, require_context=False):
+    """
+    Extract a booking time from an utterance
+
+    Args:
+        text (str): Speech result
+        require_context (bool): Only accept numbers marked as a time ("at 7",
+            "7 pm", "7:30"); use when the utterance may also contain a
+            party size
+
+    Returns:
+        ParseResult: value is an "HH:MM" string, or None if nothing was found
+    """
+    speech = normalize_utterance(text)
+    if not speech:
+        return None
+
+    match = _TIME_COMPACT_RE.search(speech)
+    if match:
+        hour, confidence = _to_24_hour(int(match.group(1)), int(match.group(2)), match.group(3), speech)
+        if hour is not None:
+            return ParseResult(f"{hour:02d}:{int(match.group(2)):02d}", confidence, match.group(0))
+
+    # A number marked as a time ("at 7", "7 pm") beats a bare one ("for 4 at 7")
+    fallback = None
+    for match in _TIME_DIGIT_RE.finditer(speech):
+        minute_str, marker = match.group(2), match.group(3)
+        has_context = bool(minute_str or marker or _TIME_CONTEXT_RE.search(speech[:match.start()]))
+        if not has_context and (require_context or fallback):
+            continue
+
+        hour, minute = int(match.group(1)), int(minute_str) if minute_str else 0
+        meridiem = marker if marker in ('am', 'pm') else None
+        hour, confidence = _to_24_hour(hour, minute, meridiem, speech)
+        if hour is None:
+            continue
+        result = ParseResult(f"{hour:02d}:{minute:02d}", confidence, match.group(0).strip())
+        if has_context:
+            return result
+        fallback = result._replace(confidence=min(confidence, 0.6))
+
+    for match in _TIME_WORD_RE.finditer(speech):
+        relation, direction, hour_word, minute_word, marker = match.groups()
+        has_context = bool(relation or minute_word or marker or _TIME_CONTEXT_RE.search(speech[:match.start()]))
+        if not has_context and (require_context or fallback):
+            continue
+
+        hour = _NUMBER_WORDS[hour_word]
+        minute = _MINUTE_WORDS.get(minute_word, 0) if minute_word else 0
+        if relation:
+            offset = 30 if relation == 'half' else 15
+            if direction == 'to':
+                hour, minute = (hour - 1) % 12 or 12, 60 - offset
+            else:
+                minute = offset
+        meridiem = marker if marker in ('am', 'pm') else None
+        hour, confidence = _to_24_hour(hour, minute, meridiem, speech)
+        if hour is None:
+            continue
+        result = ParseResult(f"{hour:02d}:{minute:02d}", confidence, match.group(0))
+        if has_context:
+            return result
+        fallback = result._replace(confidence=min(confidence, 0.6))
+
+    match = _NOON_RE.search(speech)
+    if match:
+        return ParseResult("12:00", 0.9, match.group(0))
+
+    return fallback
+
+def parse_name(text, allow_bare=True):
+    """
+    Extract the caller's name from an utterance
+
+    Args:
+        text (str): Speech result
+        allow_bare (bool): Treat an utterance without an introduction phrase
+            ("Sam Jones") as the name itself
+
+    Returns:
+        ParseResult: value is the title-cased name, or None if nothing was found
+    """
+    speech = normalize_utterance(text).strip()
+    if not speech:
+        return None
+
+    for match in _NAME_INTRO_RE.finditer(speech):
+        words = []
+        for word in match.group(1).split():
+            if word in _NOT_A_NAME_WORDS:
+                break
+            words.append(word)
+        if words:
+            return ParseResult(_capitalize_name(words), 0.9, match.group(0))
+
+    if not allow_bare:
+        return None
+
+    words = [word for word in _TOKEN_RE.findall(speech) if word not in _FILLER_WORDS]
+    if not words or len(words) > 4:
+        return None
+    if any(word.isdigit() or word in _NOT_A_NAME_WORDS for word in words):
+        return None
+    return ParseResult(_capitalize_name(words), 0.5, speech)
+
+def _capitalize_name(words):
+    """'sam', "o'neil" -> 'Sam', "O'neil"""
+    return ' '.join(word.capitalize() for word in words)
+
+def parse_confirmation(text):
+    """
+    Decide whether an utterance is a yes or a no
+
+    Args:
+        text (str): Speech result
+
+    Returns:
+        ParseResult: value is True for yes, False for no, or None if unclear
+    """
+    tokens = _TOKEN_RE.findall(normalize_utterance(text))
+    if not tokens:
+        return None
+
+    # Negations win: "no that's not right" is a no
+    for token in tokens:
+        if token in _NO_WORDS:
+            return ParseResult(False, 0.9, token)
+    for token in tokens:
+        if token in _YES_WORDS:
+            return ParseResult(True, 0.9, token)
+    return None
+
+def parse_phone(text):
+    """
+    Extract a spoken phone number ("my number is 555 123 4567")
+
+    Args:
+        text (str): Speech result
+
+    Returns:
+        ParseResult: value is the number as spoken, or None if nothing was found
+    """
+    if not text:
+        return None
+
+    match = _PHONE_RE.search(text)
+    if match:
+        return ParseResult(match.group(1).strip(), 0.9, match.group(0))
+    return None
@@ -65,6 +65,27 @@ def format_phone_number(phone_number):
         # Invalid number format, return as is
         return phone_number
 
+def normalize_phone_number(phone_number):
+    """
+    Normalize a phone number to E.164 for use as a lookup key
+    
+    Args:
+        phone_number (str): Phone number in any common format
+        
+    Returns:
+        str: E.164 number such as '+15551234567', or None for withheld,
+            client or otherwise unusable caller IDs
+    """
+    if not phone_number:
+        return None
+    
+    digits_only = ''.join(filter(str.isdigit, phone_number))
+    if len(digits_only) == 10:  # US number without country code
+        return f"+1{digits_only}"
+    if 11 <= len(digits_only) <= 15:
+        return f"+{digits_only}"
+    return None
+
 def send_email_to_sms(to_phone_number, message, carrier):
     """
     Send SMS via email-to-SMS gateway as fallback
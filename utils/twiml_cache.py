@@ -0,0 +1,97 @@
+"""
+Fast TwiML rendering for the phone booking flow.
+
+Building VoiceResponse/Gather objects and serializing them through
+ElementTree costs far more than the turn logic itself. The call flow only
+ever emits two shapes of response - "say these messages and gather
+speech" and "say these messages and hang up" - so they are rendered by
+concatenating pre-encoded byte fragments. Responses whose text never
+changes are rendered once by precompile() and served straight from a dict.
+
+Output is byte-for-byte what twilio.twiml would produce for the same
+verbs; benchmarks/bench_twiml.py checks this and compares the timings.
+"""
+from xml.sax.saxutils import escape
+
+XML_HEADER = '<?xml version="1.0" encoding="UTF-8"?>'
+
+def _attr(value):
+    """Escape a value for use inside a double-quoted XML attribute"""
+    return escape(str(value), {'"': '&quot;'})
+
+class TwimlRenderer:
+    """
+    Renders gather/hangup responses from byte templates.
+
+    Args:
+        action_url (str): URL Twilio posts the caller's speech to
+        voice (str): Twilio <Say> voice
+        timeout (int): Seconds Gather waits for speech to start
+    """
+
+    def __init__(self, action_url, voice, timeout=5):
+        action = _attr(action_url)
+        self._gather_prefix = f'{XML_HEADER}<Response><Gather action="{action}" input="speech" '
+        self._gather_suffix = f'speechTimeout="auto" timeout="{_attr(timeout)}">'
+        self._gather_open = (self._gather_prefix + self._gather_suffix).encode('utf-8')
+        self._gather_close = f'</Gather><Redirect>{escape(action_url)}</Redirect></Response>'.encode('utf-8')
+        self._hangup_open = f'{XML_HEADER}<Response>'.encode('utf-8')
+        self._hangup_close = b'<Hangup /></Response>'
+        self._say_open = f'<Say voice="{_attr(voice)}">'
+        self._say_close = '</Say>'
+        self._static = {}
+
+    def _says(self, messages):
+        say_open, say_close = self._say_open, self._say_close
+        return ''.join([say_open + escape(message) + say_close for message in messages]).encode('utf-8')
+
+    def gather(self, messages, partial_result_url=None):
+        """
+        Say messages inside a speech Gather, then redirect back on silence
+
+        Args:
+            messages (list): Sentences to say, in order
+            partial_result_url (str, optional): partialResultCallback URL that
+                receives interim transcripts while the caller is speaking
+
+        Returns:
+            bytes: TwiML document
+        """
+        if partial_result_url:
+            gather_open = (
+                f'{self._gather_prefix}partialResultCallback="{_attr(partial_result_url)}" {self._gather_suffix}'
+            ).encode('utf-8')
+            return gather_open + self._says(messages) + self._gather_close
+
+        cached = self._static.get(('gather', tuple(messages)))
+        if cached is not None:
+            return cached
+        return self._gather_open + self._says(messages) + self._gather_close
+
+    def hangup(self, messages):
+        """
+        Say messages and end the call
+
+        Args:
+            messages (list): Sentences to say, in order
+
+        Returns:
+            bytes: TwiML document
+        """
+        cached = self._static.get(('hangup', tuple(messages)))
+        if cached is not None:
+            return cached
+        return self._hangup_open + self._says(messages) + self._hangup_close
+
+    def precompile(self, gather_messages=(), hangup_messages=()):
+        """
+        Render fixed single-message responses once so later calls are a dict lookup
+
+        Args:
+            gather_messages (iterable): Messages used with gather()
+            hangup_messages (iterable): Messages used with hangup()
+        """
+        for message in gather_messages:
+            self._static[('gather', (message,))] = self._gather_open + self._says([message]) + self._gather_close
+        for message in hangup_messages:
+            self._static[('hangup', (message,))] = self._hangup_open + self._says([message]) + self._hangup_close